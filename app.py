@@ -1,274 +1,368 @@
 """
 Flask Web Application for Scholarship Eligibility System
 """
-from flask import Flask, render_template, request, jsonify
-import joblib
+import time
+
+# Taken before any heavy import so startup timings cover the whole boot
+PROCESS_START = time.perf_counter()
+
+from flask import Flask, Response, render_template, request, jsonify, send_file, g
+import hashlib
 import json
 import numpy as np
-import pandas as pd
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 import os
+import threading
+from collections import namedtuple
+from scoring import (load_model_files, parse_batch_body, score_rows, primary_model_name, build_feature_matrix,
+                     ScoringError, FEATURE_ORDER, model_version as compute_model_version)
+from prediction_cache import cache_from_env, normalize_features, make_cache_key
+from file_payloads import FilePayload, PayloadSnapshot
+from registry import ModelRegistry, RegistryWatcher
+from drift import DriftMonitor, load_reference
+from dataset_io import read_dataset, resolve_dataset
+from what_if import WhatIfAnalyzer
+from schema import FeatureSchema, ValidationError
+from coalescer import PredictionCoalescer
+from jobs import JobStore, JobRunner, JobQueueFull, QUEUED, RUNNING, DONE, FAILED
+from rules import rule_engine, columns_from_matrix
+import response_encoding
+from metrics import (REGISTRY, REQUESTS, REQUEST_LATENCY, PREDICT_STAGE_LATENCY,
+                     MODEL_LATENCY, MODEL_ERRORS, MODEL_RELOADS)
 
 app = Flask(__name__)
 
-# Load models and features
-models = {}
-features = []
+# The models being served. Requests read model_bundle once and use that
+# bundle throughout, so a hot swap never mixes two versions in one response.
+# `drift` is the live-traffic monitor for the version (None without reference statistics)
+# `what_if` holds a WhatIfAnalyzer per model, and `schema` validates inputs and builds
+# feature vectors in the column order of the version's features.json.
+ModelBundle = namedtuple('ModelBundle', ['models', 'features', 'version', 'directory', 'drift', 'what_if',
+                                         'schema'])
+model_bundle = ModelBundle({}, [], None, None, None, {}, FeatureSchema(FEATURE_ORDER))
+models_ready = threading.Event()
+
+# Versioned models under MODELS_DIR; see registry.py for the layout
+model_registry = ModelRegistry(os.environ.get('MODELS_DIR', 'models'))
+
+# Startup timings in seconds, measured from PROCESS_START
+startup_metrics = {
+    'lazy_startup': os.environ.get('LAZY_STARTUP', '0') == '1',
+    'app_import_seconds': None,
+    'models_loaded_seconds': None,
+    'model_load_duration_seconds': None,
+    'time_to_first_request_seconds': None
+}
+
+# How long a request waits for models that are still loading in the background
+MODEL_LOAD_TIMEOUT = float(os.environ.get('MODEL_LOAD_TIMEOUT', 60))
+
+# Cache of /predict responses, see prediction_cache.cache_from_env for settings
+prediction_cache = cache_from_env()
+
+# Workers write drift snapshots to DRIFT_DIR so /drift can merge them;
+# without it each worker reports only the traffic it served
+DRIFT_DIR = os.environ.get('DRIFT_DIR') or None
+DRIFT_FLUSH_INTERVAL = float(os.environ.get('DRIFT_FLUSH_INTERVAL', 10))
+
+def load_bundle(version):
+    """Load one registry version (None for the flat layout) into a ModelBundle"""
+    directory = model_registry.version_dir(version) if version else model_registry.root
+    # COMPILED_MODELS=0 serves the original scikit-learn Random Forest
+    use_compiled = os.environ.get('COMPILED_MODELS', '1') != '0'
+    loaded_models, loaded_features = load_model_files(directory, compiled=use_compiled)
+    # Refuse a version whose features.json disagrees with its models
+    schema = FeatureSchema(loaded_features or FEATURE_ORDER)
+    schema.check_models(loaded_models)
+    version = version or compute_model_version(directory)
+    reference = load_reference(directory)
+    drift = None
+    if reference is not None:
+        drift = DriftMonitor(reference, schema.features, version,
+                             directory=DRIFT_DIR, flush_interval=DRIFT_FLUSH_INTERVAL)
+    # Built once per version, so trees are flattened and rule thresholds gathered outside requests
+    what_if = {name: WhatIfAnalyzer(model, schema.features)
+               for name, model in loaded_models.items()}
+    return ModelBundle(loaded_models, loaded_features, version, directory, drift, what_if, schema)
 
 def load_models():
     """Load all trained models"""
-    global models, features
+    global model_bundle
     
-    model_files = {
-        'Logistic Regression': 'models/logistic_regression_model.pkl',
-        'Decision Tree': 'models/decision_tree_model.pkl',
-        'Random Forest': 'models/random_forest_model.pkl'
-    }
-    
-    for name, path in model_files.items():
-        if os.path.exists(path):
-            models[name] = joblib.load(path)
+    load_start = time.perf_counter()
+    try:
+        model_bundle = load_bundle(model_registry.current_version())
+    finally:
+        now = time.perf_counter()
+        startup_metrics['model_load_duration_seconds'] = now - load_start
+        startup_metrics['models_loaded_seconds'] = now - PROCESS_START
+        models_ready.set()
     
-    # Load features
-    if os.path.exists('models/features.json'):
-        with open('models/features.json', 'r') as f:
-            features = json.load(f)
+    print(f"Loaded {len(model_bundle.models)} models (version {model_bundle.version}) in {now - load_start:.2f}s")
+
+def reload_models(version):
+    """
+    Load a newly promoted version in the background and swap it in.
+    In-flight requests finish with the bundle they started with.
+    """
+    global model_bundle, model_info_payload
     
-    print(f"Loaded {len(models)} models")
+    load_start = time.perf_counter()
+    try:
+        bundle = load_bundle(version)
+        if not bundle.models:
+            raise ScoringError(f'No models could be loaded from {bundle.directory}')
+    except Exception:
+        MODEL_RELOADS.inc(result='failed')
+        raise
+    model_bundle = bundle
+    model_info_payload = FilePayload(os.path.join(bundle.directory, 'model_results.json'),
+                                     build_model_info, serialize_payload)
+    MODEL_RELOADS.inc(result='success')
+    print(f"Switched to model version {bundle.version} in {time.perf_counter() - load_start:.2f}s")
+
+def wait_for_models():
+    """Block until the models are loaded (only waits with LAZY_STARTUP=1)"""
+    return models_ready.wait(MODEL_LOAD_TIMEOUT)
 
-# Load models on startup
-load_models()
+def current_models():
+    """Models and features for background jobs, once loaded"""
+    wait_for_models()
+    bundle = model_bundle
+    return bundle.models, bundle.features
+
+# Picks up newly promoted versions; MODEL_POLL_INTERVAL=0 disables hot reloading
+registry_watcher = RegistryWatcher(model_registry, reload_models,
+                                   interval=float(os.environ.get('MODEL_POLL_INTERVAL', 5)))
+
+# Background scoring jobs, persisted under JOBS_DIR so they survive restarts
+job_store = JobStore(os.environ.get('JOBS_DIR', 'jobs'))
+job_runner = JobRunner(
+    job_store,
+    current_models,
+    # Jobs scored at once per worker process; keep low to protect /predict latency
+    max_workers=int(os.environ.get('JOB_WORKERS', 1)),
+    chunk_size=int(os.environ.get('JOB_CHUNK_SIZE', 1000)),
+    chunk_pause=float(os.environ.get('JOB_CHUNK_PAUSE', 0.0))
+)
+JOB_MAX_QUEUED = int(os.environ.get('JOB_MAX_QUEUED', 100))
+
+# Rows scored and aggregated at a time by /cohort_report
+COHORT_CHUNK_SIZE = int(os.environ.get('COHORT_CHUNK_SIZE', 50000))
+
+# Micro-batching of concurrent /predict cache misses; PREDICT_COALESCE_WINDOW_MS=0 (default) disables it
+PREDICT_COALESCE_WINDOW_MS = float(os.environ.get('PREDICT_COALESCE_WINDOW_MS', 0))
+coalescer = PredictionCoalescer(
+    window=PREDICT_COALESCE_WINDOW_MS / 1000,
+    max_batch=int(os.environ.get('PREDICT_COALESCE_MAX_BATCH', 32))
+) if PREDICT_COALESCE_WINDOW_MS > 0 else None
+
+# Load models on startup; with LAZY_STARTUP=1 they load in the background
+# so the worker can bind its port straight away
+if startup_metrics['lazy_startup']:
+    threading.Thread(target=load_models, name='model-loader', daemon=True).start()
+else:
+    load_models()
 
 def get_scholarship_recommendations(year_of_study, cgpa, family_income, cocurricular_score, 
                                     leadership_positions, community_service_hours):
     """
     Determine specific scholarship provider eligibility based on student profile.
     Returns list of eligible scholarships with reasons.
+    Criteria live in the declarative rule table in rules.py.
     """
-    recommendations = []
-    
-    # PETRONAS Scholarship Criteria
-    # High academic excellence, leadership, and community involvement
-    petronas_eligible = (
-        cgpa >= 3.5 and
-        cocurricular_score >= 70 and
-        leadership_positions >= 2 and
-        community_service_hours >= 50
-    )
-    if petronas_eligible:
-        recommendations.append({
-            'provider': 'PETRONAS',
-            'name': 'PETRONAS Scholarship',
-            'eligible': True,
-            'confidence': 'High',
-            'reasons': [
-                f'CGPA {cgpa:.2f} meets requirement (≥3.5)',
-                f'Co-curricular score {cocurricular_score} meets requirement (≥70)',
-                f'Leadership experience: {leadership_positions} positions',
-                f'Community service: {community_service_hours} hours'
-            ],
-            'description': 'Prestigious scholarship for high-achieving students with strong leadership and community involvement.'
-        })
-    else:
-        reasons = []
-        if cgpa < 3.5:
-            reasons.append(f'CGPA {cgpa:.2f} below requirement (need ≥3.5)')
-        if cocurricular_score < 70:
-            reasons.append(f'Co-curricular score {cocurricular_score} below requirement (need ≥70)')
-        if leadership_positions < 2:
-            reasons.append(f'Leadership positions {leadership_positions} below requirement (need ≥2)')
-        if community_service_hours < 50:
-            reasons.append(f'Community service {community_service_hours} hours below requirement (need ≥50)')
-        
-        recommendations.append({
-            'provider': 'PETRONAS',
-            'name': 'PETRONAS Scholarship',
-            'eligible': False,
-            'confidence': 'Low',
-            'reasons': reasons,
-            'description': 'Prestigious scholarship for high-achieving students with strong leadership and community involvement.'
-        })
-    
-    # MARA Scholarship Criteria
-    # Focus on Bumiputera students, need-based, good academic performance
-    mara_eligible = (
-        family_income <= 80000 and
-        cgpa >= 3.0 and
-        cocurricular_score >= 50
-    )
-    if mara_eligible:
-        recommendations.append({
-            'provider': 'MARA',
-            'name': 'MARA Scholarship',
-            'eligible': True,
-            'confidence': 'High',
-            'reasons': [
-                f'Family income RM {family_income:,} meets requirement (≤RM 80,000)',
-                f'CGPA {cgpa:.2f} meets requirement (≥3.0)',
-                f'Co-curricular score {cocurricular_score} meets requirement (≥50)'
-            ],
-            'description': 'Government scholarship for Bumiputera students with financial need and good academic performance.'
-        })
-    else:
-        reasons = []
-        if family_income > 80000:
-            reasons.append(f'Family income RM {family_income:,} exceeds requirement (need ≤RM 80,000)')
-        if cgpa < 3.0:
-            reasons.append(f'CGPA {cgpa:.2f} below requirement (need ≥3.0)')
-        if cocurricular_score < 50:
-            reasons.append(f'Co-curricular score {cocurricular_score} below requirement (need ≥50)')
-        
-        recommendations.append({
-            'provider': 'MARA',
-            'name': 'MARA Scholarship',
-            'eligible': False,
-            'confidence': 'Low',
-            'reasons': reasons,
-            'description': 'Government scholarship for Bumiputera students with financial need and good academic performance.'
-        })
-    
-    # Zakat Scholarship Criteria
-    # Need-based, lower income threshold, moderate academic requirements
-    zakat_eligible = (
-        family_income <= 50000 and
-        cgpa >= 2.8 and
-        community_service_hours >= 30
-    )
-    if zakat_eligible:
-        recommendations.append({
-            'provider': 'Zakat',
-            'name': 'Zakat Scholarship',
-            'eligible': True,
-            'confidence': 'High',
-            'reasons': [
-                f'Family income RM {family_income:,} meets requirement (≤RM 50,000)',
-                f'CGPA {cgpa:.2f} meets requirement (≥2.8)',
-                f'Community service: {community_service_hours} hours meets requirement (≥30)'
-            ],
-            'description': 'Need-based scholarship for students from lower-income families with community service involvement.'
-        })
-    else:
-        reasons = []
-        if family_income > 50000:
-            reasons.append(f'Family income RM {family_income:,} exceeds requirement (need ≤RM 50,000)')
-        if cgpa < 2.8:
-            reasons.append(f'CGPA {cgpa:.2f} below requirement (need ≥2.8)')
-        if community_service_hours < 30:
-            reasons.append(f'Community service {community_service_hours} hours below requirement (need ≥30)')
-        
-        recommendations.append({
-            'provider': 'Zakat',
-            'name': 'Zakat Scholarship',
-            'eligible': False,
-            'confidence': 'Low',
-            'reasons': reasons,
-            'description': 'Need-based scholarship for students from lower-income families with community service involvement.'
-        })
-    
-    # Yayasan UTP Scholarship Criteria
-    # UTP-specific, balanced criteria, supports UTP students
-    yayasan_utp_eligible = (
-        cgpa >= 3.2 and
-        (family_income <= 100000 or cocurricular_score >= 60) and
-        year_of_study >= 1
-    )
-    if yayasan_utp_eligible:
-        recommendations.append({
-            'provider': 'Yayasan UTP',
-            'name': 'Yayasan UTP Scholarship',
-            'eligible': True,
-            'confidence': 'High',
-            'reasons': [
-                f'CGPA {cgpa:.2f} meets requirement (≥3.2)',
-                f'Family income RM {family_income:,} or co-curricular score {cocurricular_score} meets requirement',
-                f'Currently in Year {int(year_of_study)} of study'
-            ],
-            'description': 'Institutional scholarship for UTP students with good academic standing and active participation.'
-        })
-    else:
-        reasons = []
-        if cgpa < 3.2:
-            reasons.append(f'CGPA {cgpa:.2f} below requirement (need ≥3.2)')
-        if family_income > 100000 and cocurricular_score < 60:
-            reasons.append(f'Need either family income ≤RM 100,000 or co-curricular score ≥60')
-        
-        recommendations.append({
-            'provider': 'Yayasan UTP',
-            'name': 'Yayasan UTP Scholarship',
-            'eligible': False,
-            'confidence': 'Low',
-            'reasons': reasons,
-            'description': 'Institutional scholarship for UTP students with good academic standing and active participation.'
-        })
-    
-    return recommendations
+    profile = [year_of_study, cgpa, family_income, cocurricular_score,
+               leadership_positions, community_service_hours]
+    return rule_engine.recommendations({name: [value] for name, value in zip(FEATURE_ORDER, profile)})
 
 @app.route('/')
 def index():
     """Main page"""
     return render_template('index.html')
 
+def observe_stage(stage, stage_start):
+    """Record the time since stage_start for one /predict stage and return now"""
+    now = time.perf_counter()
+    PREDICT_STAGE_LATENCY.observe(now - stage_start, stage=stage)
+    return now
+
+# Inference tiers for /predict:
+#   all     - every model, as used by the model comparison view
+#   primary - only the primary model (falls back to the next model if it fails)
+#   lazy    - like primary, and lists the other models so the client can fetch
+#             them from /predict/models when it needs them
+INFERENCE_TIERS = ('all', 'primary', 'lazy')
+DEFAULT_INFERENCE_TIER = os.environ.get('INFERENCE_TIER', 'all')
+if DEFAULT_INFERENCE_TIER not in INFERENCE_TIERS:
+    raise ValueError(f"INFERENCE_TIER must be one of {', '.join(INFERENCE_TIERS)}")
+
+# Response views for /predict:
+#   full    - every explanation, provider description and reason as text
+#   compact - static text replaced by ids into GET /predict/text
+RESPONSE_VIEWS = ('full', 'compact')
+
+# Model explanations for end users
+MODEL_EXPLANATIONS = {
+    'Logistic Regression': {
+        'description': 'A statistical model that analyzes the relationship between your profile and scholarship eligibility using linear patterns.',
+        'strength': 'Provides a baseline prediction and is easy to interpret.',
+        'use_case': 'Good for understanding general eligibility trends.'
+    },
+    'Decision Tree': {
+        'description': 'A rule-based model that makes decisions by following a tree of questions about your profile (e.g., "Is CGPA > 3.5?").',
+        'strength': 'Shows clear decision rules and is highly interpretable.',
+        'use_case': 'Helps you understand exactly which criteria you meet or don\'t meet.'
+    },
+    'Random Forest': {
+        'description': 'An advanced model that combines multiple decision trees to make more accurate predictions.',
+        'strength': 'Most accurate and reliable prediction, considers complex patterns.',
+        'use_case': 'Primary model used for final eligibility determination.'
+    }
+}
+
+# Static text referenced by compact responses, built once and cached by clients
+TEXT_CATALOG = dict(rule_engine.text_catalog(), model_explanations=MODEL_EXPLANATIONS)
+
+def profile_features(bundle, data):
+    """
+    Validate one student and return their feature vector in the bundle's
+    column order. Raises ValidationError.
+    """
+    return np.array(bundle.schema.row(data))
+
+def invalid_input(error):
+    """422 response listing every invalid field"""
+    return jsonify({
+        'success': False,
+        'error': f'Invalid input: {error}',
+        'errors': error.errors
+    }), 422
+
+def models_by_priority(models):
+    """Model names with the primary model first"""
+    primary = primary_model_name(models)
+    return [primary] + [name for name in models if name != primary]
+
+def run_models(models, names, input_features, stop_after_first=False):
+    """
+    Predict one student with the named models. Failing models are skipped;
+    with stop_after_first, scoring stops at the first model that succeeds.
+    Returns (predictions, probabilities).
+    """
+    predictions = {}
+    probabilities = {}
+    
+    for name in names:
+        model = models[name]
+        try:
+            call_start = time.perf_counter()
+            pred = model.predict(input_features)
+            call_end = time.perf_counter()
+            prob = model.predict_proba(input_features)
+            MODEL_LATENCY.observe(call_end - call_start, model=name, call='predict')
+            MODEL_LATENCY.observe(time.perf_counter() - call_end, model=name, call='predict_proba')
+            
+            # Handle different array shapes
+            if len(pred.shape) > 0:
+                pred_value = int(pred[0])
+            else:
+                pred_value = int(pred)
+            
+            # Handle probability array
+            if len(prob.shape) > 1:
+                prob_array = prob[0]
+            else:
+                prob_array = prob
+            
+            # Ensure we have at least 2 classes
+            if len(prob_array) >= 2:
+                predictions[name] = pred_value
+                probabilities[name] = {
+                    'not_eligible': float(prob_array[0]),
+                    'eligible': float(prob_array[1])
+                }
+            else:
+                # Fallback if only one class probability is returned
+                predictions[name] = pred_value
+                prob_val = float(prob_array[0]) if len(prob_array) > 0 else 0.5
+                probabilities[name] = {
+                    'not_eligible': 1.0 - prob_val,
+                    'eligible': prob_val
+                }
+        except Exception as e:
+            print(f"Error with model {name}: {str(e)}")
+            MODEL_ERRORS.inc(model=name)
+            continue
+        if stop_after_first:
+            break
+    
+    return predictions, probabilities
+
+def observe_drift(bundle, input_features, response):
+    """Add one /predict request (inputs and primary model output) to the drift statistics"""
+    if bundle.drift is None:
+        return
+    if response.get('view') == 'compact':
+        probability = response['eligible_probability']
+    else:
+        probability = response['probability']['eligible']
+    bundle.drift.observe(input_features, [probability], [response['prediction']])
+
 @app.route('/predict', methods=['POST'])
 def predict():
-    """Predict scholarship eligibility"""
+    """
+    Predict scholarship eligibility.
+    The inference tier comes from ?tier=, a "tier" field in the body, or INFERENCE_TIER;
+    the response view from ?view= or a "view" field (default: full).
+    """
     try:
+        wait_for_models()
+        bundle = model_bundle
+        models = bundle.models
         if not models:
             return jsonify({
                 'success': False,
                 'error': 'Models not loaded. Please train models first.'
             }), 500
         
+        stage_start = time.perf_counter()
         data = request.json
+        input_row = normalize_features(bundle.schema.row(data))
+        tier = request.args.get('tier') or data.get('tier') or DEFAULT_INFERENCE_TIER
+        if tier not in INFERENCE_TIERS:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown tier '{tier}'. Use one of: {', '.join(INFERENCE_TIERS)}."
+            }), 400
+        view = request.args.get('view') or data.get('view') or 'full'
+        if view not in RESPONSE_VIEWS:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown view '{view}'. Use one of: {', '.join(RESPONSE_VIEWS)}."
+            }), 400
         
-        # Extract features
-        input_features = np.array([[
-            float(data.get('year_of_study', 1)),
-            float(data.get('cgpa', 3.0)),
-            float(data.get('family_income', 50000)),
-            float(data.get('cocurricular_score', 50)),
-            float(data.get('leadership_positions', 0)),
-            float(data.get('community_service_hours', 0))
-        ]])
+        stage_start = observe_stage('parse', stage_start)
+        input_features = np.array([input_row])
+        stage_start = observe_stage('features', stage_start)
         
-        predictions = {}
-        probabilities = {}
+        cache_key = make_cache_key(input_row, f'{bundle.version}:{tier}:{view}')
+        cached_response = prediction_cache.get(cache_key)
+        stage_start = observe_stage('cache_lookup', stage_start)
+        if cached_response is not None:
+            observe_drift(bundle, input_features, cached_response)
+            response = negotiated_response(cached_response)
+            observe_stage('serialize', stage_start)
+            return response
         
-        # Get predictions from all models
-        for name, model in models.items():
-            try:
-                pred = model.predict(input_features)
-                prob = model.predict_proba(input_features)
-                
-                # Handle different array shapes
-                if len(pred.shape) > 0:
-                    pred_value = int(pred[0])
-                else:
-                    pred_value = int(pred)
-                
-                # Handle probability array
-                if len(prob.shape) > 1:
-                    prob_array = prob[0]
-                else:
-                    prob_array = prob
-                
-                # Ensure we have at least 2 classes
-                if len(prob_array) >= 2:
-                    predictions[name] = pred_value
-                    probabilities[name] = {
-                        'not_eligible': float(prob_array[0]),
-                        'eligible': float(prob_array[1])
-                    }
-                else:
-                    # Fallback if only one class probability is returned
-                    predictions[name] = pred_value
-                    prob_val = float(prob_array[0]) if len(prob_array) > 0 else 0.5
-                    probabilities[name] = {
-                        'not_eligible': 1.0 - prob_val,
-                        'eligible': prob_val
-                    }
-            except Exception as e:
-                print(f"Error with model {name}: {str(e)}")
-                continue
+        # Get predictions from all models, or just the primary one
+        names = list(models) if tier == 'all' else models_by_priority(models)
+        if coalescer is not None:
+            predictions, probabilities = coalescer.predict(models, names, input_features[0],
+                                                           stop_after_first=tier != 'all')
+        elif tier == 'all':
+            predictions, probabilities = run_models(models, names, input_features)
+        else:
+            predictions, probabilities = run_models(models, names, input_features, stop_after_first=True)
+        stage_start = observe_stage('models', stage_start)
         
         if not predictions:
             return jsonify({
@@ -277,55 +371,71 @@ def predict():
             }), 500
         
         # Use Random Forest as primary model (usually best)
-        primary_model = 'Random Forest' if 'Random Forest' in predictions else list(predictions.keys())[0]
+        primary_model = primary_model_name(predictions)
         primary_prediction = predictions[primary_model]
         primary_probability = probabilities[primary_model]
         
+        columns = columns_from_matrix(input_features, bundle.schema.features)
+        if view == 'compact':
+            scholarships = rule_engine.compact_recommendations(columns)
+            stage_start = observe_stage('rules', stage_start)
+            response = {
+                'success': True,
+                'view': view,
+                'text_version': TEXT_CATALOG_PAYLOAD.etag,
+                'prediction': int(primary_prediction),
+                'eligible_probability': primary_probability['eligible'],
+                'model_used': primary_model,
+                # [prediction, eligible probability] per model
+                'models': {name: [predictions[name], probabilities[name]['eligible']] for name in predictions},
+                # The inputs as scored (and keyed), for filling in the reason templates
+                'inputs': dict(zip(bundle.schema.features, input_features[0].tolist())),
+                'scholarships': scholarships,
+                'eligible_scholarships': [s['provider'] for s in scholarships if s['eligible']],
+                'tier': tier,
+                'model_version': bundle.version
+            }
+            if tier == 'lazy':
+                response['pending_models'] = [name for name in models if name not in predictions]
+            prediction_cache.set(cache_key, response)
+            observe_drift(bundle, input_features, response)
+            
+            response = negotiated_response(response)
+            observe_stage('serialize', stage_start)
+            return response
+        
         # Get specific scholarship provider recommendations
-        scholarship_recommendations = get_scholarship_recommendations(
-            year_of_study=float(data.get('year_of_study', 1)),
-            cgpa=float(data.get('cgpa', 3.0)),
-            family_income=float(data.get('family_income', 50000)),
-            cocurricular_score=float(data.get('cocurricular_score', 50)),
-            leadership_positions=float(data.get('leadership_positions', 0)),
-            community_service_hours=float(data.get('community_service_hours', 0))
-        )
+        scholarship_recommendations = rule_engine.recommendations(columns)
         
         # Count eligible scholarships
         eligible_scholarships = [s for s in scholarship_recommendations if s['eligible']]
+        stage_start = observe_stage('rules', stage_start)
         
-        # Model explanations for end users
-        model_explanations = {
-            'Logistic Regression': {
-                'description': 'A statistical model that analyzes the relationship between your profile and scholarship eligibility using linear patterns.',
-                'strength': 'Provides a baseline prediction and is easy to interpret.',
-                'use_case': 'Good for understanding general eligibility trends.'
-            },
-            'Decision Tree': {
-                'description': 'A rule-based model that makes decisions by following a tree of questions about your profile (e.g., "Is CGPA > 3.5?").',
-                'strength': 'Shows clear decision rules and is highly interpretable.',
-                'use_case': 'Helps you understand exactly which criteria you meet or don\'t meet.'
-            },
-            'Random Forest': {
-                'description': 'An advanced model that combines multiple decision trees to make more accurate predictions.',
-                'strength': 'Most accurate and reliable prediction, considers complex patterns.',
-                'use_case': 'Primary model used for final eligibility determination.'
-            }
-        }
-        
-        return jsonify({
+        response = {
             'success': True,
             'prediction': int(primary_prediction),
             'probability': primary_probability,
             'all_predictions': predictions,
             'all_probabilities': probabilities,
             'model_used': primary_model,
-            'model_explanations': model_explanations,
+            'model_explanations': MODEL_EXPLANATIONS,
             'scholarship_recommendations': scholarship_recommendations,
             'eligible_scholarships_count': len(eligible_scholarships),
-            'eligible_scholarships': [s['provider'] for s in eligible_scholarships]
-        })
+            'eligible_scholarships': [s['provider'] for s in eligible_scholarships],
+            'tier': tier,
+            'model_version': bundle.version
+        }
+        if tier == 'lazy':
+            response['pending_models'] = [name for name in models if name not in predictions]
+        prediction_cache.set(cache_key, response)
+        observe_drift(bundle, input_features, response)
+        
+        response = negotiated_response(response)
+        observe_stage('serialize', stage_start)
+        return response
     
+    except ValidationError as e:
+        return invalid_input(e)
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -335,17 +445,450 @@ def predict():
             'error': f'Prediction failed: {str(e)}'
         }), 400
 
+@app.route('/predict/models', methods=['POST'])
+def predict_models():
+    """
+    Predictions from individual models for one student, for clients that used
+    the lazy tier. The body is the /predict body plus an optional "models"
+    list (default: every model).
+    """
+    try:
+        wait_for_models()
+        bundle = model_bundle
+        models = bundle.models
+        if not models:
+            return jsonify({
+                'success': False,
+                'error': 'Models not loaded. Please train models first.'
+            }), 500
+        
+        data = request.json
+        input_features = np.array([profile_features(bundle, data)])
+        names = data.get('models') or list(models)
+        unknown = [name for name in names if name not in models]
+        if unknown:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown models: {', '.join(map(str, unknown))}"
+            }), 400
+        
+        predictions, probabilities = run_models(models, names, input_features)
+        return negotiated_response({
+            'success': True,
+            'all_predictions': predictions,
+            'all_probabilities': probabilities,
+            'model_version': bundle.version
+        })
+    
+    except ValidationError as e:
+        return invalid_input(e)
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"Model prediction error: {error_details}")
+        return jsonify({
+            'success': False,
+            'error': f'Prediction failed: {str(e)}'
+        }), 400
+
+@app.route('/what_if', methods=['POST'])
+def what_if():
+    """
+    For each input, the smallest change that flips the model decision and
+    each provider's eligibility. The body is the /predict body plus an
+    optional "model" (default: the primary model).
+    """
+    try:
+        wait_for_models()
+        bundle = model_bundle
+        if not bundle.models:
+            return jsonify({
+                'success': False,
+                'error': 'Models not loaded. Please train models first.'
+            }), 500
+        
+        data = request.json
+        input_row = profile_features(bundle, data)
+        name = data.get('model') or primary_model_name(bundle.models)
+        if name not in bundle.what_if:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown model '{name}'. Use one of: {', '.join(bundle.what_if)}."
+            }), 400
+        
+        analysis = bundle.what_if[name].analyze(input_row)
+        return negotiated_response(dict(analysis, success=True, model=name, model_version=bundle.version))
+    
+    except ValidationError as e:
+        return invalid_input(e)
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"What-if error: {error_details}")
+        return jsonify({
+            'success': False,
+            'error': f'What-if analysis failed: {str(e)}'
+        }), 400
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """Predict scholarship eligibility for many students in one request"""
+    try:
+        wait_for_models()
+        bundle = model_bundle
+        if not bundle.models:
+            return jsonify({
+                'success': False,
+                'error': 'Models not loaded. Please train models first.'
+            }), 500
+        
+        # Accept either a JSON array or newline-delimited JSON (NDJSON)
+        rows = parse_batch_body(request.get_data(), request.content_type or '')
+        
+        try:
+            results, failed_count = score_rows(bundle.models, bundle.features, rows,
+                                               observe=bundle.drift.observe if bundle.drift else None)
+        except ScoringError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+        
+        return negotiated_response({
+            'success': True,
+            'count': len(results),
+            'failed_count': failed_count,
+            'results': results,
+            'model_version': bundle.version
+        })
+    
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"Batch prediction error: {error_details}")
+        return jsonify({
+            'success': False,
+            'error': f'Batch prediction failed: {str(e)}'
+        }), 400
+
+@app.route('/cohort_report', methods=['POST'])
+def cohort_report():
+    """
+    Eligibility counts, rates and award totals for a whole cohort, overall
+    and per year of study, income band and provider. The body is a CSV file
+    (Content-Type: text/csv), read in chunks, or a JSON array / NDJSON of students.
+    """
+    try:
+        wait_for_models()
+        bundle = model_bundle
+        if not bundle.models:
+            return jsonify({
+                'success': False,
+                'error': 'Models not loaded. Please train models first.'
+            }), 500
+        
+        # Imported here so pandas stays out of the app's startup path
+        import pandas as pd
+        from cohort_report import CohortReport
+        
+        features = bundle.schema.features
+        report = CohortReport(bundle.models, features)
+        if 'csv' in (request.content_type or ''):
+            for chunk in pd.read_csv(request.stream, chunksize=COHORT_CHUNK_SIZE):
+                report.add(chunk)
+        else:
+            rows = parse_batch_body(request.get_data(), request.content_type or '')
+            for start in range(0, len(rows), COHORT_CHUNK_SIZE):
+                X, _, errors = build_feature_matrix(rows[start:start + COHORT_CHUNK_SIZE], features)
+                report.invalid_rows += len(errors)
+                report.add(pd.DataFrame(X, columns=features))
+        
+        return negotiated_response(dict(report.result(), success=True, model_version=bundle.version))
+    
+    except ScoringError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"Cohort report error: {error_details}")
+        return jsonify({
+            'success': False,
+            'error': f'Cohort report failed: {str(e)}'
+        }), 400
+
+@app.before_request
+def start_background_threads():
+    """Start job worker and registry watcher threads in this process (after any gunicorn fork)"""
+    job_runner.start()
+    registry_watcher.start()
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_first_request(response):
+    """Record time-to-first-request once per process"""
+    if startup_metrics['time_to_first_request_seconds'] is None:
+        startup_metrics['time_to_first_request_seconds'] = time.perf_counter() - PROCESS_START
+    return response
+
+@app.after_request
+def record_request_metrics(response):
+    """Count every request and record its latency by route"""
+    # Route templates keep label cardinality bounded (/jobs/<job_id>, not every id)
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    if 'request_start' in g:
+        REQUEST_LATENCY.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+@app.route('/health', methods=['GET'])
+def health():
+    """Report readiness, the served model version and startup timings"""
+    bundle = model_bundle
+    return jsonify({
+        'success': True,
+        'models_loaded': models_ready.is_set() and bool(bundle.models),
+        'model_count': len(bundle.models),
+        'model_version': bundle.version,
+        'promoted_version': model_registry.current_version(),
+        'startup': startup_metrics,
+        'coalescer': coalescer.stats() if coalescer is not None else None
+    })
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """Get prediction cache hit/miss counters"""
+    return jsonify({
+        'success': True,
+        'model_version': model_bundle.version,
+        'cache': prediction_cache.stats()
+    })
+
+def cache_lookup_counts():
+    """Prediction cache lookups labelled by outcome"""
+    stats = prediction_cache.stats()
+    return [({'result': key}, stats[key]) for key in ('hits', 'shared_hits', 'misses')]
+
+# Values already tracked elsewhere, read when /metrics is scraped
+REGISTRY.gauge_callback('scholarship_models_loaded', 'Number of models loaded in this process',
+                        lambda: len(model_bundle.models) if models_ready.is_set() else 0)
+REGISTRY.gauge_callback('scholarship_model_version_info', 'Model version served by this process',
+                        lambda: [({'version': model_bundle.version}, 1)] if model_bundle.version else [])
+REGISTRY.gauge_callback('scholarship_startup_seconds', 'Startup timings measured from process start',
+                        lambda: [({'phase': key}, value) for key, value in startup_metrics.items()
+                                 if key != 'lazy_startup'])
+REGISTRY.gauge_callback('scholarship_prediction_cache_lookups_total', 'Prediction cache lookups by outcome',
+                        cache_lookup_counts, kind='counter')
+REGISTRY.gauge_callback('scholarship_prediction_cache_evictions_total', 'Prediction cache evictions',
+                        lambda: prediction_cache.stats()['evictions'], kind='counter')
+REGISTRY.gauge_callback('scholarship_prediction_cache_entries', 'Entries in the in-memory prediction cache',
+                        lambda: prediction_cache.stats()['size'])
+REGISTRY.gauge_callback('scholarship_jobs', 'Background jobs by status',
+                        lambda: [({'status': status}, job_store.count(status))
+                                 for status in (QUEUED, RUNNING, DONE, FAILED)])
+
+REGISTRY.gauge_callback('scholarship_drift_psi',
+                        "Population Stability Index of this worker's inputs against the training data",
+                        lambda: [({'feature': name}, score) for name, score in model_bundle.drift.scores().items()]
+                        if model_bundle.drift else [])
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of this worker's counters and histograms"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+def build_model_info(path):
+    """Build the /model_info payload from the model results file"""
+    with open(path, 'r') as f:
+        results = json.load(f)
+    return {
+        'success': True,
+        'results': results
+    }
+
+def build_dataset_stats(path):
+    """Build the /dataset_stats payload from the dataset file"""
+    df = read_dataset(path, columns=FEATURE_ORDER + ['eligible'], resolve=False)
+    
+    stats = {
+        'total_samples': len(df),
+        'eligible_count': int(df['eligible'].sum()),
+        'not_eligible_count': int((df['eligible'] == 0).sum()),
+        'eligible_percentage': float(df['eligible'].mean() * 100),
+        'features': {
+            'year_of_study': {
+                'min': float(df['year_of_study'].min()),
+                'max': float(df['year_of_study'].max()),
+                'mean': float(df['year_of_study'].mean())
+            },
+            'cgpa': {
+                'min': float(df['cgpa'].min()),
+                'max': float(df['cgpa'].max()),
+                'mean': float(df['cgpa'].mean())
+            },
+            'family_income': {
+                'min': float(df['family_income'].min()),
+                'max': float(df['family_income'].max()),
+                'mean': float(df['family_income'].mean())
+            },
+            'cocurricular_score': {
+                'min': float(df['cocurricular_score'].min()),
+                'max': float(df['cocurricular_score'].max()),
+                'mean': float(df['cocurricular_score'].mean())
+            }
+        }
+    }
+    
+    return {
+        'success': True,
+        'stats': stats
+    }
+
+def serialize_payload(payload):
+    """Serialize a payload the same way jsonify does"""
+    return app.json.response(payload).get_data()
+
+# Summaries are computed on first use and rebuilt when their source file changes
+model_info_payload = FilePayload(os.path.join(model_registry.current_dir(), 'model_results.json'),
+                                 build_model_info, serialize_payload)
+dataset_stats_payload = FilePayload(resolve_dataset('scholarship_dataset.csv'), build_dataset_stats, serialize_payload)
+
+def build_text_catalog():
+    """Serialize the static text once; compact responses refer to it by version"""
+    body = serialize_payload(dict(TEXT_CATALOG, success=True))
+    etag = hashlib.sha1(body).hexdigest()[:12]
+    return PayloadSnapshot(body=body, etag=etag, last_modified=None)
+
+TEXT_CATALOG_PAYLOAD = build_text_catalog()
+
+def payload_response(snapshot):
+    """Serve a precomputed payload with ETag/Last-Modified and conditional GET support"""
+    response = app.response_class(snapshot.body, mimetype='application/json')
+    response.set_etag(snapshot.etag)
+    response.last_modified = snapshot.last_modified
+    # Let clients keep a copy but revalidate it on every use
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def negotiated_response(payload):
+    """
+    Serialize a successful API payload as JSON, or as MessagePack when the
+    client asks for it, compressed per Accept-Encoding
+    """
+    mimetype = response_encoding.choose_mimetype(request.accept_mimetypes)
+    if mimetype == response_encoding.MSGPACK_MIMETYPE:
+        response = app.response_class(response_encoding.pack(payload), mimetype=mimetype)
+    else:
+        response = app.json.response(payload)
+    response.vary.add('Accept')
+    return response_encoding.compress_response(response, request.accept_encodings)
+
+def job_view(job):
+    """Public representation of a job record"""
+    total = job['total_rows']
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'total_rows': total,
+        'processed_rows': job['processed_rows'],
+        'failed_rows': job['failed_rows'],
+        'progress': job['processed_rows'] / total if total else 1.0,
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'error': job['error'],
+        'status_url': f"/jobs/{job['id']}",
+        'events_url': f"/jobs/{job['id']}/events",
+        'results_url': f"/jobs/{job['id']}/results"
+    }
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a large batch (JSON array, NDJSON or CSV) for background scoring"""
+    try:
+        job = job_store.submit(request.get_data(), request.content_type or '', max_queued=JOB_MAX_QUEUED)
+        job_runner.notify()
+        return jsonify({
+            'success': True,
+            'job': job_view(job)
+        }), 202
+    except JobQueueFull as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 429
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Job submission failed: {str(e)}'
+        }), 400
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Get the status and progress of a scoring job"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    return jsonify({
+        'success': True,
+        'job': job_view(job)
+    })
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Stream job progress as server-sent events until the job finishes"""
+    if job_store.get(job_id) is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    def stream():
+        last = None
+        while True:
+            view = job_view(job_store.get(job_id))
+            if view != last:
+                yield f"data: {json.dumps(view)}\n\n"
+                last = view
+            if view['status'] in (DONE, FAILED):
+                return
+            time.sleep(0.5)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    """Download the NDJSON results of a finished job"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    if job['status'] != DONE:
+        return jsonify({
+            'success': False,
+            'error': f"Job is {job['status']}, results are not ready",
+            'job': job_view(job)
+        }), 409
+    return send_file(os.path.abspath(job_store.output_path(job_id)), mimetype='application/x-ndjson',
+                     as_attachment=True, download_name=f'{job_id}.ndjson')
+
 @app.route('/model_info', methods=['GET'])
 def model_info():
     """Get model performance information"""
     try:
-        if os.path.exists('models/model_results.json'):
-            with open('models/model_results.json', 'r') as f:
-                results = json.load(f)
-            return jsonify({
-                'success': True,
-                'results': results
-            })
+        snapshot = model_info_payload.get()
+        if snapshot is not None:
+            return payload_response(snapshot)
         else:
             return jsonify({
                 'success': False,
@@ -361,42 +904,9 @@ def model_info():
 def dataset_stats():
     """Get dataset statistics"""
     try:
-        if os.path.exists('scholarship_dataset.csv'):
-            df = pd.read_csv('scholarship_dataset.csv')
-            
-            stats = {
-                'total_samples': len(df),
-                'eligible_count': int(df['eligible'].sum()),
-                'not_eligible_count': int((df['eligible'] == 0).sum()),
-                'eligible_percentage': float(df['eligible'].mean() * 100),
-                'features': {
-                    'year_of_study': {
-                        'min': float(df['year_of_study'].min()),
-                        'max': float(df['year_of_study'].max()),
-                        'mean': float(df['year_of_study'].mean())
-                    },
-                    'cgpa': {
-                        'min': float(df['cgpa'].min()),
-                        'max': float(df['cgpa'].max()),
-                        'mean': float(df['cgpa'].mean())
-                    },
-                    'family_income': {
-                        'min': float(df['family_income'].min()),
-                        'max': float(df['family_income'].max()),
-                        'mean': float(df['family_income'].mean())
-                    },
-                    'cocurricular_score': {
-                        'min': float(df['cocurricular_score'].min()),
-                        'max': float(df['cocurricular_score'].max()),
-                        'mean': float(df['cocurricular_score'].mean())
-                    }
-                }
-            }
-            
-            return jsonify({
-                'success': True,
-                'stats': stats
-            })
+        snapshot = dataset_stats_payload.get()
+        if snapshot is not None:
+            return payload_response(snapshot)
         else:
             return jsonify({
                 'success': False,
@@ -408,9 +918,43 @@ def dataset_stats():
             'error': str(e)
         }), 400
 
+@app.route('/drift', methods=['GET'])
+def drift():
+    """Live input and prediction statistics next to the training statistics, with drift scores"""
+    monitor = model_bundle.drift
+    if monitor is None:
+        return jsonify({
+            'success': False,
+            'error': 'Reference statistics not found. Retrain the models or run python drift.py.'
+        }), 404
+    try:
+        return jsonify(dict(monitor.report(), success=True))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/predict/text', methods=['GET'])
+def predict_text():
+    """Static text referenced by compact /predict responses (explanations, providers, reasons)"""
+    snapshot = TEXT_CATALOG_PAYLOAD
+    response = app.response_class(snapshot.body, mimetype='application/json')
+    # Weak, because the body may be sent compressed
+    response.set_etag(snapshot.etag, weak=True)
+    # Only changes on deploy, and compact responses carry its version
+    response.cache_control.public = True
+    response.cache_control.max_age = 86400
+    response = response.make_conditional(request)
+    if response.status_code != 200:
+        return response
+    return response_encoding.compress_response(response, request.accept_encodings)
+
+startup_metrics['app_import_seconds'] = time.perf_counter() - PROCESS_START
+
 if __name__ == '__main__':
     # Create models directory if it doesn't exist
-    os.makedirs('models', exist_ok=True)
+    os.makedirs(model_registry.root, exist_ok=True)
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
 
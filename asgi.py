@@ -0,0 +1,346 @@
+"""
+ASGI serving mode: the routes of app.py behind an event loop and bounded executors
+
+Usage (uvicorn is in requirements.txt):
+    uvicorn asgi:app --workers 4
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker -w 4 asgi:app
+
+Request bodies are read and responses written on the event loop, so a slow
+client or a large upload does not tie up a thread. The Flask views run on
+two thread pools. Model routes (/predict, /predict_batch, ...) run on the
+inference executor: a few threads and a bounded queue. When that queue is
+full, the request is answered with 429 straight away, and a request that
+waited longer than ASGI_QUEUE_TIMEOUT for a thread gets 503, instead of
+queueing without limit. Job event streams (/jobs/<id>/events) hold their
+thread for as long as the job runs, so they get a pool of their own with
+no queue: when every stream thread is taken, a new stream gets 429. Every
+other route (dashboard payloads, jobs, health, metrics) runs on a separate
+general pool, so it keeps answering while inference is saturated.
+
+Threads give concurrency, not parallelism, for Python code; run one worker
+process per core (--workers) for throughput, as with gunicorn.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app as flask_app_module
+from metrics import REGISTRY, REQUESTS, EXECUTOR_WAIT, EXECUTOR_REJECTED
+
+flask_app = flask_app_module.app
+
+# Routes whose views call the models
+INFERENCE_ROUTES = frozenset(['/predict', '/predict/models', '/predict_batch', '/what_if', '/cohort_report'])
+
+# Request bodies larger than this are spooled to a temporary file
+SPOOL_MAX_BYTES = 1024 * 1024
+
+# Response chunks a view may get ahead of the client; beyond that its thread waits
+STREAM_BUFFER_CHUNKS = int(os.environ.get('ASGI_STREAM_BUFFER', 16))
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a request cannot even be queued"""
+
+
+class QueueTimeout(Exception):
+    """Raised when a queued request waited too long to start"""
+
+
+class BoundedExecutor:
+    """
+    A thread pool that admits at most `max_queue` requests waiting for a
+    thread. submit() raises ExecutorSaturated beyond that; a task that
+    waited longer than `queue_timeout` seconds fails with QueueTimeout
+    without running.
+    """
+
+    def __init__(self, name, max_workers, max_queue, queue_timeout=None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'asgi-{name}')
+        self.queued = 0
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args):
+        with self._lock:
+            # Idle threads take work straight away, so only a backlog counts
+            if self.queued >= self.max_queue and self.active + self.queued >= self.max_workers:
+                EXECUTOR_REJECTED.inc(executor=self.name, reason='queue_full')
+                raise ExecutorSaturated(f'The {self.name} executor is at capacity. Retry shortly.')
+            self.queued += 1
+        return self.pool.submit(self._run, time.perf_counter(), func, args)
+
+    def _run(self, enqueued, func, args):
+        waited = time.perf_counter() - enqueued
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            EXECUTOR_WAIT.observe(waited, executor=self.name)
+            if self.queue_timeout and waited > self.queue_timeout:
+                EXECUTOR_REJECTED.inc(executor=self.name, reason='timeout')
+                raise QueueTimeout(f'Waited {waited:.1f}s for the {self.name} executor. Retry shortly.')
+            return func(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+QUEUE_TIMEOUT = float(os.environ.get('ASGI_QUEUE_TIMEOUT', 2.0))
+inference_executor = BoundedExecutor(
+    'inference',
+    max_workers=int(os.environ.get('ASGI_INFERENCE_THREADS', 4)),
+    max_queue=int(os.environ.get('ASGI_INFERENCE_QUEUE', 64)),
+    queue_timeout=QUEUE_TIMEOUT
+)
+general_executor = BoundedExecutor(
+    'general',
+    max_workers=int(os.environ.get('ASGI_GENERAL_THREADS', 16)),
+    max_queue=int(os.environ.get('ASGI_GENERAL_QUEUE', 256)),
+    queue_timeout=QUEUE_TIMEOUT
+)
+# One thread per open stream; nothing waits, since a stream never frees its thread quickly
+events_executor = BoundedExecutor(
+    'events',
+    max_workers=int(os.environ.get('ASGI_EVENT_STREAMS', 32)),
+    max_queue=0
+)
+EXECUTORS = (inference_executor, general_executor, events_executor)
+
+REGISTRY.gauge_callback('scholarship_executor_queue_depth', 'Requests waiting for an executor thread (ASGI mode)',
+                        lambda: [({'executor': e.name}, e.queued) for e in EXECUTORS])
+REGISTRY.gauge_callback('scholarship_executor_active', 'Requests running on an executor thread (ASGI mode)',
+                        lambda: [({'executor': e.name}, e.active) for e in EXECUTORS])
+
+
+def wsgi_environ(scope, body, content_length):
+    """PEP 3333 environ for an ASGI HTTP scope"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': str(client[0]),
+        'CONTENT_LENGTH': str(content_length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def run_wsgi(environ, emit, closed):
+    """
+    Call the Flask app in an executor thread, passing ('start', status,
+    headers), ('body', bytes) and ('end', None) messages to the event loop.
+    Stops early when `closed` is set (the client went away).
+    """
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and response.get('started'):
+            raise exc_info[1].with_traceback(exc_info[2])
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = headers
+        return write
+
+    def start():
+        if not response.get('started'):
+            response['started'] = True
+            emit(('start', response['status'], response['headers']))
+
+    def write(data):
+        start()
+        if data:
+            emit(('body', bytes(data)))
+
+    result = flask_app(environ, start_response)
+    try:
+        for chunk in result:
+            if closed.is_set():
+                break
+            write(chunk)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    start()
+    emit(('end', None))
+
+
+async def read_body(receive):
+    """Receive the whole request body into a (spooled) file; returns (file, length)"""
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    length = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.close()
+            return None, 0
+        chunk = message.get('body', b'')
+        body.write(chunk)
+        length += len(chunk)
+        more_body = message.get('more_body', False)
+    body.seek(0)
+    return body, length
+
+
+def json_error(status, message, retry_after=None):
+    """Response start and body messages in the app's error format"""
+    body = flask_app.json.dumps({'success': False, 'error': message}).encode('utf-8')
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    if retry_after is not None:
+        headers.append((b'retry-after', str(retry_after).encode()))
+    return ({'type': 'http.response.start', 'status': status, 'headers': headers},
+            {'type': 'http.response.body', 'body': body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            for executor in EXECUTORS:
+                executor.shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def executor_for(path):
+    """The executor that runs the view for a request path"""
+    if path in INFERENCE_ROUTES:
+        return inference_executor
+    if path.startswith('/jobs/') and path.endswith('/events'):
+        return events_executor
+    return general_executor
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        raise NotImplementedError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    body, length = await read_body(receive)
+    if body is None:
+        return
+
+    path = scope['path']
+    executor = executor_for(path)
+    loop = asyncio.get_running_loop()
+    messages = asyncio.Queue(maxsize=STREAM_BUFFER_CHUNKS)
+    closed = threading.Event()
+    # Set (on the event loop) once nothing reads `messages` any more
+    response_over = asyncio.Event()
+
+    async def put(message):
+        if not response_over.is_set():
+            await messages.put(message)
+
+    def emit(message):
+        # Blocks the view's thread while the buffer is full
+        asyncio.run_coroutine_threadsafe(put(message), loop).result()
+
+    def fail(error):
+        # On the event loop; the error takes precedence over any buffered output
+        while messages.full():
+            messages.get_nowait()
+        messages.put_nowait(('error', error))
+
+    def finished(future):
+        # The view has stopped reading the body by now
+        body.close()
+        error = RuntimeError('The server is shutting down.') if future.cancelled() else future.exception()
+        if error is not None:
+            # Not emit(): on shutdown this runs on the event loop itself, which must not block
+            loop.call_soon_threadsafe(fail, error)
+
+    try:
+        future = executor.submit(run_wsgi, wsgi_environ(scope, body, length), emit, closed)
+    except ExecutorSaturated as e:
+        body.close()
+        REQUESTS.inc(endpoint=path if path in INFERENCE_ROUTES else 'unmatched', method=scope['method'],
+                     status=429)
+        for message in json_error(429, str(e), retry_after=1):
+            await send(message)
+        return
+    future.add_done_callback(finished)
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        closed.set()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    started = False
+    try:
+        while True:
+            kind, *payload = await messages.get()
+            if kind == 'start':
+                status, headers = payload
+                await send({
+                    'type': 'http.response.start',
+                    'status': status,
+                    'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                for name, value in headers]
+                })
+                started = True
+            elif kind == 'body':
+                await send({'type': 'http.response.body', 'body': payload[0], 'more_body': True})
+            elif kind == 'end':
+                await send({'type': 'http.response.body', 'body': b''})
+                break
+            else:
+                error = payload[0]
+                if started:
+                    # Too late for an error status; the server drops the connection
+                    raise error
+                if isinstance(error, QueueTimeout):
+                    REQUESTS.inc(endpoint=path if path in INFERENCE_ROUTES else 'unmatched',
+                                 method=scope['method'], status=503)
+                    start, end = json_error(503, str(error), retry_after=1)
+                else:
+                    start, end = json_error(500, f'Internal error: {error}')
+                await send(start)
+                await send(end)
+                break
+    finally:
+        closed.set()
+        watcher.cancel()
+        response_over.set()
+        # Frees a view waiting on a full buffer; it sees `closed` and stops
+        while not messages.empty():
+            messages.get_nowait()
@@ -0,0 +1,279 @@
+"""
+Reproducible benchmarks for inference, endpoints, dataset generation and training
+
+Usage:
+    python benchmark.py                                      # write benchmark_results.json
+    python benchmark.py --quick --only inference,rules
+    python benchmark.py -o new.json --baseline benchmark_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+
+from generate_dataset import generate, generate_block
+
+FEATURES = ['year_of_study', 'cgpa', 'family_income', 'cocurricular_score',
+            'leadership_positions', 'community_service_hours']
+
+GROUPS = ['inference', 'rules', 'endpoints', 'generate', 'train']
+
+# The saved models were fitted on DataFrames and warn on every NumPy input
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+warnings.filterwarnings('ignore', category=FutureWarning)
+
+# Seed for every synthetic input, so runs measure identical work
+SEED = 42
+
+
+def measure(func, repeat=20, min_time=0.2, max_repeat=1000, warmup=1):
+    """
+    Time func() at least `repeat` times and until `min_time` seconds have
+    been spent (capped at max_repeat). Returns summary statistics in seconds.
+    """
+    for _ in range(warmup):
+        func()
+    timings = []
+    total = 0.0
+    while len(timings) < max_repeat and (len(timings) < repeat or total < min_time):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        total += elapsed
+    timings = np.array(timings)
+    return {
+        'median_seconds': float(np.median(timings)),
+        'p95_seconds': float(np.percentile(timings, 95)),
+        'min_seconds': float(timings.min()),
+        'mean_seconds': float(timings.mean()),
+        'runs': len(timings)
+    }
+
+
+def record(results, name, rows, stats):
+    stats['rows'] = rows
+    stats['rows_per_second'] = rows / stats['median_seconds'] if stats['median_seconds'] else None
+    results[name] = stats
+    print(f"{name:<60} {stats['median_seconds'] * 1000:>10.3f} ms  (p95 {stats['p95_seconds'] * 1000:.3f} ms, "
+          f"{stats['runs']} runs)")
+
+
+def sample_frame(rows):
+    """Deterministic synthetic students in the training dataset layout"""
+    return generate_block(0, 0, rows, SEED)
+
+
+def bench_inference(results, sizes, repeat):
+    """predict_proba per model, single row and batched"""
+    from registry import ModelRegistry
+    from scoring import load_model_files, predict_matrix
+
+    models_dir = ModelRegistry('models').current_dir()
+    models, _ = load_model_files(models_dir)
+    # The original scikit-learn forest, for comparison with the compiled one
+    sklearn_models, _ = load_model_files(models_dir, compiled=False)
+    candidates = dict(models, **{'Random Forest (scikit-learn)': sklearn_models['Random Forest']})
+
+    for rows in sizes:
+        X = sample_frame(rows)[FEATURES].to_numpy(dtype=float)
+        for name, model in candidates.items():
+            stats = measure(lambda: model.predict_proba(X), repeat=repeat)
+            record(results, f'inference.{name}.predict_proba[n={rows}]', rows, stats)
+        stats = measure(lambda: predict_matrix(models, X), repeat=repeat)
+        record(results, f'inference.all_models.predict_matrix[n={rows}]', rows, stats)
+
+
+def bench_rules(results, sizes, repeat):
+    """Provider recommendations, one student at a time and vectorized"""
+    import app
+    from rules import rule_engine, columns_from_matrix
+
+    for rows in sizes:
+        df = sample_frame(rows)
+        profiles = df[FEATURES].to_dict('records')
+
+        def one_at_a_time():
+            for profile in profiles:
+                app.get_scholarship_recommendations(**profile)
+
+        record(results, f'rules.get_scholarship_recommendations[n={rows}]', rows,
+               measure(one_at_a_time, repeat=max(3, repeat // 5), max_repeat=repeat))
+
+        columns = columns_from_matrix(df[FEATURES].to_numpy(dtype=float), FEATURES)
+        record(results, f'rules.rule_engine.evaluate[n={rows}]', rows,
+               measure(lambda: rule_engine.evaluate(columns), repeat=repeat))
+
+
+def bench_endpoints(results, sizes, repeat):
+    """/predict and /predict_batch through the Flask test client"""
+    import app
+
+    client = app.app.test_client()
+    profiles = sample_frame(max(sizes))[FEATURES].to_dict('records')
+    profiles = [{key: getattr(value, 'item', lambda: value)() for key, value in profile.items()}
+                for profile in profiles]
+    body = profiles[0]
+
+    def predict_uncached():
+        app.prediction_cache.clear()
+        assert client.post('/predict', json=body).status_code == 200
+
+    def predict_cached():
+        assert client.post('/predict', json=body).status_code == 200
+
+    record(results, 'endpoints./predict.uncached', 1, measure(predict_uncached, repeat=repeat))
+    record(results, 'endpoints./predict.cached', 1, measure(predict_cached, repeat=repeat))
+
+    for rows in sizes:
+        batch = json.dumps(profiles[:rows])
+
+        def predict_batch():
+            response = client.post('/predict_batch', data=batch, content_type='application/json')
+            assert response.status_code == 200
+
+        record(results, f'endpoints./predict_batch[n={rows}]', rows,
+               measure(predict_batch, repeat=max(3, repeat // 5), max_repeat=repeat))
+
+
+def bench_generate(results, sizes, repeat, directory):
+    """Synthetic dataset generation, CSV output"""
+    path = os.path.join(directory, 'generated.csv')
+    for rows in sizes:
+        record(results, f'generate.csv[n={rows}]', rows,
+               measure(lambda: generate(rows, path, seed=SEED), repeat=max(3, repeat // 5),
+                       min_time=0, warmup=0))
+
+
+def bench_train(results, sizes, repeat):
+    """Fitting each baseline model from train_models.py"""
+    from sklearn.base import clone
+    from train_models import BASE_MODELS
+
+    for rows in sizes:
+        df = sample_frame(rows)
+        X, y = df[FEATURES], df['eligible']
+        for name, base in BASE_MODELS.items():
+            record(results, f'train.{name}.fit[n={rows}]', rows,
+                   measure(lambda: clone(base).fit(X, y), repeat=max(3, repeat // 10),
+                           min_time=0, warmup=0))
+
+
+def environment():
+    """Versions and hardware, so results are only compared like for like"""
+    import sklearn
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scikit_learn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare(results, baseline, tolerance, metric='median_seconds'):
+    """
+    Compare timings with a baseline run. Returns the names of benchmarks
+    that are more than `tolerance` (a fraction) slower on `metric`.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<60} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, stats in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        before, after = previous[metric], stats[metric]
+        change = (after - before) / before if before else 0.0
+        flag = ''
+        if change > tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<60} {before * 1000:>10.3f}ms {after * 1000:>10.3f}ms {change:>+7.1%}{flag}")
+    return regressions
+
+
+def parse_sizes(text):
+    return [int(size) for size in text.split(',') if size]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the scholarship eligibility system.')
+    parser.add_argument('-o', '--output', default='benchmark_results.json', help='Results file (JSON)')
+    parser.add_argument('--baseline', help='Earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown against the baseline before failing (default: 0.2 = 20%%)')
+    parser.add_argument('--metric', choices=['median_seconds', 'min_seconds', 'p95_seconds'],
+                        default='median_seconds',
+                        help='Statistic compared with the baseline; min_seconds is least sensitive to noise')
+    parser.add_argument('--only', default=','.join(GROUPS),
+                        help=f'Comma-separated groups to run (default: {",".join(GROUPS)})')
+    parser.add_argument('--sizes', default='1,100,10000',
+                        help='Row counts for inference, rules and endpoint benchmarks (default: 1,100,10000)')
+    parser.add_argument('--train-sizes', default='2000,20000',
+                        help='Row counts for generation and training benchmarks (default: 2000,20000)')
+    parser.add_argument('--repeat', type=int, default=20, help='Minimum timed runs per benchmark (default: 20)')
+    parser.add_argument('--quick', action='store_true', help='Fewer runs and smaller sizes, for a smoke test')
+    args = parser.parse_args(argv)
+
+    groups = [group for group in args.only.split(',') if group]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f'unknown groups: {", ".join(sorted(unknown))}')
+
+    sizes = parse_sizes(args.sizes)
+    train_sizes = parse_sizes(args.train_sizes)
+    repeat = args.repeat
+    if args.quick:
+        sizes = [size for size in sizes if size <= 1000] or sizes[:1]
+        train_sizes = train_sizes[:1]
+        repeat = min(repeat, 5)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        # Keep the app's job database out of the working tree
+        os.environ.setdefault('JOBS_DIR', os.path.join(directory, 'jobs'))
+        if 'inference' in groups:
+            bench_inference(results, sizes, repeat)
+        if 'rules' in groups:
+            bench_rules(results, sizes, repeat)
+        if 'endpoints' in groups:
+            bench_endpoints(results, sizes, repeat)
+        if 'generate' in groups:
+            bench_generate(results, train_sizes, repeat, directory)
+        if 'train' in groups:
+            bench_train(results, train_sizes, repeat)
+
+    report = {'environment': environment(), 'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('environment', {}).get('cpu_count') != os.cpu_count():
+            print("Warning: the baseline was recorded on a machine with a different CPU count")
+        regressions = compare(results, baseline['results'], args.tolerance, args.metric)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Micro-batching for single-student predictions
+
+Concurrent /predict requests in one process are held for a short window
+(or until `max_batch` of them have arrived) and scored together, with one
+predict_proba call per model for the whole batch instead of one per
+request. Each caller blocks until its own row's result is ready. The window
+starts when the first request of a batch arrives, so it bounds the extra
+latency; a larger max_batch trades latency under bursts for throughput.
+
+Coalescing needs concurrent requests in the same process: threaded workers
+(gunicorn --threads), the ASGI mode, or the Flask development server.
+"""
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+from scoring import predict_matrix, probability_dict
+
+
+class _Pending:
+    """One caller's row, waiting for its batch"""
+
+    __slots__ = ('features', 'models', 'names', 'stop_after_first', 'future', 'arrived')
+
+    def __init__(self, features, models, names, stop_after_first):
+        self.features = features
+        self.models = models
+        self.names = names
+        self.stop_after_first = stop_after_first
+        self.future = Future()
+        self.arrived = time.perf_counter()
+
+
+class PredictionCoalescer:
+    """
+    Collects single-row predictions from concurrent callers into batches.
+    A dispatcher thread (started per process, after any fork) waits up to
+    `window` seconds from the first queued row, or until `max_batch` rows
+    are queued, then scores the batch.
+    """
+
+    def __init__(self, window=0.002, max_batch=32):
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self._condition = threading.Condition()
+        self._pending = []
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._batches = 0
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Threads do not survive fork; every worker process gets its own dispatcher
+            self._reset()
+            threading.Thread(target=self._loop, name='prediction-coalescer', daemon=True).start()
+            self._pid = os.getpid()
+
+    def predict(self, models, names, features, stop_after_first=False):
+        """
+        Predict one student (a 1-D feature row) with the named models, in
+        the format of app.run_models: (predictions, probabilities). With
+        stop_after_first, names are tried in order and only the first model
+        that succeeds is used.
+        """
+        self._ensure_thread()
+        item = _Pending(np.asarray(features, dtype=float), models, tuple(names), stop_after_first)
+        with self._condition:
+            self._pending.append(item)
+            # Wake the dispatcher to start a window, or to flush a full batch
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._condition.notify()
+        return item.future.result()
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                deadline = self._pending[0].arrived + self.window
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                self._batch_sizes[len(batch)] += 1
+                self._batches += 1
+                self._requests += len(batch)
+            self._score(batch)
+
+    def _score(self, batch):
+        # Rows for the same model bundle and tier share one call per model
+        groups = {}
+        for item in batch:
+            groups.setdefault((id(item.models), item.names, item.stop_after_first), []).append(item)
+
+        for items in groups.values():
+            try:
+                models, names = items[0].models, items[0].names
+                X = np.vstack([item.features for item in items])
+                if items[0].stop_after_first:
+                    predictions, probabilities = {}, {}
+                    for name in names:
+                        predictions, probabilities, _ = predict_matrix({name: models[name]}, X, source='coalescer')
+                        if predictions:
+                            break
+                else:
+                    predictions, probabilities, _ = predict_matrix({name: models[name] for name in names}, X,
+                                                                   source='coalescer')
+                for i, item in enumerate(items):
+                    item.future.set_result((
+                        {name: int(prediction[i]) for name, prediction in predictions.items()},
+                        {name: probability_dict(probability[i]) for name, probability in probabilities.items()}
+                    ))
+            except Exception as e:
+                for item in items:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+
+    def stats(self):
+        """Settings, request and batch counts, and the batch-size distribution"""
+        with self._condition:
+            sizes = dict(sorted(self._batch_sizes.items()))
+            requests, batches = self._requests, self._batches
+        return {
+            'window_ms': self.window * 1000,
+            'max_batch': self.max_batch,
+            'requests': requests,
+            'batches': batches,
+            'mean_batch_size': requests / batches if batches else None,
+            'batch_sizes': sizes
+        }
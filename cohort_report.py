@@ -0,0 +1,250 @@
+"""
+Cohort eligibility reports: counts, rates and award totals for a whole intake
+
+Each chunk of the cohort is scored in one vectorized pass over the models
+and the provider rules, then reduced to per-group partial sums (counts,
+feature sums, minima and maxima) that are merged into the running totals.
+Memory depends on the number of groups, not on the size of the file.
+Every group is summarised in the `stats` shape of /dataset_stats, so the
+dashboard charts can plot any of them.
+
+Usage:
+    python cohort_report.py intake.csv -o report.json
+    python cohort_report.py intake.parquet --chunk-size 50000   # needs pyarrow (optional)
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from registry import ModelRegistry
+from rules import rule_engine, columns_from_matrix
+from score_file import frame_matrix, iter_chunks
+from scoring import (FEATURE_ORDER, MODEL_FILES, ScoringError, load_model_files, model_version,
+                     predict_matrix, primary_model_name)
+
+# Features summarised in stats['features'], as on the dashboard
+STATS_FEATURES = ['year_of_study', 'cgpa', 'family_income', 'cocurricular_score']
+
+# (lower edges, labels): each band runs from its edge up to the next one
+INCOME_BANDS = ([30000, 60000, 90000, 120000], ['0-30k', '30k-60k', '60k-90k', '90k-120k', '120k+'])
+CGPA_BANDS = ([2.0, 2.5, 3.0, 3.5], ['<2.0', '2.0-2.5', '2.5-3.0', '3.0-3.5', '3.5-4.0'])
+
+GROUPINGS = ('year_of_study', 'income_band', 'provider')
+
+AWARDS = {rule['provider']: rule.get('award', 0) for rule in rule_engine.rules}
+
+
+def band_codes(values, bands):
+    """Index of the band each value falls into"""
+    return np.searchsorted(np.asarray(bands[0], dtype=float), values, side='right')
+
+
+def _how(column):
+    """How partial totals of a column are merged"""
+    if column.endswith(':min'):
+        return 'min'
+    if column.endswith(':max'):
+        return 'max'
+    return 'sum'
+
+
+class CohortReport:
+    """
+    Running grouped aggregates of a scored cohort. Feed it DataFrame chunks
+    with add(); result() renders the report at any point.
+    """
+
+    def __init__(self, models, features=None, source='cohort'):
+        if not models:
+            raise ScoringError('Models not loaded. Please train models first.')
+        self.models = models
+        self.features = features or FEATURE_ORDER
+        self.source = source
+        self.primary_model = primary_model_name(models)
+        self.partials = {}
+        self.invalid_rows = 0
+
+    def add(self, df):
+        """Score one chunk and merge its group totals into the report"""
+        X, valid = frame_matrix(df, self.features)
+        self.invalid_rows += int((~valid).sum())
+        X = X[valid]
+        if len(X) == 0:
+            return
+        predictions, probabilities, _ = predict_matrix(self.models, X, source=self.source)
+        if self.primary_model not in predictions:
+            raise ScoringError(f'{self.primary_model} failed to score the cohort.')
+        provider_masks = rule_engine.evaluate(columns_from_matrix(X, self.features))
+
+        # Columns merged by summing: counts, eligibility flags, probabilities and feature sums
+        sums = {
+            'count': np.ones(len(X)),
+            'eligible': predictions[self.primary_model] == 1,
+            'probability': probabilities[self.primary_model][:, 1]
+        }
+        stats_features = [name for name in STATS_FEATURES if name in self.features]
+        for name in stats_features:
+            sums[f'{name}:sum'] = X[:, self.features.index(name)]
+        for name, prediction in predictions.items():
+            sums[f'model:{name}'] = prediction == 1
+        for provider, mask in provider_masks.items():
+            sums[f'provider:{provider}'] = mask
+        for feature, bands in (('cgpa', CGPA_BANDS), ('family_income', INCOME_BANDS)):
+            if feature in self.features:
+                codes = band_codes(X[:, self.features.index(feature)], bands)
+                for code, label in enumerate(bands[1]):
+                    sums[f'{feature}_band:{label}'] = codes == code
+        values = np.column_stack([np.asarray(column, dtype=np.float64) for column in sums.values()])
+        extremes = X[:, [self.features.index(name) for name in stats_features]]
+
+        groups = {'overall': np.zeros(len(X), dtype=np.int64)}
+        if 'year_of_study' in self.features:
+            groups['year_of_study'] = X[:, self.features.index('year_of_study')].astype(np.int64)
+        if 'family_income' in self.features:
+            groups['income_band'] = band_codes(X[:, self.features.index('family_income')], INCOME_BANDS)
+        for grouping, codes in groups.items():
+            keys, inverse = np.unique(codes, return_inverse=True)
+            members = inverse[None, :] == np.arange(len(keys))[:, None]
+            self._merge(grouping, self._partial(keys, members, values, list(sums), extremes, stats_features))
+        # Provider groups overlap: a student counts towards every provider they qualify for
+        providers = [provider for provider, mask in provider_masks.items() if mask.any()]
+        if providers:
+            members = np.vstack([provider_masks[provider] for provider in providers])
+            self._merge('provider', self._partial(providers, members, values, list(sums), extremes, stats_features))
+
+    @staticmethod
+    def _partial(keys, members, values, sum_names, extremes, extreme_names):
+        """Totals per group from a (groups, rows) membership mask, as a DataFrame indexed by key"""
+        partial = pd.DataFrame(members.astype(np.float64) @ values, index=list(keys), columns=sum_names)
+        for j, name in enumerate(extreme_names):
+            partial[f'{name}:min'] = [extremes[member, j].min() for member in members]
+            partial[f'{name}:max'] = [extremes[member, j].max() for member in members]
+        return partial
+
+    def _merge(self, grouping, partial):
+        previous = self.partials.get(grouping)
+        if previous is not None:
+            how = {column: _how(column) for column in partial.columns}
+            partial = pd.concat([previous, partial]).groupby(level=0, sort=False).agg(how)
+        self.partials[grouping] = partial
+
+    def _stats(self, row):
+        """One group's totals in the /dataset_stats `stats` shape, plus providers and awards"""
+        count = int(row['count'])
+        eligible = int(row['eligible'])
+        stats = {
+            'total_samples': count,
+            'eligible_count': eligible,
+            'not_eligible_count': count - eligible,
+            'eligible_percentage': float(eligible / count * 100) if count else 0.0,
+            'average_eligible_probability': float(row['probability'] / count) if count else 0.0,
+            'features': {
+                name: {
+                    'min': float(row[f'{name}:min']),
+                    'max': float(row[f'{name}:max']),
+                    'mean': float(row[f'{name}:sum'] / count)
+                }
+                for name in STATS_FEATURES if f'{name}:sum' in row
+            },
+            'models': {name: int(row[f'model:{name}']) for name in self.models if f'model:{name}' in row},
+            'providers': {},
+            'distributions': {}
+        }
+        for provider, award in AWARDS.items():
+            provider_count = int(row.get(f'provider:{provider}', 0))
+            stats['providers'][provider] = {
+                'eligible_count': provider_count,
+                'eligible_percentage': float(provider_count / count * 100) if count else 0.0,
+                'award': award,
+                'award_total': provider_count * award
+            }
+        # Every award the group qualifies for; a student eligible for two providers counts twice
+        stats['expected_award_total'] = sum(p['award_total'] for p in stats['providers'].values())
+        for feature, bands in (('cgpa', CGPA_BANDS), ('family_income', INCOME_BANDS)):
+            if f'{feature}_band:{bands[1][0]}' in row:
+                stats['distributions'][feature] = {label: int(row[f'{feature}_band:{label}'])
+                                                   for label in bands[1]}
+        return stats
+
+    def result(self):
+        """The report so far: overall stats and stats per year, income band and provider"""
+        overall = self.partials.get('overall')
+        if overall is None:
+            overall = pd.DataFrame({'count': [0], 'eligible': [0], 'probability': [0.0]})
+        report = {
+            'model_used': self.primary_model,
+            'invalid_rows': self.invalid_rows,
+            'stats': self._stats(overall.iloc[0]),
+            'groups': {grouping: {} for grouping in GROUPINGS}
+        }
+        for grouping in GROUPINGS:
+            partial = self.partials.get(grouping)
+            if partial is None:
+                continue
+            if grouping == 'provider':
+                partial = partial.reindex([provider for provider in AWARDS if provider in partial.index])
+                labels = {provider: provider for provider in partial.index}
+            else:
+                partial = partial.sort_index()
+                names = INCOME_BANDS[1] if grouping == 'income_band' else None
+                labels = {key: names[key] if names else str(key) for key in partial.index}
+            for key in partial.index:
+                report['groups'][grouping][labels[key]] = self._stats(partial.loc[key])
+        return report
+
+
+def report_file(input_path, chunk_size=50000, models_dir='models'):
+    """Stream a cohort file through the models and provider rules and return its report"""
+    registry = ModelRegistry(models_dir)
+    directory = registry.current_dir()
+    if not any(os.path.exists(os.path.join(directory, f)) for f in MODEL_FILES.values()):
+        raise SystemExit('Models not loaded. Please train models first.')
+    models, features = load_model_files(directory)
+
+    report = CohortReport(models, features)
+    for chunk in iter_chunks(input_path, chunk_size):
+        report.add(chunk)
+    return dict(report.result(), model_version=registry.current_version() or model_version(directory))
+
+
+def print_summary(report, out=sys.stderr):
+    """Readable table of the report's groups"""
+    print(f"{'group':<28} {'students':>10} {'eligible':>9} {'rate':>7} {'award total (RM)':>18}", file=out)
+    rows = [('all', report['stats'])]
+    for grouping, groups in report['groups'].items():
+        rows += [(f'{grouping}={key}', stats) for key, stats in groups.items()]
+    for label, stats in rows:
+        print(f"{label:<28} {stats['total_samples']:>10} {stats['eligible_count']:>9} "
+              f"{stats['eligible_percentage']:>6.1f}% {stats['expected_award_total']:>18,}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Grouped eligibility report for a cohort file.')
+    parser.add_argument('input', help='Cohort file (.csv, .npcols or .parquet, scholarship_dataset.csv layout)')
+    parser.add_argument('-o', '--output', default='-', help='Report file (JSON), default stdout')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Rows per chunk (default: 50000)')
+    parser.add_argument('--models-dir', default='models', help='Model registry or directory with trained models')
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    report = report_file(args.input, args.chunk_size, args.models_dir)
+    elapsed = time.time() - start
+
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    print_summary(report)
+    rows = report['stats']['total_samples']
+    print(f"Reported on {rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
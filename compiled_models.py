@@ -0,0 +1,436 @@
+"""
+Array-backed inference engines compiled from fitted scikit-learn models
+
+Usage:
+    python compiled_models.py            # parity check and latency comparison
+    python compiled_models.py --export   # write the memory-mappable bundles
+"""
+import hashlib
+import warnings
+
+import numpy as np
+
+# Memory-mappable bundles of the compiled models sit next to the .pkl files,
+# e.g. random_forest_model.pkl -> random_forest_compiled.joblib
+BUNDLE_SUFFIX = '_compiled.joblib'
+COMPILED_FOREST_FILE = 'random_forest' + BUNDLE_SUFFIX
+
+
+def compiled_filename(model_filename):
+    """Bundle file name for a model file name"""
+    return model_filename.replace('_model.pkl', '') + BUNDLE_SUFFIX
+
+
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier (or a single DecisionTreeClassifier,
+    a forest of one) flattened into contiguous node arrays.
+    All trees are walked together with vectorized NumPy indexing, so a
+    single row costs a handful of array operations per tree level instead
+    of sklearn's per-call validation and per-tree Python dispatch.
+
+    Nodes are numbered breadth-first per tree with siblings side by side
+    (right == left + 1), and leaves point at themselves with an infinite
+    threshold, so one batch step is `left[node] + (x > threshold[node])`.
+    """
+
+    FORMAT = 'compiled-forest-v2'
+    ARRAYS = ('feature', 'threshold', 'left', 'right', 'children', 'value', 'roots', 'classes_')
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, classes,
+                 children=None, n_features_in=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        # Interleaved [left, right] children so one gather picks the next node
+        if children is None:
+            children = np.ascontiguousarray(np.column_stack([left, right]).ravel())
+        self.children = children
+        self.classes_ = classes
+        if n_features_in is None:
+            n_features_in = int(feature.max()) + 1 if len(feature) else 0
+        self.n_features_in_ = int(n_features_in)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Flatten the trees of a fitted sklearn forest or decision tree into shared arrays"""
+        estimators = getattr(forest, 'estimators_', [forest])
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+
+        for estimator in estimators:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+
+            # Breadth-first order, each node's two children next to each other
+            order = [np.array([0])]
+            frontier = order[0]
+            while len(frontier):
+                split = frontier[~is_leaf[frontier]]
+                frontier = np.column_stack([tree.children_left[split], tree.children_right[split]]).ravel()
+                order.append(frontier)
+            order = np.concatenate(order)
+            new_id = np.empty(n_nodes, dtype=np.int64)
+            new_id[order] = np.arange(n_nodes)
+
+            # Leaves point at themselves so every row can take max_depth steps
+            leaf = is_leaf[order]
+            node_ids = np.arange(n_nodes)
+            left = np.where(leaf, node_ids, new_id[np.where(leaf, 0, tree.children_left[order])]) + offset
+            right = np.where(leaf, left, left + 1)
+            feature = np.where(leaf, 0, tree.feature[order])
+            threshold = np.where(leaf, np.inf, tree.threshold[order])
+
+            value = tree.value[order, 0, :]
+            value = value / value.sum(axis=1, keepdims=True)
+
+            features.append(feature)
+            thresholds.append(threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(value)
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        compiled = cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.int32),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.int32),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.int32),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            classes=np.asarray(forest.classes_),
+            n_features_in=forest.n_features_in_
+        )
+        return compiled
+
+    def apply(self, X):
+        """Return the leaf index reached in every tree, shape (n_samples, n_trees)"""
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if X.shape[0] == 1 and len(self.roots) == 1:
+            # Single row through a single tree: scalar steps beat array operations
+            x = X[0]
+            node = int(self.roots[0])
+            for _ in range(self.max_depth):
+                child = int(self.children[2 * node + int(x[self.feature[node]] > self.threshold[node])])
+                if child == node:
+                    break
+                node = child
+            return np.array([[node]])
+
+        if X.shape[0] == 1:
+            # Single row: walk all trees at once with 1-D indexing
+            x = X[0]
+            nodes = self.roots
+            for _ in range(self.max_depth):
+                go_right = x[self.feature[nodes]] > self.threshold[nodes]
+                nodes = self.children[2 * nodes + go_right]
+            return nodes[None, :]
+
+        return self._batch_leaves(X).T
+
+    def _batch_leaves(self, X):
+        """
+        Leaf per tree and row, shape (n_trees, n_samples). Tree-major, so
+        each tree's nodes stay in cache while every row passes through it.
+        The work arrays are allocated once and refilled with flat np.take
+        calls (mode='clip' lets take write into `out` without buffering);
+        fresh temporaries at every level cost more in page faults than the
+        gathers themselves.
+        """
+        n_rows = X.shape[0]
+        size = n_rows * len(self.roots)
+        flat_X = np.ascontiguousarray(X.T).ravel()
+        index_dtype = np.int32 if max(flat_X.size, size) < 2 ** 31 else np.int64
+        feature_offsets = self.feature.astype(index_dtype) * n_rows
+        rows = np.tile(np.arange(n_rows, dtype=index_dtype), len(self.roots))
+
+        nodes = np.repeat(self.roots, n_rows)
+        children = np.empty_like(nodes)
+        index = np.empty(size, dtype=index_dtype)
+        values = np.empty(size, dtype=flat_X.dtype)
+        thresholds = np.empty(size, dtype=self.threshold.dtype)
+        go_right = np.empty(size, dtype=bool)
+        for _ in range(self.max_depth):
+            np.take(feature_offsets, nodes, out=index, mode='clip')
+            np.add(index, rows, out=index)
+            np.take(flat_X, index, out=values, mode='clip')
+            np.take(self.threshold, nodes, out=thresholds, mode='clip')
+            np.greater(values, thresholds, out=go_right)
+            np.take(self.left, nodes, out=children, mode='clip')
+            np.add(children, go_right, out=children)
+            nodes, children = children, nodes
+        return nodes.reshape(len(self.roots), n_rows)
+
+    def predict_proba(self, X):
+        """Average of the per-tree leaf class distributions"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[0] == 1:
+            leaves = self.apply(X)
+            if leaves.shape[1] == 1:
+                return self.value[leaves[:, 0]]
+            return self.value[leaves[0]].mean(axis=0, keepdims=True)
+        leaves = self._batch_leaves(X)
+        if len(leaves) == 1:
+            return self.value[leaves[0]]
+        proba = np.empty((X.shape[0], self.value.shape[1]))
+        leaf_values = np.empty(leaves.shape)
+        for k, column in enumerate(np.ascontiguousarray(self.value.T)):
+            np.take(column, leaves, out=leaf_values, mode='clip')
+            leaf_values.mean(axis=0, out=proba[:, k])
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def to_bundle(self):
+        bundle = {name: getattr(self, name) for name in self.ARRAYS}
+        bundle.update({'max_depth': self.max_depth, 'n_features_in': self.n_features_in_})
+        return bundle
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        # Plain ndarray views of the mapped buffers avoid np.memmap's per-call overhead
+        arrays = {name: np.asarray(bundle[name]) for name in cls.ARRAYS}
+        return cls(
+            feature=arrays['feature'],
+            threshold=arrays['threshold'],
+            left=arrays['left'],
+            right=arrays['right'],
+            value=arrays['value'],
+            roots=arrays['roots'],
+            max_depth=bundle['max_depth'],
+            classes=arrays['classes_'],
+            children=arrays['children'],
+            n_features_in=bundle['n_features_in']
+        )
+
+    def probe_matrix(self, n_rows=512, seed=0):
+        """Random rows spanning every split threshold, used for parity checks"""
+        rng = np.random.default_rng(seed)
+        is_split = self.left != np.arange(len(self.left))
+        columns = []
+        for i in range(self.n_features_in_):
+            thresholds = self.threshold[is_split & (self.feature == i)]
+            low, high = (thresholds.min(), thresholds.max()) if len(thresholds) else (0.0, 1.0)
+            margin = max(1.0, (high - low) * 0.1)
+            columns.append(rng.uniform(low - margin, high + margin, n_rows))
+        return np.column_stack(columns)
+
+
+class CompiledLogisticRegression:
+    """
+    A fitted binary LogisticRegression reduced to its coefficients: one dot
+    product and a sigmoid per row, without sklearn's input validation.
+    """
+
+    FORMAT = 'compiled-logistic-v1'
+    ARRAYS = ('coef', 'intercept', 'classes_')
+
+    def __init__(self, coef, intercept, classes):
+        self.coef = coef
+        self.intercept = intercept
+        self.classes_ = classes
+        self.n_features_in_ = coef.shape[0]
+
+    @classmethod
+    def from_sklearn(cls, model):
+        if model.coef_.shape[0] != 1:
+            raise ValueError('Only binary logistic regression can be compiled')
+        return cls(
+            coef=np.ascontiguousarray(model.coef_[0], dtype=np.float64),
+            intercept=np.asarray(model.intercept_, dtype=np.float64),
+            classes=np.asarray(model.classes_)
+        )
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X @ self.coef + self.intercept[0]
+
+    def predict_proba(self, X):
+        decision = self.decision_function(X)
+        # Numerically stable sigmoid: exp() only ever sees non-positive values
+        z = np.exp(-np.abs(decision))
+        positive = np.where(decision >= 0, 1.0 / (1.0 + z), z / (1.0 + z))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+    def to_bundle(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        arrays = {name: np.asarray(bundle[name]) for name in cls.ARRAYS}
+        return cls(coef=arrays['coef'], intercept=arrays['intercept'], classes=arrays['classes_'])
+
+    def probe_matrix(self, n_rows=512, seed=0):
+        """Random rows over several orders of magnitude, used for parity checks"""
+        rng = np.random.default_rng(seed)
+        scale = 10.0 ** rng.integers(0, 6, (n_rows, self.n_features_in_))
+        return rng.uniform(-1, 1, (n_rows, self.n_features_in_)) * scale
+
+
+COMPILED_TYPES = {compiled_type.FORMAT: compiled_type
+                  for compiled_type in (CompiledForest, CompiledLogisticRegression)}
+
+
+def file_digest(path):
+    """SHA-1 of a file's contents"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compiled_type_for(model):
+    """The compiled engine for a fitted sklearn model, or None if there is none"""
+    name = type(model).__name__
+    if name in ('RandomForestClassifier', 'DecisionTreeClassifier'):
+        return CompiledForest
+    if name == 'LogisticRegression':
+        return CompiledLogisticRegression
+    return None
+
+
+def save_compiled(compiled, path, source_digest=None):
+    """
+    Write a compiled model's arrays as an uncompressed joblib bundle.
+    Uncompressed arrays can be memory-mapped, so every worker process maps
+    the same read-only pages instead of holding its own copy. Loading the
+    bundle needs only NumPy and joblib, not scikit-learn.
+    """
+    import joblib
+
+    bundle = compiled.to_bundle()
+    bundle.update({'format': compiled.FORMAT, 'source_digest': source_digest})
+    feature_names = getattr(compiled, 'feature_names_in_', None)
+    if feature_names is not None:
+        bundle['feature_names'] = [str(name) for name in feature_names]
+    joblib.dump(bundle, path)
+
+
+def load_compiled(path, mmap_mode='r', source_digest=None):
+    """
+    Load a bundle written by save_compiled, memory-mapping its arrays.
+    Raises ValueError if the bundle was built from a different model file.
+    """
+    import joblib
+
+    bundle = joblib.load(path, mmap_mode=mmap_mode)
+    compiled_type = COMPILED_TYPES.get(bundle.get('format'))
+    if compiled_type is None:
+        raise ValueError(f'Unsupported compiled model format in {path}')
+    if source_digest is not None and bundle.get('source_digest') != source_digest:
+        raise ValueError(f'{path} was not built from the current model file')
+    compiled = compiled_type.from_bundle(bundle)
+    if bundle.get('feature_names') is not None:
+        compiled.feature_names_in_ = np.asarray(bundle['feature_names'], dtype=object)
+    return compiled
+
+
+def export_compiled(model_path, bundle_path, model=None):
+    """Compile the model saved at model_path and write its bundle"""
+    import joblib
+
+    if model is None:
+        model = joblib.load(model_path)
+    compiled = compile_model(model)
+    save_compiled(compiled, bundle_path, source_digest=file_digest(model_path))
+    return compiled
+
+
+def check_parity(model, compiled, X, atol=1e-9):
+    """
+    Compare predict_proba of the compiled engine against the original model.
+    Returns the maximum absolute difference; raises ValueError above `atol`.
+    """
+    with warnings.catch_warnings():
+        # Probe rows are plain arrays; models fitted on DataFrames warn about it
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        expected = model.predict_proba(X)
+    actual = compiled.predict_proba(X)
+    max_diff = float(np.abs(expected - actual).max()) if len(X) else 0.0
+    if max_diff > atol:
+        raise ValueError(f'Compiled model differs from original by {max_diff:.3g} (atol={atol:.3g})')
+    return max_diff
+
+
+def compile_model(model, verify=True):
+    """Compile a fitted model, optionally verifying parity on probe rows"""
+    compiled_type = compiled_type_for(model)
+    if compiled_type is None:
+        raise ValueError(f'No compiled engine for {type(model).__name__}')
+    compiled = compiled_type.from_sklearn(model)
+    # Kept so the serving schema can check the training column order
+    if hasattr(model, 'feature_names_in_'):
+        compiled.feature_names_in_ = np.asarray(model.feature_names_in_, dtype=object)
+    if verify:
+        check_parity(model, compiled, compiled.probe_matrix())
+    return compiled
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import time
+    import joblib
+    from dataset_io import read_dataset
+
+    parser = argparse.ArgumentParser(description='Check or export the compiled models.')
+    parser.add_argument('--export', action='store_true', help='Write the memory-mappable model bundles')
+    parser.add_argument('--models-dir', default='models', help='Model registry or directory with trained models')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+    from registry import ModelRegistry
+    models_dir = ModelRegistry(args.models_dir).current_dir()
+    dataset = read_dataset('scholarship_dataset.csv')
+
+    def timed(fn, rows, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn(rows)
+        return (time.perf_counter() - start) / repeat
+
+    for filename in ('logistic_regression_model.pkl', 'decision_tree_model.pkl', 'random_forest_model.pkl'):
+        model_path = os.path.join(models_dir, filename)
+        if not os.path.exists(model_path):
+            continue
+        model = joblib.load(model_path)
+        print(f"{type(model).__name__} ({filename})")
+        if args.export:
+            bundle_path = os.path.join(models_dir, compiled_filename(filename))
+            export_compiled(model_path, bundle_path, model)
+            print(f"  Compiled model saved to {bundle_path}")
+        compiled = compiled_type_for(model).from_sklearn(model)
+
+        X = dataset[list(model.feature_names_in_)].to_numpy(dtype=float)
+        print(f"  Parity on dataset ({len(X)} rows): max |diff| = {check_parity(model, compiled, X):.3g}")
+        print(f"  Parity on probe rows: max |diff| = "
+              f"{check_parity(model, compiled, compiled.probe_matrix()):.3g}")
+
+        for label, rows, repeat in [('single row', X[:1], 200), ('batch of 2000', X, 10)]:
+            sklearn_time = timed(model.predict_proba, rows, repeat)
+            compiled_time = timed(compiled.predict_proba, rows, repeat)
+            print(f"  {label}: sklearn {sklearn_time * 1000:.3f} ms, compiled {compiled_time * 1000:.3f} ms "
+                  f"({sklearn_time / compiled_time:.1f}x)")
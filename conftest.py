@@ -0,0 +1,38 @@
+"""Shared pytest fixtures: the Flask app with its state kept out of the working tree"""
+import os
+import tempfile
+
+import pytest
+
+# app.py reads its settings when it is imported
+STATE_DIR = tempfile.mkdtemp(prefix='scholarship-tests-')
+os.environ.setdefault('JOBS_DIR', os.path.join(STATE_DIR, 'jobs'))
+os.environ.setdefault('MODEL_POLL_INTERVAL', '0')
+
+# The manual scripts need a running server and the requests package
+collect_ignore = ['test_endpoint.py', 'test_multiple_inputs.py']
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    app_module.prediction_cache.clear()
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def student():
+    """A valid /predict body"""
+    return {
+        'year_of_study': 2,
+        'cgpa': 3.5,
+        'family_income': 40000,
+        'cocurricular_score': 80,
+        'leadership_positions': 3,
+        'community_service_hours': 60
+    }
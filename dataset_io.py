@@ -0,0 +1,242 @@
+"""
+Typed, columnar storage for the scholarship dataset
+
+Formats, chosen from the path:
+    *.csv       text, parsed with the compact dtypes below
+    *.npcols    directory with one memory-mappable .npy file per column (NumPy only)
+    *.parquet   compressed columnar file (requires pyarrow)
+
+Usage:
+    python dataset_io.py scholarship_dataset.csv scholarship_dataset.npcols   # convert
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+# Smallest dtypes that hold the generator's value ranges, used on disk
+DATASET_DTYPES = {
+    'year_of_study': np.int8,             # 1-4
+    'cgpa': np.float32,                   # 2.00-4.00
+    'family_income': np.int32,            # RM 0-150,000
+    'cocurricular_score': np.int8,        # 0-100
+    'leadership_positions': np.int8,      # 0-5
+    'community_service_hours': np.int16,  # 0-200
+    'eligible': np.int8
+}
+
+# Float columns rounded to this many decimals by the generator. They are
+# loaded as float64 and re-rounded, so float32 storage error cannot move a
+# value across a rule threshold such as cgpa >= 3.5.
+DECIMALS = {'cgpa': 2}
+
+NPCOLS_SUFFIX = '.npcols'
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+META_FILE = 'meta.json'
+
+
+def dataset_format(path):
+    lowered = path.lower().rstrip('/')
+    if lowered.endswith(NPCOLS_SUFFIX):
+        return 'npcols'
+    if lowered.endswith(PARQUET_SUFFIXES):
+        return 'parquet'
+    return 'csv'
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_dataset(path):
+    """
+    For a CSV path, the columnar copy next to it (same name, .npcols or
+    .parquet) when one exists and is at least as new; otherwise the path itself.
+    """
+    if dataset_format(path) != 'csv':
+        return path
+    stem = os.path.splitext(path)[0]
+    try:
+        csv_mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        csv_mtime = None
+    for suffix in (NPCOLS_SUFFIX, '.parquet'):
+        candidate = stem + suffix
+        if suffix == '.parquet' and not _has_pyarrow():
+            continue
+        if os.path.exists(candidate) and (csv_mtime is None or os.stat(candidate).st_mtime >= csv_mtime):
+            return candidate
+    return path
+
+
+def compact_dtypes(df):
+    """Cast known columns to their compact dtypes (in place), returns df"""
+    for name, dtype in DATASET_DTYPES.items():
+        if name in df and df[name].dtype != dtype:
+            df[name] = df[name].astype(dtype)
+    return df
+
+
+def restore_decimals(df):
+    """Turn float32 columns listed in DECIMALS back into exact float64 values (in place), returns df"""
+    for name, decimals in DECIMALS.items():
+        if name in df and df[name].dtype == np.float32:
+            df[name] = np.round(df[name].to_numpy(dtype=np.float64), decimals)
+    return df
+
+
+def read_dataset(path, columns=None, resolve=True):
+    """
+    Load the dataset as a DataFrame with compact integer dtypes. `columns` limits
+    what is read (student_id is the costliest column and rarely needed).
+    With `resolve`, a CSV path is served from its columnar copy if present.
+    """
+    import pandas as pd
+
+    if resolve:
+        path = resolve_dataset(path)
+    file_format = dataset_format(path)
+
+    if file_format == 'npcols':
+        return next(iter_npcols(path, columns=columns))
+
+    if file_format == 'parquet':
+        try:
+            return restore_decimals(compact_dtypes(pd.read_parquet(path, columns=columns)))
+        except ImportError:
+            raise SystemExit('Reading Parquet files requires pyarrow (pip install pyarrow).')
+
+    dtypes = {name: np.float64 if name in DECIMALS else dtype for name, dtype in DATASET_DTYPES.items()
+              if columns is None or name in columns}
+    return pd.read_csv(path, usecols=columns, dtype=dtypes)
+
+
+def iter_npcols(path, chunk_size=None, columns=None):
+    """Yield DataFrames of up to `chunk_size` rows (all rows if None) from a .npcols directory"""
+    import pandas as pd
+
+    with open(os.path.join(path, META_FILE), 'r') as f:
+        meta = json.load(f)
+    names = columns or meta['columns']
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in names}
+    rows = meta['rows']
+    chunk_size = chunk_size or max(rows, 1)
+    for start in range(0, max(rows, 1), chunk_size):
+        data = {}
+        for name, array in arrays.items():
+            values = array[start:start + chunk_size]
+            # Identifiers are stored as fixed-width bytes
+            data[name] = values.astype(str).astype(object) if values.dtype.kind == 'S' else np.array(values)
+        yield restore_decimals(pd.DataFrame(data, columns=names))
+
+
+def iter_dataset(path, chunk_size, columns=None, resolve=True):
+    """Yield DataFrames of up to `chunk_size` rows, in file order, with the read_dataset dtypes"""
+    import pandas as pd
+
+    if resolve:
+        path = resolve_dataset(path)
+    file_format = dataset_format(path)
+
+    if file_format == 'npcols':
+        yield from iter_npcols(path, chunk_size, columns=columns)
+    elif file_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit('Reading Parquet files requires pyarrow (pip install pyarrow).')
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield restore_decimals(compact_dtypes(batch.to_pandas()))
+    else:
+        dtypes = {name: np.float64 if name in DECIMALS else dtype for name, dtype in DATASET_DTYPES.items()
+                  if columns is None or name in columns}
+        yield from pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunk_size)
+
+
+def _replace_dir(staging, path):
+    """Move a finished staging directory to `path`, replacing any older copy"""
+    if os.path.exists(path):
+        old = f'{path}.old-{os.getpid()}'
+        os.rename(path, old)
+        os.rename(staging, path)
+        shutil.rmtree(old)
+    else:
+        os.rename(staging, path)
+
+
+class ColumnWriter:
+    """
+    Writes a dataset of known length into a .npcols directory block by
+    block. Columns are preallocated .npy files; the directory appears
+    under its final name only after close().
+    """
+
+    def __init__(self, path, rows, columns, id_width=16):
+        self.path = path.rstrip('/')
+        self.rows = rows
+        self.columns = list(columns)
+        self.staging = f'{self.path}.tmp-{os.getpid()}'
+        if os.path.exists(self.staging):
+            shutil.rmtree(self.staging)
+        os.makedirs(self.staging)
+        self.arrays = {}
+        for name in self.columns:
+            dtype = DATASET_DTYPES.get(name, f'S{id_width}')
+            self.arrays[name] = np.lib.format.open_memmap(
+                os.path.join(self.staging, f'{name}.npy'), mode='w+', dtype=dtype, shape=(rows,))
+
+    def write(self, start, df):
+        for name, array in self.arrays.items():
+            values = df[name].to_numpy()
+            if array.dtype.kind == 'S':
+                values = values.astype(str)
+            array[start:start + len(df)] = values
+
+    def close(self):
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays = {}
+        with open(os.path.join(self.staging, META_FILE), 'w') as f:
+            json.dump({'rows': self.rows, 'columns': self.columns}, f)
+        _replace_dir(self.staging, self.path)
+
+
+def write_dataset(df, path):
+    """Write a DataFrame in the format chosen by the path, with compact dtypes"""
+    df = compact_dtypes(df.copy())
+    file_format = dataset_format(path)
+    if file_format == 'npcols':
+        id_width = int(df['student_id'].str.len().max()) if 'student_id' in df and len(df) else 16
+        writer = ColumnWriter(path, len(df), list(df.columns), id_width=id_width)
+        writer.write(0, df)
+        writer.close()
+    elif file_format == 'parquet':
+        try:
+            df.to_parquet(path, index=False)
+        except ImportError:
+            raise SystemExit('Writing Parquet files requires pyarrow (pip install pyarrow).')
+    else:
+        df.to_csv(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert the dataset between CSV, .npcols and Parquet.')
+    parser.add_argument('input', help='Source dataset (.csv, .npcols or .parquet)')
+    parser.add_argument('output', help='Destination dataset; the format follows the extension')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    df = read_dataset(args.input, resolve=False)
+    write_dataset(df, args.output)
+    print(f"Wrote {len(df)} rows to {args.output} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
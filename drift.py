@@ -0,0 +1,368 @@
+"""
+Streaming statistics of live inputs and drift scores against the training data
+
+Usage:
+    python drift.py                  # write models/reference_stats.json from the dataset
+"""
+import bisect
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+REFERENCE_FILE = 'reference_stats.json'
+
+# Population Stability Index thresholds commonly used for drift alerts
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Probability bins for the eligible-probability histogram
+PROBABILITY_EDGES = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def build_reference(df, features, bins=10, label='eligible'):
+    """
+    Summarize the training data: per-feature mean, standard deviation and a
+    histogram over (up to) `bins` quantile bins. Live traffic is binned on
+    the same edges so the two distributions can be compared.
+    """
+    reference = {'count': int(len(df)), 'features': {}}
+    for name in features:
+        values = df[name].to_numpy(dtype=float)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])).tolist()
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        reference['features'][name] = {
+            'mean': float(values.mean()),
+            'std': float(values.std()),
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'edges': edges,
+            'histogram': counts.tolist()
+        }
+    if label in df:
+        reference['eligible_rate'] = float(df[label].mean())
+    return reference
+
+
+def load_reference(models_dir):
+    """The reference statistics saved next to the models, or None"""
+    path = os.path.join(models_dir, REFERENCE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class RunningStats:
+    """
+    Constant-memory statistics of several columns: count, mean and variance
+    (Welford's algorithm, merged batch-wise), min, max and a histogram
+    over fixed bin edges per column.
+    """
+
+    def __init__(self, edges):
+        self.edges = [np.asarray(e, dtype=float) for e in edges]
+        self._edge_lists = [e.tolist() for e in self.edges]
+        n_columns = len(self.edges)
+        self.count = 0
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+        self.histograms = [np.zeros(len(e) + 1, dtype=np.int64) for e in self.edges]
+
+    def update(self, X):
+        """Add a batch of rows, shape (n, n_columns)"""
+        X = np.asarray(X, dtype=float)
+        n = X.shape[0]
+        if n == 0:
+            return
+        if n == 1:
+            # Single /predict requests: plain Welford step and scalar bin lookups
+            row = X[0]
+            self.count += 1
+            delta = row - self.mean
+            self.mean = self.mean + delta / self.count
+            self.m2 = self.m2 + delta * (row - self.mean)
+            np.minimum(self.min, row, out=self.min)
+            np.maximum(self.max, row, out=self.max)
+            for histogram, edges, value in zip(self.histograms, self._edge_lists, row.tolist()):
+                histogram[bisect.bisect_right(edges, value)] += 1
+            return
+        batch_mean = X.mean(axis=0)
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0)
+        self._merge_moments(n, batch_mean, batch_m2)
+        np.minimum(self.min, X.min(axis=0), out=self.min)
+        np.maximum(self.max, X.max(axis=0), out=self.max)
+        for histogram, edges, column in zip(self.histograms, self.edges, X.T):
+            histogram += np.bincount(np.searchsorted(edges, column, side='right'), minlength=len(histogram))
+
+    def _merge_moments(self, n, mean, m2):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + m2 + delta ** 2 * (self.count * n / total)
+        self.count = total
+
+    def merge(self, other):
+        """Fold another RunningStats over the same edges into this one"""
+        if other.count == 0:
+            return
+        self._merge_moments(other.count, other.mean, other.m2)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        for mine, theirs in zip(self.histograms, other.histograms):
+            mine += theirs
+
+    def std(self):
+        return np.sqrt(self.m2 / self.count) if self.count else np.zeros_like(self.m2)
+
+    def quantiles(self, column, qs=QUANTILES):
+        """
+        Approximate quantiles from the histogram, interpolating linearly
+        within a bin; the open outer bins are bounded by the observed min/max.
+        """
+        counts = self.histograms[column]
+        if self.count == 0:
+            return {}
+        bounds = np.concatenate([[self.min[column]], self.edges[column], [self.max[column]]])
+        bounds = np.clip(bounds, self.min[column], self.max[column])
+        cumulative = np.concatenate([[0], np.cumsum(counts)])
+        result = {}
+        for q in qs:
+            target = q * self.count
+            i = min(int(np.searchsorted(cumulative, target, side='left')), len(counts)) - 1
+            i = max(i, 0)
+            within = (target - cumulative[i]) / counts[i] if counts[i] else 0.0
+            result[f'p{int(q * 100)}'] = float(bounds[i] + within * (bounds[i + 1] - bounds[i]))
+        return result
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.mean.tolist(),
+            'm2': self.m2.tolist(),
+            'min': self.min.tolist(),
+            'max': self.max.tolist(),
+            'histograms': [h.tolist() for h in self.histograms]
+        }
+
+    @classmethod
+    def from_dict(cls, edges, data):
+        stats = cls(edges)
+        stats.count = data['count']
+        stats.mean = np.asarray(data['mean'], dtype=float)
+        stats.m2 = np.asarray(data['m2'], dtype=float)
+        stats.min = np.asarray(data['min'], dtype=float)
+        stats.max = np.asarray(data['max'], dtype=float)
+        stats.histograms = [np.asarray(h, dtype=np.int64) for h in data['histograms']]
+        return stats
+
+
+def psi(expected_counts, actual_counts, epsilon=1e-4):
+    """Population Stability Index between two histograms over the same bins"""
+    expected = np.asarray(expected_counts, dtype=float)
+    actual = np.asarray(actual_counts, dtype=float)
+    expected = np.maximum(expected / expected.sum(), epsilon)
+    actual = np.maximum(actual / actual.sum(), epsilon)
+    return float(((actual - expected) * np.log(actual / expected)).sum())
+
+
+def drift_status(score):
+    if score >= PSI_SIGNIFICANT:
+        return 'significant'
+    if score >= PSI_MODERATE:
+        return 'moderate'
+    return 'stable'
+
+
+def pid_alive(pid):
+    """Whether a process with this pid is running (assumed so where it cannot be checked)"""
+    # os.kill(pid, 0) would terminate the process on Windows
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running, as another user
+        return True
+    return True
+
+
+class DriftMonitor:
+    """
+    Live input and prediction statistics for one model version.
+
+    Each worker process keeps its own monitor. With `directory` set, a
+    snapshot is written there at most every `flush_interval` seconds, and
+    report() merges the snapshots of every live worker serving the same
+    version. Snapshots are named by pid; those of processes that have
+    exited are left out, however long ago a live worker last wrote its own.
+    """
+
+    def __init__(self, reference, features, model_version, directory=None, flush_interval=10.0):
+        self.reference = reference
+        self.features = list(features)
+        self.model_version = model_version
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.inputs = RunningStats([reference['features'][name]['edges'] for name in self.features])
+        self.probabilities = RunningStats([PROBABILITY_EDGES])
+        self.eligible = 0
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def observe(self, X, eligible_probability=None, predictions=None):
+        """Record a batch of inputs (n, n_features) and, optionally, the model outputs"""
+        with self._lock:
+            self.inputs.update(X)
+            if eligible_probability is not None:
+                self.probabilities.update(np.asarray(eligible_probability, dtype=float).reshape(-1, 1))
+            if predictions is not None:
+                self.eligible += int(np.sum(predictions))
+            due = self.directory and time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def _snapshot(self):
+        with self._lock:
+            return {
+                'model_version': self.model_version,
+                'inputs': self.inputs.to_dict(),
+                'probabilities': self.probabilities.to_dict(),
+                'eligible': self.eligible
+            }
+
+    def _snapshot_path(self, pid=None):
+        return os.path.join(self.directory, f'{pid or os.getpid()}.json')
+
+    def _snapshots(self):
+        """Paths of the snapshot files written by other workers that are still running"""
+        own = os.path.basename(self._snapshot_path())
+        try:
+            filenames = os.listdir(self.directory)
+        except OSError:
+            return []
+        paths = []
+        for filename in filenames:
+            pid, ext = os.path.splitext(filename)
+            if ext != '.json' or filename == own or not pid.isdigit() or not pid_alive(int(pid)):
+                continue
+            paths.append(os.path.join(self.directory, filename))
+        return paths
+
+    def flush(self):
+        """Write this worker's snapshot atomically"""
+        self._last_flush = time.monotonic()
+        path = self._snapshot_path()
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self._snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write drift snapshot: {e}")
+
+    def merged(self):
+        """This worker's statistics merged with the other workers' latest snapshots"""
+        snapshot = self._snapshot()
+        inputs = RunningStats.from_dict(self.inputs.edges, snapshot['inputs'])
+        probabilities = RunningStats.from_dict(self.probabilities.edges, snapshot['probabilities'])
+        eligible = snapshot['eligible']
+        workers = 1
+        if self.directory:
+            for path in self._snapshots():
+                try:
+                    with open(path, 'r') as f:
+                        other = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if other.get('model_version') != self.model_version:
+                    continue
+                inputs.merge(RunningStats.from_dict(self.inputs.edges, other['inputs']))
+                probabilities.merge(RunningStats.from_dict(self.probabilities.edges, other['probabilities']))
+                eligible += other['eligible']
+                workers += 1
+        return inputs, probabilities, eligible, workers
+
+    def scores(self):
+        """PSI per feature for this worker's traffic only (empty before any request)"""
+        with self._lock:
+            if self.inputs.count == 0:
+                return {}
+            return {name: psi(self.reference['features'][name]['histogram'], self.inputs.histograms[i])
+                    for i, name in enumerate(self.features)}
+
+    def report(self):
+        """Live statistics next to the training statistics, with a drift score per feature"""
+        inputs, probabilities, eligible, workers = self.merged()
+        std = inputs.std()
+        features = {}
+        for i, name in enumerate(self.features):
+            reference = self.reference['features'][name]
+            entry = {
+                'reference': {key: reference[key] for key in ('mean', 'std', 'min', 'max', 'histogram')},
+                'edges': reference['edges']
+            }
+            if inputs.count:
+                score = psi(reference['histogram'], inputs.histograms[i])
+                entry['live'] = {
+                    'mean': float(inputs.mean[i]),
+                    'std': float(std[i]),
+                    'min': float(inputs.min[i]),
+                    'max': float(inputs.max[i]),
+                    'quantiles': inputs.quantiles(i),
+                    'histogram': inputs.histograms[i].tolist()
+                }
+                entry['psi'] = score
+                entry['mean_shift_std'] = (float((inputs.mean[i] - reference['mean']) / reference['std'])
+                                           if reference['std'] else 0.0)
+                entry['status'] = drift_status(score)
+            features[name] = entry
+
+        predictions = {'count': probabilities.count}
+        if probabilities.count:
+            predictions.update({
+                'eligible_rate': eligible / probabilities.count,
+                'mean_eligible_probability': float(probabilities.mean[0]),
+                'probability_edges': PROBABILITY_EDGES,
+                'probability_histogram': probabilities.histograms[0].tolist()
+            })
+        if 'eligible_rate' in self.reference:
+            predictions['reference_eligible_rate'] = self.reference['eligible_rate']
+
+        return {
+            'model_version': self.model_version,
+            'observations': inputs.count,
+            'workers': workers,
+            'reference_count': self.reference['count'],
+            'features': features,
+            'predictions': predictions
+        }
+
+
+if __name__ == '__main__':
+    import argparse
+    from dataset_io import read_dataset
+
+    parser = argparse.ArgumentParser(description='Write reference statistics for drift monitoring.')
+    parser.add_argument('--data', default='scholarship_dataset.csv', help='Training dataset')
+    parser.add_argument('--models-dir', default='models', help='Model registry or directory with trained models')
+    args = parser.parse_args()
+
+    from registry import ModelRegistry
+    models_dir = ModelRegistry(args.models_dir).current_dir()
+    with open(os.path.join(models_dir, 'features.json'), 'r') as f:
+        features = json.load(f)
+    path = os.path.join(models_dir, REFERENCE_FILE)
+    with open(path, 'w') as f:
+        json.dump(build_reference(read_dataset(args.data), features), f, indent=2)
+    print(f"Reference statistics saved to {path}")
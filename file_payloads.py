@@ -0,0 +1,59 @@
+"""
+Precomputed JSON payloads derived from files on disk
+"""
+import hashlib
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+
+PayloadSnapshot = namedtuple('PayloadSnapshot', ['body', 'etag', 'last_modified'])
+
+
+class FilePayload:
+    """
+    A response body computed from a source file on first use and served
+    from memory afterwards. The body is rebuilt automatically when the
+    file's modification time or size changes.
+    """
+
+    def __init__(self, path, builder, serializer):
+        self.path = path
+        self.builder = builder
+        self.serializer = serializer
+        self._lock = threading.Lock()
+        self._signature = None
+        self._snapshot = None
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self):
+        """
+        Return the current PayloadSnapshot, or None if the file is missing.
+        Exceptions raised by the builder propagate to the caller.
+        """
+        signature = self._stat_signature()
+        if signature is None:
+            return None
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    self._rebuild(signature)
+        return self._snapshot
+
+    def _rebuild(self, signature):
+        body = self.serializer(self.builder(self.path))
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self._snapshot = PayloadSnapshot(
+            body=body,
+            etag=hashlib.sha1(body).hexdigest(),
+            # HTTP dates have one-second resolution
+            last_modified=datetime.fromtimestamp(signature[0] // 1_000_000_000, tz=timezone.utc)
+        )
+        self._signature = signature
@@ -1,96 +1,243 @@
 """
 Generate synthetic dataset for Scholarship Eligibility System
+
+Usage:
+    python generate_dataset.py                                   # 2,000 rows
+    python generate_dataset.py --rows 10000000 -o big.csv --workers 0
+    python generate_dataset.py --rows 1000000 --eligible-rate 0.5 -o balanced.parquet  # needs pyarrow (optional)
+    python generate_dataset.py --rows 10000000 -o big.npcols      # typed columns, no extra dependencies
 """
-import pandas as pd
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
-import random
+import pandas as pd
 
-# Set random seed for reproducibility
-np.random.seed(42)
-random.seed(42)
+from dataset_io import DATASET_DTYPES, ColumnWriter, dataset_format, read_dataset
 
-# Number of samples
-n_samples = 2000
+# Rows are generated in fixed-size blocks, each with its own random stream
+# derived from the seed, so output is identical for a given seed whatever
+# the number of workers.
+BLOCK_ROWS = 1_000_000
 
-# Generate synthetic data
-data = []
 
-for i in range(n_samples):
+def draw_students(rng, n, positive_noise=0.05, negative_noise=0.05):
+    """Draw every column and evaluate the eligibility rules as array operations"""
     # Year of study (1-4)
-    year_of_study = random.randint(1, 4)
-    
-    # CGPA (2.0 to 4.0)
-    cgpa = round(np.random.normal(3.2, 0.5), 2)
-    cgpa = max(2.0, min(4.0, cgpa))  # Clamp between 2.0 and 4.0
-    
+    year_of_study = rng.integers(1, 5, n, dtype=np.int8)
+
+    # CGPA (2.0 to 4.0), clamped
+    cgpa = np.clip(np.round(rng.normal(3.2, 0.5, n), 2), 2.0, 4.0)
+
     # Family income (RM 0 to RM 150,000 per year)
-    family_income = random.randint(0, 150000)
-    
+    family_income = rng.integers(0, 150001, n, dtype=np.int32)
+
     # Co-curricular score (0-100)
-    cocurricular_score = random.randint(0, 100)
-    
-    # Additional features
+    cocurricular_score = rng.integers(0, 101, n, dtype=np.int16)
+
     # Number of leadership positions
-    leadership_positions = random.randint(0, 5)
-    
+    leadership_positions = rng.integers(0, 6, n, dtype=np.int8)
+
     # Community service hours
-    community_service_hours = random.randint(0, 200)
-    
-    # Determine eligibility based on rules
+    community_service_hours = rng.integers(0, 201, n, dtype=np.int16)
+
     # Scholarship eligibility rules (simplified):
-    eligible = False
-    
-    # Rule 1: High CGPA scholarship (CGPA >= 3.5, income < 50000)
-    if cgpa >= 3.5 and family_income < 50000:
-        eligible = True
-    
-    # Rule 2: Merit scholarship (CGPA >= 3.7, any income)
-    if cgpa >= 3.7:
-        eligible = True
-    
-    # Rule 3: Need-based scholarship (income < 30000, CGPA >= 2.5)
-    if family_income < 30000 and cgpa >= 2.5:
-        eligible = True
-    
-    # Rule 4: Excellence scholarship (CGPA >= 3.8, cocurricular >= 70)
-    if cgpa >= 3.8 and cocurricular_score >= 70:
-        eligible = True
-    
-    # Rule 5: Well-rounded scholarship (CGPA >= 3.0, cocurricular >= 80, leadership >= 2)
-    if cgpa >= 3.0 and cocurricular_score >= 80 and leadership_positions >= 2:
-        eligible = True
-    
-    # Rule 6: Community service scholarship (service >= 100 hours, CGPA >= 2.8)
-    if community_service_hours >= 100 and cgpa >= 2.8:
-        eligible = True
-    
-    # Add some noise - 5% chance of eligibility even if rules don't match
-    if random.random() < 0.05:
-        eligible = True
-    
-    # 5% chance of not being eligible even if rules match (edge cases)
-    if random.random() < 0.05 and eligible:
-        eligible = False
-    
-    data.append({
-        'student_id': f'STU{i+1:04d}',
+    eligible = (
+        # Rule 1: High CGPA scholarship (CGPA >= 3.5, income < 50000)
+        ((cgpa >= 3.5) & (family_income < 50000)) |
+        # Rule 2: Merit scholarship (CGPA >= 3.7, any income)
+        (cgpa >= 3.7) |
+        # Rule 3: Need-based scholarship (income < 30000, CGPA >= 2.5)
+        ((family_income < 30000) & (cgpa >= 2.5)) |
+        # Rule 4: Excellence scholarship (CGPA >= 3.8, cocurricular >= 70)
+        ((cgpa >= 3.8) & (cocurricular_score >= 70)) |
+        # Rule 5: Well-rounded scholarship (CGPA >= 3.0, cocurricular >= 80, leadership >= 2)
+        ((cgpa >= 3.0) & (cocurricular_score >= 80) & (leadership_positions >= 2)) |
+        # Rule 6: Community service scholarship (service >= 100 hours, CGPA >= 2.8)
+        ((community_service_hours >= 100) & (cgpa >= 2.8))
+    )
+
+    # Add some noise - chance of eligibility even if rules don't match
+    eligible |= rng.random(n) < positive_noise
+
+    # Chance of not being eligible even if rules match (edge cases)
+    eligible &= ~(rng.random(n) < negative_noise)
+
+    return {
         'year_of_study': year_of_study,
         'cgpa': cgpa,
         'family_income': family_income,
         'cocurricular_score': cocurricular_score,
         'leadership_positions': leadership_positions,
         'community_service_hours': community_service_hours,
-        'eligible': 1 if eligible else 0
-    })
+        'eligible': eligible
+    }
+
+
+def draw_balanced(rng, n, eligible_rate, positive_noise=0.05, negative_noise=0.05):
+    """
+    n students of whom round(eligible_rate * n) are eligible, by rejection
+    sampling: students are drawn in batches and each class keeps its rows
+    until its quota is full. Every label still comes from the rules and
+    noise of its own row, so the features of each class keep their
+    distribution; only the class proportions change.
+    """
+    quotas = {True: round(eligible_rate * n), False: n - round(eligible_rate * n)}
+    if quotas[True] and negative_noise >= 1:
+        raise ValueError('No student can be eligible with --negative-noise 1')
+    if quotas[False] and positive_noise >= 1 and negative_noise <= 0:
+        raise ValueError('Every student is eligible with --positive-noise 1 and --negative-noise 0')
+
+    parts = []
+    while quotas[True] or quotas[False]:
+        columns = draw_students(rng, n, positive_noise, negative_noise)
+        eligible = columns['eligible']
+        keep = ((eligible & (np.cumsum(eligible) <= quotas[True]))
+                | (~eligible & (np.cumsum(~eligible) <= quotas[False])))
+        parts.append({name: column[keep] for name, column in columns.items()})
+        kept = int(np.count_nonzero(eligible & keep))
+        quotas = {True: quotas[True] - kept, False: quotas[False] - (int(np.count_nonzero(keep)) - kept)}
+
+    # Later batches only fill the rarer class; shuffle so classes are spread over the block
+    order = rng.permutation(n)
+    return {name: np.concatenate([part[name] for part in parts])[order] for name in parts[0]}
+
+
+def generate_block(block, start, stop, seed, positive_noise=0.05, negative_noise=0.05,
+                   eligible_rate=None):
+    """One block of students, optionally resampled by class to `eligible_rate`"""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+    n = stop - start
+
+    if eligible_rate is None or n == 0:
+        columns = draw_students(rng, n, positive_noise, negative_noise)
+    else:
+        columns = draw_balanced(rng, n, eligible_rate, positive_noise, negative_noise)
+
+    ids = np.arange(start + 1, stop + 1).astype(str).astype(object)
+    short = ids[:max(0, min(n, 999 - start))]
+    ids[:len(short)] = [value.zfill(4) for value in short]
+
+    columns['eligible'] = columns['eligible'].astype(np.int8)
+    return pd.DataFrame({'student_id': 'STU' + pd.Series(ids), **columns})
+
+
+def _csv_block(args):
+    """Generate one block and render it as CSV text (runs in worker processes)"""
+    block, start, stop, options, header = args
+    df = generate_block(block, start, stop, **options)
+    return df.to_csv(index=False, header=header), len(df), int(df['eligible'].sum())
+
+
+def generate(rows, output, seed=42, workers=1, output_format=None, **options):
+    """
+    Write `rows` rows to `output` block by block. CSV formatting, the slow
+    part, can be spread over `workers` processes; blocks are written in order.
+    Returns (rows, eligible_count).
+    """
+    if output_format is None:
+        output_format = dataset_format(output)
+
+    blocks = [(block, start, min(start + BLOCK_ROWS, rows))
+              for block, start in enumerate(range(0, rows, BLOCK_ROWS))]
+    eligible_count = 0
+
+    if output_format == 'npcols':
+        # 'STU' plus the zero-padded row number
+        id_width = 3 + max(4, len(str(rows)))
+        writer = ColumnWriter(output, rows, ['student_id'] + list(DATASET_DTYPES), id_width=id_width)
+        for block, start, stop in blocks:
+            df = generate_block(block, start, stop, seed, **options)
+            writer.write(start, df)
+            eligible_count += int(df['eligible'].sum())
+        writer.close()
+        return rows, eligible_count
+
+    if output_format == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit('Writing Parquet files requires pyarrow (pip install pyarrow).')
+        writer = None
+        try:
+            for block, start, stop in blocks:
+                df = generate_block(block, start, stop, seed, **options)
+                table = pa.Table.from_pandas(df.astype(DATASET_DTYPES), preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output, table.schema)
+                writer.write_table(table)
+                eligible_count += int(df['eligible'].sum())
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows, eligible_count
+
+    tasks = [(block, start, stop, dict(options, seed=seed), block == 0) for block, start, stop in blocks]
+    with open(output, 'w', newline='') as f:
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # Keep at most workers * 2 rendered blocks in memory
+                pending = deque()
+                for task in tasks:
+                    pending.append(pool.submit(_csv_block, task))
+                    while len(pending) >= workers * 2:
+                        text, _, eligible = pending.popleft().result()
+                        f.write(text)
+                        eligible_count += eligible
+                while pending:
+                    text, _, eligible = pending.popleft().result()
+                    f.write(text)
+                    eligible_count += eligible
+        else:
+            for task in tasks:
+                text, _, eligible = _csv_block(task)
+                f.write(text)
+                eligible_count += eligible
+    return rows, eligible_count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic scholarship dataset.')
+    parser.add_argument('--rows', type=int, default=2000, help='Number of students (default: 2000)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('-o', '--output', default='scholarship_dataset.csv',
+                        help='Output .csv, .parquet or .npcols (directory of .npy columns)')
+    parser.add_argument('--format', choices=['csv', 'parquet', 'npcols'], help='Output format (default: from extension)')
+    parser.add_argument('--positive-noise', type=float, default=0.05,
+                        help='Chance a student is eligible even if no rule matches (default: 0.05)')
+    parser.add_argument('--negative-noise', type=float, default=0.05,
+                        help='Chance an eligible student is marked not eligible (default: 0.05)')
+    parser.add_argument('--eligible-rate', type=float, default=None,
+                        help='Target share of eligible students, e.g. 0.5 for a balanced dataset')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes used to format CSV blocks, 0 for one per CPU core (default: 1)')
+    args = parser.parse_args(argv)
+
+    if args.eligible_rate is not None and not 0 <= args.eligible_rate <= 1:
+        parser.error('--eligible-rate must be between 0 and 1')
+
+    start = time.time()
+    rows, eligible = generate(
+        args.rows, args.output, seed=args.seed, workers=args.workers or os.cpu_count() or 1,
+        output_format=args.format, positive_noise=args.positive_noise,
+        negative_noise=args.negative_noise, eligible_rate=args.eligible_rate
+    )
+    elapsed = time.time() - start
+
+    print(f"Dataset generated successfully with {rows} samples in {elapsed:.2f}s")
+    if rows:
+        print(f"Eligible: {eligible} ({eligible / rows * 100:.1f}%)")
+        print(f"Not Eligible: {rows - eligible} ({(rows - eligible) / rows * 100:.1f}%)")
 
-# Create DataFrame
-df = pd.DataFrame(data)
+    # Full statistics are only practical to print for small datasets
+    if 0 < rows <= BLOCK_ROWS and (args.format or dataset_format(args.output)) == dataset_format(args.output):
+        print("\nDataset Statistics:")
+        print(read_dataset(args.output, resolve=False).describe())
 
-# Save to CSV
-df.to_csv('scholarship_dataset.csv', index=False)
-print(f"Dataset generated successfully with {len(df)} samples")
-print(f"Eligible: {df['eligible'].sum()} ({df['eligible'].mean()*100:.1f}%)")
-print(f"Not Eligible: {(df['eligible']==0).sum()} ({(df['eligible']==0).mean()*100:.1f}%)")
-print("\nDataset Statistics:")
-print(df.describe())
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+"""
+Gunicorn settings for the Scholarship Eligibility System
+"""
+import os
+
+# Import the app (and map the model files) once in the master process.
+# Workers are forked from it, so model arrays are shared copy-on-write and
+# the memory-mapped forest bundle is shared through the page cache.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+if preload_app:
+    # A background loading thread started in the master would not survive
+    # the fork, so preloaded workers always load models eagerly
+    os.environ['LAZY_STARTUP'] = '0'
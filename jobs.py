@@ -0,0 +1,234 @@
+"""
+Persistent background scoring jobs for large submissions
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from scoring import parse_batch_body, score_rows, ScoringError
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting"""
+
+
+class JobStore:
+    """
+    Jobs, their progress and their files, kept in a local SQLite database
+    so queued and interrupted jobs survive restarts. Running jobs hold a
+    lease that their worker renews after every chunk; a job whose lease
+    expires (its worker died) goes back to the queue.
+    """
+
+    def __init__(self, directory, lease_seconds=60):
+        self.directory = directory
+        self.lease_seconds = lease_seconds
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'jobs.db')
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                input_format TEXT NOT NULL,
+                total_rows INTEGER NOT NULL,
+                processed_rows INTEGER NOT NULL DEFAULT 0,
+                failed_rows INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                lease_expires REAL,
+                error TEXT
+            )''')
+
+    def _connect(self):
+        # One connection per thread and per process (connections do not survive fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def input_path(self, job_id, input_format):
+        return os.path.join(self.directory, f'{job_id}.input.{input_format}')
+
+    def output_path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.results.ndjson')
+
+    def submit(self, body, content_type, max_queued=None):
+        """
+        Store a submission and queue it. JSON arrays are rewritten as NDJSON
+        so the worker can stream them; CSV bodies are stored as-is.
+        Returns the job record.
+        """
+        if max_queued is not None and self.count(QUEUED) >= max_queued:
+            raise JobQueueFull(f'Too many queued jobs (limit {max_queued}). Try again later.')
+
+        job_id = uuid.uuid4().hex
+        if 'csv' in content_type:
+            input_format = 'csv'
+            with open(self.input_path(job_id, input_format), 'wb') as f:
+                f.write(body)
+            with open(self.input_path(job_id, input_format), 'rb') as f:
+                total_rows = max(0, sum(1 for line in f if line.strip()) - 1)
+        else:
+            input_format = 'ndjson'
+            rows = parse_batch_body(body, content_type)
+            with open(self.input_path(job_id, input_format), 'w') as f:
+                for row in rows:
+                    # Undecodable lines are kept so the error is reported in place
+                    f.write((json.dumps({'__error__': str(row)}) if isinstance(row, Exception)
+                             else json.dumps(row)) + '\n')
+            total_rows = len(rows)
+
+        with self._connect() as conn:
+            conn.execute('INSERT INTO jobs (id, status, input_format, total_rows, created_at) '
+                         'VALUES (?, ?, ?, ?, ?)', (job_id, QUEUED, input_format, total_rows, time.time()))
+        return self.get(job_id)
+
+    def get(self, job_id):
+        row = self._connect().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def count(self, status):
+        return self._connect().execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (status,)).fetchone()[0]
+
+    def claim_next(self):
+        """Atomically move the oldest queued job to running; returns it or None"""
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            # Reclaim jobs whose worker stopped renewing its lease
+            conn.execute('UPDATE jobs SET status = ?, processed_rows = 0, failed_rows = 0 '
+                         'WHERE status = ? AND lease_expires < ?', (QUEUED, RUNNING, now))
+            row = conn.execute('SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1',
+                               (QUEUED,)).fetchone()
+            if row is None:
+                return None
+            claimed = conn.execute('UPDATE jobs SET status = ?, started_at = ?, lease_expires = ? '
+                                   'WHERE id = ? AND status = ?',
+                                   (RUNNING, now, now + self.lease_seconds, row['id'], QUEUED)).rowcount
+        return self.get(row['id']) if claimed else None
+
+    def progress(self, job_id, processed_rows, failed_rows):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET processed_rows = ?, failed_rows = ?, lease_expires = ? WHERE id = ?',
+                         (processed_rows, failed_rows, time.time() + self.lease_seconds, job_id))
+
+    def finish(self, job_id, error=None):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET status = ?, finished_at = ?, lease_expires = NULL, error = ? '
+                         'WHERE id = ?', (FAILED if error else DONE, time.time(), error, job_id))
+
+
+def iter_input_chunks(path, input_format, chunk_size):
+    """Yield lists of student records from a stored job input"""
+    if input_format == 'csv':
+        import pandas as pd
+        try:
+            reader = pd.read_csv(path, chunksize=chunk_size)
+        except pd.errors.EmptyDataError:
+            # An empty upload has no header either; like an empty JSON body, it has no rows
+            return
+        for chunk in reader:
+            # Missing values fall back to the /predict defaults
+            yield [{key: value for key, value in record.items() if value == value}
+                   for record in chunk.to_dict('records')]
+        return
+
+    chunk = []
+    with open(path, 'r') as f:
+        for line in f:
+            row = json.loads(line)
+            if isinstance(row, dict) and set(row) == {'__error__'}:
+                row = ValueError(row['__error__'])
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+class JobRunner:
+    """
+    Background threads that score queued jobs chunk by chunk.
+    `max_workers` bounds how many jobs run at once in this process and
+    `chunk_pause` yields the CPU between chunks, so interactive requests
+    keep their latency while a large job is running.
+    """
+
+    def __init__(self, store, get_models, max_workers=1, chunk_size=1000,
+                 chunk_pause=0.0, poll_interval=1.0):
+        self.store = store
+        self.get_models = get_models
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.chunk_pause = chunk_pause
+        self.poll_interval = poll_interval
+        self._threads = []
+        self._pid = None
+        self._wakeup = threading.Event()
+
+    def start(self):
+        """Start the worker threads once per process (safe to call repeatedly)"""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._threads = [threading.Thread(target=self._loop, name=f'job-worker-{i}', daemon=True)
+                         for i in range(self.max_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def notify(self):
+        """Wake idle workers after a submission"""
+        self._wakeup.set()
+
+    def _loop(self):
+        while True:
+            try:
+                job = self.store.claim_next()
+            except sqlite3.Error as e:
+                print(f"Job queue error: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self.run_job(job)
+
+    def run_job(self, job):
+        job_id = job['id']
+        processed = failed = 0
+        try:
+            models, features = self.get_models()
+            if not models:
+                raise ScoringError('Models not loaded. Please train models first.')
+
+            input_path = self.store.input_path(job_id, job['input_format'])
+            with open(self.store.output_path(job_id), 'w') as out:
+                for rows in iter_input_chunks(input_path, job['input_format'], self.chunk_size):
+                    results, chunk_failed = score_rows(models, features, rows, start_index=processed, source='job')
+                    out.write(''.join(json.dumps(result) + '\n' for result in results))
+                    out.flush()
+                    processed += len(rows)
+                    failed += chunk_failed
+                    self.store.progress(job_id, processed, failed)
+                    if self.chunk_pause:
+                        time.sleep(self.chunk_pause)
+            self.store.finish(job_id)
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self.store.finish(job_id, error=str(e))
@@ -0,0 +1,231 @@
+"""
+Open-loop HTTP load test: sustained throughput at a p99 latency target
+
+Requests arrive at a fixed average rate (Poisson) regardless of how fast the
+server answers, for a series of rates. A rate is sustained when p99 latency
+stays within --p99 and at most --max-errors of requests fail. The workload
+mixes /predict, the dashboard payloads, and batch uploads from slow clients
+whose bodies arrive over --slow-upload seconds.
+
+Usage:
+    python load_test.py --url http://localhost:5000 --rates 50,100,200
+    python load_test.py --compare --workers 2          # sync gunicorn vs ASGI (uvicorn)
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+# (share of requests, kind)
+WORKLOAD = [
+    (0.80, 'predict'),
+    (0.08, 'dataset_stats'),
+    (0.07, 'model_info'),
+    (0.05, 'slow_batch')
+]
+
+SERVERS = {
+    'sync': ['gunicorn', '-c', 'gunicorn.conf.py', '-w', '{workers}', '-b', '127.0.0.1:{port}', 'app:app'],
+    'asgi': ['gunicorn', '-c', 'gunicorn.conf.py', '-k', 'uvicorn.workers.UvicornWorker', '-w', '{workers}',
+             '-b', '127.0.0.1:{port}', 'asgi:app']
+}
+
+
+def random_profile(rng):
+    return {
+        'year_of_study': int(rng.integers(1, 5)),
+        'cgpa': round(float(rng.uniform(2.0, 4.0)), 2),
+        'family_income': int(rng.integers(0, 150000)),
+        'cocurricular_score': int(rng.integers(0, 101)),
+        'leadership_positions': int(rng.integers(0, 6)),
+        'community_service_hours': int(rng.integers(0, 201))
+    }
+
+
+def build_request(kind, rng, batch_rows):
+    """(method, path, body bytes or None)"""
+    if kind == 'predict':
+        return 'POST', '/predict', json.dumps(random_profile(rng)).encode()
+    if kind == 'slow_batch':
+        return 'POST', '/predict_batch', json.dumps([random_profile(rng) for _ in range(batch_rows)]).encode()
+    return 'GET', f'/{kind}', None
+
+
+async def send_request(host, port, method, path, body, upload_seconds, timeout):
+    """One HTTP/1.1 request on a fresh connection; returns the status code"""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        head = f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n'
+        if body is not None:
+            head += f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+        writer.write((head + '\r\n').encode())
+        if body:
+            if upload_seconds:
+                # A slow client: the body arrives in pieces
+                pieces = 10
+                size = -(-len(body) // pieces)
+                for start in range(0, len(body), size):
+                    writer.write(body[start:start + size])
+                    await writer.drain()
+                    await asyncio.sleep(upload_seconds / pieces)
+            else:
+                writer.write(body)
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def run_rate(url, rate, duration, seed, slow_upload, batch_rows, timeout):
+    """Offer `rate` requests per second for `duration` seconds; returns per-request (latency, status)"""
+    parsed = urllib.parse.urlparse(url)
+    host, port = parsed.hostname, parsed.port or 80
+    rng = np.random.default_rng(seed)
+    kinds = [kind for _, kind in WORKLOAD]
+    shares = [share for share, _ in WORKLOAD]
+    results = []
+
+    async def one(kind, method, path, body):
+        start = time.perf_counter()
+        try:
+            status = await send_request(host, port, method, path, body,
+                                        slow_upload if kind == 'slow_batch' else 0, timeout)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            status = None
+        # Slow uploads are timed from the end of the upload, the part the server controls
+        elapsed = time.perf_counter() - start - (slow_upload if kind == 'slow_batch' else 0)
+        results.append((kind, elapsed, status))
+
+    tasks = []
+    start = time.perf_counter()
+    next_arrival = start
+    while next_arrival - start < duration:
+        kind = kinds[rng.choice(len(kinds), p=shares)]
+        method, path, body = build_request(kind, rng, batch_rows)
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(kind, method, path, body)))
+        next_arrival += rng.exponential(1.0 / rate)
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - start
+
+
+def summarize(rate, results, elapsed, p99_target, max_errors):
+    latencies = np.array([latency for _, latency, status in results if status is not None and status < 400])
+    errors = sum(1 for _, _, status in results if status is None or status >= 400)
+    error_rate = errors / len(results) if results else 0.0
+    p99 = float(np.percentile(latencies, 99)) if len(latencies) else float('inf')
+    return {
+        'offered_rate': rate,
+        'requests': len(results),
+        'throughput': len(latencies) / elapsed,
+        'p50_seconds': float(np.percentile(latencies, 50)) if len(latencies) else None,
+        'p99_seconds': p99,
+        'error_rate': error_rate,
+        'rejected': sum(1 for _, _, status in results if status in (429, 503)),
+        'sustained': p99 <= p99_target and error_rate <= max_errors
+    }
+
+
+def sweep(url, rates, duration, seed, slow_upload, batch_rows, p99_target, max_errors, timeout=30.0):
+    """Run every rate in turn; returns one summary per rate"""
+    summaries = []
+    print(f"{'rate':>8} {'throughput':>11} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}  sustained")
+    for rate in rates:
+        results, elapsed = asyncio.run(run_rate(url, rate, duration, seed, slow_upload, batch_rows, timeout))
+        summary = summarize(rate, results, elapsed, p99_target, max_errors)
+        summaries.append(summary)
+        print(f"{rate:>8} {summary['throughput']:>11.1f} {(summary['p50_seconds'] or 0) * 1000:>9.1f} "
+              f"{summary['p99_seconds'] * 1000:>9.1f} {summary['error_rate']:>7.1%}  "
+              f"{'yes' if summary['sustained'] else 'no'}")
+    return summaries
+
+
+def max_sustained(summaries):
+    sustained = [s for s in summaries if s['sustained']]
+    return max(sustained, key=lambda s: s['throughput']) if sustained else None
+
+
+def wait_until_ready(url, timeout=60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'{url}/health', timeout=2) as response:
+                if json.load(response).get('models_loaded'):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f'Server at {url} did not become ready')
+
+
+def compare(args, rates):
+    """Start each server with the same worker count and sweep the same rates"""
+    report = {}
+    for (mode, command), port in zip(SERVERS.items(), (8101, 8102)):
+        command = [part.format(workers=args.workers, port=port) for part in command]
+        url = f'http://127.0.0.1:{port}'
+        print(f"\n== {mode}: {' '.join(command)}")
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                  env=dict(os.environ, PREDICTION_CACHE_SIZE='0'))
+        try:
+            wait_until_ready(url)
+            summaries = sweep(url, rates, args.duration, args.seed, args.slow_upload, args.batch_rows,
+                              args.p99, args.max_errors)
+        finally:
+            server.terminate()
+            server.wait()
+        report[mode] = {'command': command, 'steps': summaries, 'max_sustained': max_sustained(summaries)}
+
+    print(f"\nMax sustained throughput with p99 <= {args.p99 * 1000:.0f} ms:")
+    for mode, result in report.items():
+        best = result['max_sustained']
+        print(f"  {mode:<5} " + (f"{best['throughput']:.1f} req/s (p99 {best['p99_seconds'] * 1000:.1f} ms)"
+                                 if best else 'none of the rates'))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Open-loop load test for the scholarship app.')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Server to test (default: %(default)s)')
+    parser.add_argument('--compare', action='store_true',
+                        help='Start sync gunicorn and ASGI servers in turn and compare them')
+    parser.add_argument('--workers', type=int, default=2, help='Worker processes per server with --compare')
+    parser.add_argument('--rates', default='25,50,100,150,200,300',
+                        help='Comma-separated offered request rates (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per rate (default: 10)')
+    parser.add_argument('--p99', type=float, default=0.25, help='p99 latency target in seconds (default: 0.25)')
+    parser.add_argument('--max-errors', type=float, default=0.01, help='Allowed error rate (default: 0.01)')
+    parser.add_argument('--slow-upload', type=float, default=0.5,
+                        help='Seconds a slow client takes to send its batch (default: 0.5, 0 disables)')
+    parser.add_argument('--batch-rows', type=int, default=200, help='Students per slow batch (default: 200)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('-o', '--output', help='Write the results as JSON')
+    args = parser.parse_args(argv)
+
+    rates = [float(rate) for rate in args.rates.split(',') if rate]
+    if args.compare:
+        report = compare(args, rates)
+    else:
+        summaries = sweep(args.url, rates, args.duration, args.seed, args.slow_upload, args.batch_rows,
+                          args.p99, args.max_errors)
+        report = {'url': args.url, 'steps': summaries, 'max_sustained': max_sustained(summaries)}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from 50 microseconds to 10 seconds
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets and optional labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then sum and count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """Copy of every series as {labels: (bucket_counts, sum, count)}"""
+        with self._lock:
+            return {key: (list(series[0]), series[1], series[2]) for key, series in self._series.items()}
+
+    def samples(self):
+        for key, (counts, total, count) in self.snapshot().items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {count}'
+
+
+class Registry:
+    """
+    Collection of metrics rendered in the Prometheus text format.
+    Callbacks registered with `gauge_callback` are evaluated at scrape time,
+    so values already tracked elsewhere (cache counters, queue depth) are
+    exported without any cost on the request path.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._gauges = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name, documentation, callback, kind='gauge'):
+        """Register a function returning a number or a list of (labels dict, number)"""
+        self._gauges.append((name, documentation, callback, kind))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        for name, documentation, callback, kind in self._gauges:
+            try:
+                value = callback()
+            except Exception as e:
+                print(f"Metric {name} failed: {e}")
+                continue
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, number in (value if isinstance(value, list) else [({}, value)]):
+                if number is None:
+                    continue
+                label_text = _format_labels(tuple(labels), tuple(labels.values()))
+                lines.append(f'{name}{label_text} {_format_value(number)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter(
+    'scholarship_http_requests_total', 'HTTP requests handled, by endpoint and status code',
+    ['endpoint', 'method', 'status'])
+REQUEST_LATENCY = REGISTRY.histogram(
+    'scholarship_http_request_duration_seconds', 'Time to handle an HTTP request', ['endpoint'])
+PREDICT_STAGE_LATENCY = REGISTRY.histogram(
+    'scholarship_predict_stage_seconds', 'Time spent in each stage of /predict', ['stage'])
+MODEL_LATENCY = REGISTRY.histogram(
+    'scholarship_model_inference_seconds', 'Time spent in one model call', ['model', 'call'])
+MODEL_ERRORS = REGISTRY.counter(
+    'scholarship_model_errors_total', 'Model calls that raised an exception', ['model'])
+MODEL_RELOADS = REGISTRY.counter(
+    'scholarship_model_reloads_total', 'Hot reloads of a newly promoted model version', ['result'])
+BATCH_ROWS = REGISTRY.histogram(
+    'scholarship_batch_rows', 'Rows per vectorized scoring call', ['source'],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000))
+EXECUTOR_WAIT = REGISTRY.histogram(
+    'scholarship_executor_wait_seconds', 'Time a request waited for an executor thread (ASGI mode)', ['executor'])
+EXECUTOR_REJECTED = REGISTRY.counter(
+    'scholarship_executor_rejected_total', 'Requests turned away by a saturated executor (ASGI mode)',
+    ['executor', 'reason'])
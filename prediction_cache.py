@@ -0,0 +1,187 @@
+"""
+Bounded response cache for /predict with LRU/TTL eviction
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_features(values):
+    """
+    A feature vector as plain floats, so equivalent inputs (3, 3.0, "3")
+    produce the same key. The request is scored on this same vector, so a
+    cached response is always the answer for exactly the inputs in its key.
+    """
+    # Adding 0.0 folds -0.0 into 0.0
+    return [float(v) + 0.0 for v in values]
+
+
+def make_cache_key(values, model_version):
+    """Cache key from the normalized feature vector and the model version"""
+    # repr round-trips a float exactly
+    return f"{model_version}:" + ','.join(repr(v) for v in values)
+
+
+class SQLiteCacheBackend:
+    """
+    Shared cache tier stored in a local SQLite file, so several gunicorn
+    workers on one machine can reuse each other's results.
+    """
+
+    def __init__(self, path, max_size=10000, ttl=300):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache '
+                         '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)')
+
+    def _connect(self):
+        # One connection per thread and per process (connections do not survive fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT value FROM cache WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        conn = self._connect()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                         (key, json.dumps(value), time.time() + self.ttl))
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.prune()
+
+    def prune(self):
+        """Drop expired entries and trim the table to max_size"""
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+            conn.execute('DELETE FROM cache WHERE key NOT IN '
+                         '(SELECT key FROM cache ORDER BY expires DESC LIMIT ?)', (self.max_size,))
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM cache')
+
+
+class PredictionCache:
+    """
+    In-process LRU cache with a time-to-live, optionally backed by a
+    shared tier. Values are treated as immutable once stored.
+    """
+
+    def __init__(self, max_size=1024, ttl=300, backend=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.evictions += 1
+
+        if self.backend is not None:
+            try:
+                value = self.backend.get(key)
+            except sqlite3.Error as e:
+                print(f"Shared cache read failed: {e}")
+                value = None
+            if value is not None:
+                self._store(key, value)
+                with self._lock:
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        self._store(key, value)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value)
+            except sqlite3.Error as e:
+                print(f"Shared cache write failed: {e}")
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'shared_backend': self.backend.path if self.backend is not None else None,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.shared_hits) / lookups if lookups else 0.0
+            }
+
+
+def cache_from_env():
+    """
+    Build the cache from PREDICTION_CACHE_SIZE (0 disables it),
+    PREDICTION_CACHE_TTL (seconds) and PREDICTION_CACHE_PATH (SQLite file
+    shared between workers).
+    """
+    max_size = int(os.environ.get('PREDICTION_CACHE_SIZE', 1024))
+    ttl = float(os.environ.get('PREDICTION_CACHE_TTL', 300))
+    path = os.environ.get('PREDICTION_CACHE_PATH')
+    backend = SQLiteCacheBackend(path, max_size=max_size * 10, ttl=ttl) if path and max_size > 0 else None
+    return PredictionCache(max_size=max_size, ttl=ttl, backend=backend)
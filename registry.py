@@ -0,0 +1,171 @@
+"""
+Versioned model registry with atomic promotion
+
+Layout under the registry root (default: models/):
+
+    models/
+    ├── CURRENT                  # name of the promoted version
+    └── versions/
+        ├── 20240301-101500-3fa2c1/
+        │   ├── random_forest_model.pkl
+        │   ├── ...
+        │   └── features.json
+        └── 20240302-090000-8be0d4/
+
+A version directory is written under a hidden staging name and renamed into
+place when complete, and CURRENT is replaced atomically, so readers never see
+a half-written model. Without a CURRENT file the root directory itself holds
+the models (the original flat layout).
+
+Usage:
+    python registry.py list
+    python registry.py promote 20240301-101500-3fa2c1
+    python registry.py prune --keep 5
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+CURRENT_FILE = 'CURRENT'
+VERSIONS_DIR = 'versions'
+STAGING_PREFIX = '.staging-'
+
+
+def new_version_id():
+    """Sortable, unique version name: creation time plus a random suffix"""
+    return time.strftime('%Y%m%d-%H%M%S') + '-' + uuid.uuid4().hex[:6]
+
+
+class ModelRegistry:
+    """Versioned model directories and the pointer to the promoted one"""
+
+    def __init__(self, root='models'):
+        self.root = root
+        self.versions_dir = os.path.join(root, VERSIONS_DIR)
+        self.current_file = os.path.join(root, CURRENT_FILE)
+
+    def current_version(self):
+        """The promoted version, or None when the registry is not in use"""
+        try:
+            with open(self.current_file, 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def version_dir(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def current_dir(self):
+        """Directory holding the models to serve"""
+        version = self.current_version()
+        return self.version_dir(version) if version else self.root
+
+    def versions(self):
+        """Published versions, oldest first"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(name for name in os.listdir(self.versions_dir)
+                      if not name.startswith('.') and os.path.isdir(self.version_dir(name)))
+
+    def stage(self):
+        """Create an empty staging directory to write a new version into"""
+        os.makedirs(self.versions_dir, exist_ok=True)
+        return tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=self.versions_dir)
+
+    def publish(self, staging_dir, version=None):
+        """Move a completed staging directory into place; returns its version"""
+        version = version or new_version_id()
+        os.rename(staging_dir, self.version_dir(version))
+        return version
+
+    def promote(self, version):
+        """Atomically point CURRENT at a published version"""
+        if not os.path.isdir(self.version_dir(version)):
+            raise ValueError(f"Unknown model version '{version}'")
+        tmp_path = f'{self.current_file}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.current_file)
+
+    def prune(self, keep=5):
+        """Delete all but the newest `keep` versions, never the promoted one; returns the removed versions"""
+        current = self.current_version()
+        versions = self.versions()
+        kept = set(versions[-keep:]) if keep > 0 else set()
+        removable = [version for version in versions if version not in kept and version != current]
+        for version in removable:
+            shutil.rmtree(self.version_dir(version))
+        return removable
+
+
+class RegistryWatcher:
+    """
+    Background thread that polls CURRENT and calls `on_change(version)` when
+    another version is promoted. Like the job runner it starts once per
+    process, so gunicorn workers each watch after forking.
+    """
+
+    def __init__(self, registry, on_change, interval=5.0):
+        self.registry = registry
+        self.on_change = on_change
+        self.interval = interval
+        self.seen = registry.current_version()
+        self._pid = None
+
+    def start(self):
+        if self.interval <= 0 or self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        threading.Thread(target=self._loop, name='model-registry-watcher', daemon=True).start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            version = self.registry.current_version()
+            if version == self.seen:
+                continue
+            try:
+                self.on_change(version)
+                self.seen = version
+            except Exception as e:
+                # Keep serving the loaded version; retried on the next poll
+                print(f"Failed to load model version {version}: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage versioned model bundles.')
+    parser.add_argument('--root', default='models', help='Registry root directory (default: models)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='List versions and mark the promoted one')
+    promote = commands.add_parser('promote', help='Serve a published version')
+    promote.add_argument('version')
+    prune = commands.add_parser('prune', help='Delete old versions')
+    prune.add_argument('--keep', type=int, default=5, help='Newest versions to keep (default: 5)')
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.root)
+    if args.command == 'list':
+        current = registry.current_version()
+        for version in registry.versions():
+            print(f"{'*' if version == current else ' '} {version}")
+        if current is None:
+            print(f"No promoted version; serving the flat layout in {args.root}/")
+    elif args.command == 'promote':
+        try:
+            registry.promote(args.version)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Promoted {args.version}")
+    elif args.command == 'prune':
+        for version in registry.prune(args.keep):
+            print(f"Removed {version}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Content negotiation for API responses: JSON or MessagePack, optionally compressed
+"""
+import gzip
+
+# Optional dependencies; without them responses fall back to JSON / gzip
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_ALIASES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+# Bodies smaller than this are sent uncompressed; the saving would not pay for the CPU
+MIN_COMPRESS_BYTES = 512
+
+# Fast settings: responses are compressed on every request, not once
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def choose_mimetype(accept_mimetypes):
+    """
+    Pick the response format from a werkzeug Accept header. MessagePack is
+    only chosen when the client asks for it explicitly and msgpack is installed.
+    """
+    if msgpack is None:
+        return JSON_MIMETYPE
+    # Exact matches only, so "*/*" keeps getting JSON
+    requested = {value for value, quality in accept_mimetypes if quality > 0}
+    for alias in MSGPACK_ALIASES:
+        if alias in requested and accept_mimetypes[alias] >= accept_mimetypes[JSON_MIMETYPE]:
+            return MSGPACK_MIMETYPE
+    return JSON_MIMETYPE
+
+
+def choose_encoding(accept_encodings):
+    """Pick 'br', 'gzip' or None from a werkzeug Accept-Encoding header"""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def pack(payload):
+    """Serialize a payload with MessagePack"""
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response, accept_encodings):
+    """
+    Compress a buffered werkzeug response in place when the client accepts
+    it and the body is large enough. Returns the response.
+    """
+    response.vary.add('Accept-Encoding')
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    encoding = choose_encoding(accept_encodings)
+    data = response.get_data()
+    if encoding is None or len(data) < MIN_COMPRESS_BYTES:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
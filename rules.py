@@ -0,0 +1,291 @@
+"""
+Declarative scholarship provider rules and a vectorized rule engine
+"""
+import operator
+
+import numpy as np
+
+# Each provider is described by a list of criteria. A criterion passes when
+# ANY of its (feature, operator, threshold) tests passes. `met` and `unmet`
+# are reason templates, formatted with the student's values only when
+# reasons are requested; an `unmet` of None adds no reason on failure.
+# `award` is the annual amount per student in RM (indicative), used for the
+# expected award totals of cohort reports.
+SCHOLARSHIP_RULES = [
+    {
+        # High academic excellence, leadership, and community involvement
+        'provider': 'PETRONAS',
+        'name': 'PETRONAS Scholarship',
+        'description': 'Prestigious scholarship for high-achieving students with strong leadership and community involvement.',
+        'award': 30000,
+        'criteria': [
+            {
+                'tests': [('cgpa', '>=', 3.5)],
+                'met': 'CGPA {cgpa:.2f} meets requirement (≥3.5)',
+                'unmet': 'CGPA {cgpa:.2f} below requirement (need ≥3.5)'
+            },
+            {
+                'tests': [('cocurricular_score', '>=', 70)],
+                'met': 'Co-curricular score {cocurricular_score} meets requirement (≥70)',
+                'unmet': 'Co-curricular score {cocurricular_score} below requirement (need ≥70)'
+            },
+            {
+                'tests': [('leadership_positions', '>=', 2)],
+                'met': 'Leadership experience: {leadership_positions} positions',
+                'unmet': 'Leadership positions {leadership_positions} below requirement (need ≥2)'
+            },
+            {
+                'tests': [('community_service_hours', '>=', 50)],
+                'met': 'Community service: {community_service_hours} hours',
+                'unmet': 'Community service {community_service_hours} hours below requirement (need ≥50)'
+            }
+        ]
+    },
+    {
+        # Focus on Bumiputera students, need-based, good academic performance
+        'provider': 'MARA',
+        'name': 'MARA Scholarship',
+        'description': 'Government scholarship for Bumiputera students with financial need and good academic performance.',
+        'award': 20000,
+        'criteria': [
+            {
+                'tests': [('family_income', '<=', 80000)],
+                'met': 'Family income RM {family_income:,} meets requirement (≤RM 80,000)',
+                'unmet': 'Family income RM {family_income:,} exceeds requirement (need ≤RM 80,000)'
+            },
+            {
+                'tests': [('cgpa', '>=', 3.0)],
+                'met': 'CGPA {cgpa:.2f} meets requirement (≥3.0)',
+                'unmet': 'CGPA {cgpa:.2f} below requirement (need ≥3.0)'
+            },
+            {
+                'tests': [('cocurricular_score', '>=', 50)],
+                'met': 'Co-curricular score {cocurricular_score} meets requirement (≥50)',
+                'unmet': 'Co-curricular score {cocurricular_score} below requirement (need ≥50)'
+            }
+        ]
+    },
+    {
+        # Need-based, lower income threshold, moderate academic requirements
+        'provider': 'Zakat',
+        'name': 'Zakat Scholarship',
+        'description': 'Need-based scholarship for students from lower-income families with community service involvement.',
+        'award': 8000,
+        'criteria': [
+            {
+                'tests': [('family_income', '<=', 50000)],
+                'met': 'Family income RM {family_income:,} meets requirement (≤RM 50,000)',
+                'unmet': 'Family income RM {family_income:,} exceeds requirement (need ≤RM 50,000)'
+            },
+            {
+                'tests': [('cgpa', '>=', 2.8)],
+                'met': 'CGPA {cgpa:.2f} meets requirement (≥2.8)',
+                'unmet': 'CGPA {cgpa:.2f} below requirement (need ≥2.8)'
+            },
+            {
+                'tests': [('community_service_hours', '>=', 30)],
+                'met': 'Community service: {community_service_hours} hours meets requirement (≥30)',
+                'unmet': 'Community service {community_service_hours} hours below requirement (need ≥30)'
+            }
+        ]
+    },
+    {
+        # UTP-specific, balanced criteria, supports UTP students
+        'provider': 'Yayasan UTP',
+        'name': 'Yayasan UTP Scholarship',
+        'description': 'Institutional scholarship for UTP students with good academic standing and active participation.',
+        'award': 15000,
+        'criteria': [
+            {
+                'tests': [('cgpa', '>=', 3.2)],
+                'met': 'CGPA {cgpa:.2f} meets requirement (≥3.2)',
+                'unmet': 'CGPA {cgpa:.2f} below requirement (need ≥3.2)'
+            },
+            {
+                'tests': [('family_income', '<=', 100000), ('cocurricular_score', '>=', 60)],
+                'met': 'Family income RM {family_income:,} or co-curricular score {cocurricular_score} meets requirement',
+                'unmet': 'Need either family income ≤RM 100,000 or co-curricular score ≥60'
+            },
+            {
+                'tests': [('year_of_study', '>=', 1)],
+                'met': 'Currently in Year {year} of study',
+                'unmet': None
+            }
+        ]
+    }
+]
+
+OPERATORS = {
+    '>=': np.greater_equal,
+    '>': np.greater,
+    '<=': np.less_equal,
+    '<': np.less
+}
+
+# Plain comparisons for scoring one student, where ufunc calls cost more than the tests
+SCALAR_OPERATORS = {
+    '>=': operator.ge,
+    '>': operator.gt,
+    '<=': operator.le,
+    '<': operator.lt
+}
+
+
+class RuleEngine:
+    """Evaluate the provider rule table over columns of many students at once"""
+
+    def __init__(self, rules=SCHOLARSHIP_RULES):
+        self.rules = rules
+        self.providers = [rule['provider'] for rule in rules]
+        # Resolve operators once so evaluation is just a sequence of ufunc calls
+        self._compiled = [
+            [[(feature, OPERATORS[op], threshold) for feature, op, threshold in criterion['tests']]
+             for criterion in rule['criteria']]
+            for rule in rules
+        ]
+        # Reason ids per provider: [(met id, unmet id or None) per criterion]
+        self._reason_ids = {
+            rule['provider']: [(reason_id(rule['provider'], i, 'met'),
+                                reason_id(rule['provider'], i, 'unmet') if criterion['unmet'] is not None else None)
+                               for i, criterion in enumerate(rule['criteria'])]
+            for rule in rules
+        }
+        self._scalar = [
+            [[(feature, SCALAR_OPERATORS[op], threshold) for feature, op, threshold in criterion['tests']]
+             for criterion in rule['criteria']]
+            for rule in rules
+        ]
+
+    def criteria_masks(self, columns):
+        """
+        Evaluate every criterion over the given columns.
+        `columns` maps feature name to a 1-D array. Returns a dict of
+        provider -> bool array of shape (n_criteria, n_students).
+        """
+        result = {}
+        for rule, criteria in zip(self.rules, self._compiled):
+            masks = []
+            for tests in criteria:
+                mask = None
+                for feature, op, threshold in tests:
+                    test = op(columns[feature], threshold)
+                    mask = test if mask is None else mask | test
+                masks.append(mask)
+            result[rule['provider']] = np.vstack(masks)
+        return result
+
+    def criteria_row(self, values):
+        """
+        Evaluate every criterion for one student given as a dict of floats.
+        Returns a dict of provider -> list of booleans, one per criterion.
+        """
+        result = {}
+        for rule, criteria in zip(self.rules, self._scalar):
+            passed = []
+            for tests in criteria:
+                ok = False
+                for feature, op, threshold in tests:
+                    if op(values[feature], threshold):
+                        ok = True
+                        break
+                passed.append(ok)
+            result[rule['provider']] = passed
+        return result
+
+    def _passed(self, columns, index, criteria_masks):
+        """One student's input values and criterion outcomes per provider"""
+        values = {name: float(column[index]) for name, column in columns.items()}
+        if criteria_masks is None:
+            return values, self.criteria_row(values)
+        return values, {provider: masks[:, index].tolist() for provider, masks in criteria_masks.items()}
+
+    def evaluate(self, columns, criteria_masks=None):
+        """Return a dict of provider -> eligibility mask over all students"""
+        if criteria_masks is None:
+            criteria_masks = self.criteria_masks(columns)
+        return {provider: masks.all(axis=0) for provider, masks in criteria_masks.items()}
+
+    def recommendations(self, columns, index=0, criteria_masks=None):
+        """
+        Render the recommendation list (with reasons) for one student.
+        Without criteria_masks, only that student is evaluated, with plain comparisons.
+        """
+        values, outcomes = self._passed(columns, index, criteria_masks)
+        if 'year_of_study' in values:
+            values['year'] = int(values['year_of_study'])
+
+        recommendations = []
+        for rule in self.rules:
+            passed = outcomes[rule['provider']]
+            eligible = all(passed)
+            if eligible:
+                reasons = [criterion['met'].format_map(values) for criterion in rule['criteria']]
+            else:
+                reasons = [criterion['unmet'].format_map(values)
+                           for criterion, ok in zip(rule['criteria'], passed)
+                           if not ok and criterion['unmet'] is not None]
+
+            recommendations.append({
+                'provider': rule['provider'],
+                'name': rule['name'],
+                'eligible': eligible,
+                'confidence': 'High' if eligible else 'Low',
+                'reasons': reasons,
+                'description': rule['description']
+            })
+        return recommendations
+
+    def compact_recommendations(self, columns, index=0, criteria_masks=None):
+        """
+        Recommendations for one student with reasons given as ids into
+        text_catalog() instead of rendered text
+        """
+        _, outcomes = self._passed(columns, index, criteria_masks)
+
+        recommendations = []
+        for rule in self.rules:
+            provider = rule['provider']
+            passed = outcomes[provider]
+            eligible = all(passed)
+            ids = self._reason_ids[provider]
+            if eligible:
+                reasons = [met for met, _ in ids]
+            else:
+                reasons = [unmet for (_, unmet), ok in zip(ids, passed) if not ok and unmet is not None]
+            recommendations.append({'provider': provider, 'eligible': eligible, 'reasons': reasons})
+        return recommendations
+
+    def text_catalog(self):
+        """
+        Provider names and descriptions, and every reason template by id.
+        Templates use Python format syntax with the student's input values
+        (plus `year`, the integer year of study).
+        """
+        providers = {}
+        reasons = {}
+        for rule in self.rules:
+            providers[rule['provider']] = {'name': rule['name'], 'description': rule['description']}
+            for i, criterion in enumerate(rule['criteria']):
+                for outcome in ('met', 'unmet'):
+                    if criterion[outcome] is not None:
+                        reasons[reason_id(rule['provider'], i, outcome)] = criterion[outcome]
+        return {'providers': providers, 'reasons': reasons}
+
+
+def reason_id(provider, criterion_index, outcome):
+    """Stable id of one reason template, e.g. 'MARA/1/unmet'"""
+    return f'{provider}/{criterion_index}/{outcome}'
+
+
+def columns_from_matrix(X, features):
+    """Split a feature matrix into a dict of named columns"""
+    X = np.asarray(X, dtype=float)
+    return {name: X[:, i] for i, name in enumerate(features)}
+
+
+def eligible_providers(masks, index):
+    """List the providers a student is eligible for from precomputed masks"""
+    return [provider for provider, mask in masks.items() if mask[index]]
+
+
+rule_engine = RuleEngine()
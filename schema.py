@@ -0,0 +1,186 @@
+"""
+Input schema for student records: type, range and default of every feature
+
+The column order comes from the features.json written at training time, so
+the matrices given to the models always have the training column order.
+A FeatureSchema is built once per model version. It checks that order
+against the loaded models, then turns request bodies (one student or a
+batch) straight into a float matrix. Invalid values are reported per field.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from math import isfinite
+
+import numpy as np
+
+# minimum / maximum are inclusive (None: unbounded); integer fields reject fractions
+Field = namedtuple('Field', ['default', 'minimum', 'maximum', 'integer'])
+
+FIELDS = {
+    'year_of_study': Field(1, 1, 4, True),
+    'cgpa': Field(3.0, 0, 4, False),
+    'family_income': Field(50000, 0, None, False),
+    'cocurricular_score': Field(50, 0, 100, False),
+    'leadership_positions': Field(0, 0, None, True),
+    'community_service_hours': Field(0, 0, None, False)
+}
+
+FEATURE_ORDER = list(FIELDS)
+FEATURE_DEFAULTS = {name: field.default for name, field in FIELDS.items()}
+
+
+class SchemaError(Exception):
+    """Raised when features.json does not match the schema or the models"""
+
+
+class ValidationError(ValueError):
+    """
+    Raised for invalid input. `errors` is a list of {'field', 'message'}
+    dicts; field is None for problems with the record as a whole.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(error_message(errors))
+
+
+def error_message(errors):
+    """One readable line for a list of field errors"""
+    return '; '.join(f"{e['field']} {e['message']}" if e['field'] else e['message'] for e in errors)
+
+
+def _number(value):
+    """A JSON value as a float, or None if it is not a number"""
+    if isinstance(value, bool):
+        return None
+    if not isinstance(value, (int, float, str)):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+    except OverflowError:
+        return float('inf')
+
+
+def _range_text(field):
+    if field.maximum is None:
+        return f'must be at least {field.minimum}'
+    return f'must be between {field.minimum} and {field.maximum}'
+
+
+class FeatureSchema:
+    """Validation and matrix construction for one feature list"""
+
+    def __init__(self, features):
+        unknown = [name for name in features if name not in FIELDS]
+        if unknown:
+            raise SchemaError(f"features.json lists features the server cannot read: {', '.join(unknown)}")
+        self.features = list(features)
+        self.fields = [FIELDS[name] for name in self.features]
+        self.defaults = np.array([field.default for field in self.fields], dtype=float)
+        self.minimum = np.array([-np.inf if f.minimum is None else f.minimum for f in self.fields], dtype=float)
+        self.maximum = np.array([np.inf if f.maximum is None else f.maximum for f in self.fields], dtype=float)
+        self.integer = np.array([field.integer for field in self.fields])
+        self._scalar_checks = list(zip(self.features, self.fields, self.minimum.tolist(), self.maximum.tolist()))
+
+    def check_models(self, models):
+        """Raise SchemaError if a model was trained on other columns than features.json lists"""
+        for name, model in models.items():
+            trained = getattr(model, 'feature_names_in_', None)
+            if trained is not None and list(trained) != self.features:
+                raise SchemaError(f"{name} was trained on columns {list(trained)}, "
+                                  f"but features.json lists {self.features}")
+            width = getattr(model, 'n_features_in_', None)
+            if width is not None and width != len(self.features):
+                raise SchemaError(f"{name} expects {width} features, but features.json lists {len(self.features)}")
+
+    def invalid(self, X):
+        """(rows, features) mask of values that are out of range, not finite or not whole"""
+        with np.errstate(invalid='ignore'):
+            return (~np.isfinite(X) | (X < self.minimum) | (X > self.maximum)
+                    | (self.integer & (X != np.floor(X))))
+
+    def _field_error(self, j, value):
+        if not np.isfinite(value):
+            message = 'must be a finite number'
+        elif not self.minimum[j] <= value <= self.maximum[j]:
+            message = _range_text(self.fields[j])
+        else:
+            message = 'must be a whole number'
+        return {'field': self.features[j], 'message': message}
+
+    def matrix(self, rows):
+        """
+        Feature matrix of a list of student records; missing fields take
+        their defaults. Returns (matrix, row_indices, errors): row_indices
+        maps each matrix row back to its position in `rows`, errors maps a
+        row position to its list of field errors. Rows may be exceptions
+        from parse_batch_body, which are reported as errors.
+        """
+        X = np.empty((len(rows), len(self.features)), dtype=float)
+        errors = {}
+        for i, row in enumerate(rows):
+            if isinstance(row, Exception):
+                errors[i] = [{'field': None, 'message': str(row)}]
+                X[i] = self.defaults
+                continue
+            if not isinstance(row, dict):
+                errors[i] = [{'field': None, 'message': 'Each student must be a JSON object.'}]
+                X[i] = self.defaults
+                continue
+            for j, name in enumerate(self.features):
+                value = row.get(name, self.fields[j].default)
+                # Plain floats are by far the most common case
+                if type(value) is float:
+                    X[i, j] = value
+                    continue
+                number = _number(value)
+                if number is None:
+                    errors.setdefault(i, []).append({'field': name, 'message': 'must be a number'})
+                    number = self.fields[j].default
+                X[i, j] = number
+
+        # Values that failed to parse were replaced by (valid) defaults above
+        for i, j in zip(*np.nonzero(self.invalid(X))):
+            errors.setdefault(int(i), []).append(self._field_error(j, X[i, j]))
+
+        valid = np.ones(len(rows), dtype=bool)
+        valid[list(errors)] = False
+        row_indices = np.flatnonzero(valid).tolist()
+        return X[valid], row_indices, errors
+
+    def row(self, data):
+        """
+        Feature vector (a list of floats) of one student; raises ValidationError.
+        Scalar checks only: building a matrix costs more than the checks for one row.
+        """
+        if not isinstance(data, dict):
+            raise ValidationError([{'field': None, 'message': 'The request body must be a JSON object.'}])
+        values = []
+        errors = []
+        for j, (name, field, minimum, maximum) in enumerate(self._scalar_checks):
+            value = data.get(name, field.default)
+            if type(value) is not float:
+                value = _number(value)
+                if value is None:
+                    errors.append({'field': name, 'message': 'must be a number'})
+                    continue
+            if not (minimum <= value <= maximum and isfinite(value)) or (field.integer and value % 1 != 0):
+                errors.append(self._field_error(j, value))
+                continue
+            values.append(value)
+        if errors:
+            raise ValidationError(errors)
+        return values
+
+
+@lru_cache(maxsize=16)
+def _cached_schema(features):
+    return FeatureSchema(features)
+
+
+def schema_for(features):
+    """Shared FeatureSchema for a feature list"""
+    return _cached_schema(tuple(features))
+
@@ -0,0 +1,188 @@
+"""
+Score a CSV or Parquet file of students offline, streaming in chunks
+
+Usage:
+    python score_file.py scholarship_dataset.csv -o scored.csv
+    python score_file.py students.parquet -o scored.ndjson --workers 4   # needs pyarrow (optional)
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dataset_io import dataset_format, iter_npcols
+from registry import ModelRegistry
+from rules import rule_engine, columns_from_matrix
+from schema import FEATURE_DEFAULTS, FEATURE_ORDER, schema_for
+from scoring import MODEL_FILES, load_model_files, predict_matrix, primary_model_name
+
+# Models loaded once per worker process (see _init_worker)
+_worker_models = None
+_worker_features = None
+
+
+def iter_chunks(path, chunk_size):
+    """Yield DataFrame chunks from a CSV, Parquet or .npcols dataset"""
+    if dataset_format(path) == 'npcols':
+        yield from iter_npcols(path, chunk_size)
+    elif path.lower().endswith(('.parquet', '.pq')):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit('Reading Parquet files requires pyarrow (pip install pyarrow).')
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def frame_matrix(df, features):
+    """
+    Feature matrix of a DataFrame chunk. Missing feature columns use the
+    same defaults as /predict. Returns (X, valid) where valid is False for
+    rows with non-numeric or out-of-range values.
+    """
+    columns = {}
+    for name in features:
+        if name in df.columns:
+            columns[name] = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+        else:
+            columns[name] = np.full(len(df), float(FEATURE_DEFAULTS.get(name, 0)))
+    X = np.column_stack([columns[name] for name in features]) if len(df) else np.empty((0, len(features)))
+    return X, ~schema_for(features).invalid(X).any(axis=1)
+
+
+def score_frame(models, features, df):
+    """
+    Score one DataFrame chunk with every model and the provider rules.
+    Missing feature columns use the same defaults as /predict; rows with
+    non-numeric or out-of-range values are left unscored and get an `error` message.
+    """
+    features = features or FEATURE_ORDER
+    X, valid = frame_matrix(df, features)
+    out = pd.DataFrame(index=df.index)
+    if 'student_id' in df.columns:
+        out['student_id'] = df['student_id']
+
+    # Every chunk gets the same columns, even if none of its rows are valid
+    primary_model = primary_model_name(models)
+    out['prediction'] = pd.array([pd.NA] * len(df), dtype='Int8')
+    out['eligible_probability'] = np.nan
+    out['model_used'] = primary_model
+    for name in models:
+        out[f'{name.lower().replace(" ", "_")}_eligible_probability'] = np.nan
+
+    if valid.any():
+        predictions, probabilities, _ = predict_matrix(models, X[valid], source='file')
+        if primary_model in predictions:
+            out.loc[valid, 'prediction'] = predictions[primary_model]
+            out.loc[valid, 'eligible_probability'] = probabilities[primary_model][:, 1]
+        for name, prob in probabilities.items():
+            out.loc[valid, f'{name.lower().replace(" ", "_")}_eligible_probability'] = prob[:, 1]
+
+    masks = {provider: mask & valid
+             for provider, mask in rule_engine.evaluate(columns_from_matrix(X, features)).items()}
+    for provider, mask in masks.items():
+        out[f'{provider.lower().replace(" ", "_")}_eligible'] = mask
+    out['eligible_scholarships_count'] = np.vstack(list(masks.values())).sum(axis=0)
+
+    out['error'] = np.where(valid, '', 'Invalid feature value')
+    return out
+
+
+def _init_worker(models_dir):
+    """Load models once in each worker process"""
+    global _worker_models, _worker_features
+    _worker_models, _worker_features = load_model_files(models_dir)
+
+
+def _score_in_worker(df):
+    return score_frame(_worker_models, _worker_features, df)
+
+
+def write_chunk(result, out, output_format, first):
+    """Append one scored chunk to the output stream"""
+    if output_format == 'ndjson':
+        # Ends with a newline already; with no rows it would write a blank line
+        if len(result):
+            result.to_json(out, orient='records', lines=True)
+    else:
+        result.to_csv(out, index=False, header=first)
+
+
+def score_file(input_path, output_path='-', chunk_size=10000, workers=1,
+               output_format=None, models_dir='models'):
+    """
+    Stream `input_path` through the models and provider rules.
+    At most `workers * 2` chunks are in flight at any time, so memory
+    stays bounded regardless of file size. Returns the number of rows scored.
+    """
+    if output_format is None:
+        output_format = 'ndjson' if output_path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+    # The promoted registry version, resolved once so every chunk uses the same models
+    models_dir = ModelRegistry(models_dir).current_dir()
+    if not any(os.path.exists(os.path.join(models_dir, f)) for f in MODEL_FILES.values()):
+        raise SystemExit('Models not loaded. Please train models first.')
+
+    out = sys.stdout if output_path == '-' else open(output_path, 'w', newline='')
+    rows = 0
+    first = True
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(models_dir,)) as pool:
+                pending = deque()
+                for chunk in iter_chunks(input_path, chunk_size):
+                    pending.append(pool.submit(_score_in_worker, chunk))
+                    # Write results in input order, keeping the pipeline bounded
+                    while len(pending) >= workers * 2:
+                        result = pending.popleft().result()
+                        write_chunk(result, out, output_format, first)
+                        first = False
+                        rows += len(result)
+                while pending:
+                    result = pending.popleft().result()
+                    write_chunk(result, out, output_format, first)
+                    first = False
+                    rows += len(result)
+        else:
+            models, features = load_model_files(models_dir)
+            for chunk in iter_chunks(input_path, chunk_size):
+                result = score_frame(models, features, chunk)
+                write_chunk(result, out, output_format, first)
+                first = False
+                rows += len(result)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a student file with the trained models and provider rules.')
+    parser.add_argument('input', help='Input CSV or Parquet file (scholarship_dataset.csv layout)')
+    parser.add_argument('-o', '--output', default='-', help='Output file (.csv or .ndjson), default stdout')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help='Output format (default: from output extension)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Rows per chunk (default: 10000)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes, 0 for one per CPU core (default: 1)')
+    parser.add_argument('--models-dir', default='models', help='Model registry or directory with trained models')
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    start = time.time()
+    rows = score_file(args.input, args.output, args.chunk_size, workers, args.format, args.models_dir)
+    elapsed = time.time() - start
+    print(f"Scored {rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
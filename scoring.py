@@ -0,0 +1,233 @@
+"""
+Vectorized scoring helpers shared by the web app and offline tools
+"""
+import hashlib
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+
+from metrics import BATCH_ROWS, MODEL_ERRORS, MODEL_LATENCY
+from rules import rule_engine, columns_from_matrix, eligible_providers
+from compiled_models import compile_model, compiled_filename, file_digest, load_compiled
+from schema import FEATURE_ORDER, error_message, schema_for
+
+MODEL_FILES = {
+    'Logistic Regression': 'logistic_regression_model.pkl',
+    'Decision Tree': 'decision_tree_model.pkl',
+    'Random Forest': 'random_forest_model.pkl'
+}
+
+# Modules the pickled models are defined in
+SKLEARN_MODULES = ('sklearn.base', 'sklearn.linear_model', 'sklearn.tree', 'sklearn.ensemble')
+
+
+class ScoringError(Exception):
+    """Raised when no model could score a batch"""
+
+
+def load_model_files(models_dir='models', compiled=True, mmap_mode='r'):
+    """
+    Load all trained models and the feature list from a models directory.
+    With `compiled`, each model is served by its array-backed engine from
+    compiled_models: memory-mapped from the bundle written by
+    train_models.py when it matches the .pkl, otherwise compiled from the
+    .pkl after a parity check. When every bundle is current, no .pkl is
+    unpickled and scikit-learn is never imported.
+    Returns (models, features); missing files are skipped.
+    """
+    paths = {name: os.path.join(models_dir, filename) for name, filename in MODEL_FILES.items()}
+    paths = {name: path for name, path in paths.items() if os.path.exists(path)}
+
+    bundles = {}
+    if compiled:
+        for name, path in paths.items():
+            bundle_path = os.path.join(models_dir, compiled_filename(MODEL_FILES[name]))
+            if not os.path.exists(bundle_path):
+                continue
+            try:
+                bundles[name] = load_compiled(bundle_path, mmap_mode=mmap_mode, source_digest=file_digest(path))
+            except Exception as e:
+                print(f"Ignoring compiled bundle for {name} ({e})")
+
+    # Unpickle the remaining models concurrently; file reads and array copies overlap
+    to_load = {name: path for name, path in paths.items() if name not in bundles}
+    loaded = dict(bundles)
+    if to_load:
+        # Concurrent first imports of sklearn can see a partially initialized
+        # module, so import what the pickles need on this thread first
+        for module in SKLEARN_MODULES:
+            importlib.import_module(module)
+        with ThreadPoolExecutor(max_workers=len(to_load)) as pool:
+            loaded.update(zip(to_load, pool.map(joblib.load, to_load.values())))
+    models = {name: loaded[name] for name in paths}
+
+    if compiled:
+        for name in to_load:
+            try:
+                models[name] = compile_model(models[name])
+            except Exception as e:
+                print(f"Using scikit-learn {name} (compilation failed: {e})")
+
+    features = []
+    features_path = os.path.join(models_dir, 'features.json')
+    if os.path.exists(features_path):
+        with open(features_path, 'r') as f:
+            features = json.load(f)
+
+    return models, features
+
+
+def model_version(models_dir='models'):
+    """Short content hash of the model files, identifying the trained bundle"""
+    digest = hashlib.sha1()
+    for filename in sorted(MODEL_FILES.values()) + ['features.json']:
+        path = os.path.join(models_dir, filename)
+        if os.path.exists(path):
+            digest.update(f'{filename}:{file_digest(path)}'.encode())
+    return digest.hexdigest()[:12]
+
+
+def parse_batch_body(body, content_type=''):
+    """
+    Parse a batch request body given as a JSON array or NDJSON.
+    Returns a list of rows; rows that could not be decoded are returned
+    as ValueError instances so they can be reported individually.
+    """
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+
+    text = body.strip()
+    if not text:
+        return []
+
+    if 'ndjson' not in content_type and text.startswith('['):
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError('Request body must be a JSON array of students.')
+        return rows
+
+    rows = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except ValueError as e:
+            rows.append(ValueError(f'Invalid JSON on line {line_number}: {e}'))
+    return rows
+
+
+def build_feature_matrix(rows, features=None):
+    """
+    Build a single feature matrix from a list of student records, validated
+    by the schema of `features`. Returns (matrix, row_indices, errors):
+    row_indices maps each matrix row back to its position in `rows`, errors
+    maps a row position to its list of field errors.
+    """
+    return schema_for(features or FEATURE_ORDER).matrix(rows)
+
+
+def predict_matrix(models, X, source='batch'):
+    """
+    Score a feature matrix with every model using a single predict_proba call.
+    Predictions are derived from the probabilities rather than a second
+    predict call. Returns (predictions, probabilities, errors) where
+    probabilities[name] is an (n, 2) array of [not_eligible, eligible].
+    `source` labels the batch-size metric (batch, job, file, ...).
+    """
+    predictions = {}
+    probabilities = {}
+    errors = {}
+    BATCH_ROWS.observe(len(X), source=source)
+
+    for name, model in models.items():
+        try:
+            start = time.perf_counter()
+            prob = np.asarray(model.predict_proba(X))
+            MODEL_LATENCY.observe(time.perf_counter() - start, model=name, call='predict_proba_batch')
+            if prob.ndim == 1:
+                prob = prob.reshape(-1, 1)
+
+            if prob.shape[1] >= 2:
+                prob = prob[:, :2]
+                classes = getattr(model, 'classes_', np.array([0, 1]))
+                pred = np.asarray(classes)[prob.argmax(axis=1)].astype(int)
+            else:
+                # Fallback if only one class probability is returned
+                eligible = prob[:, 0]
+                prob = np.column_stack([1.0 - eligible, eligible])
+                pred = (eligible >= 0.5).astype(int)
+
+            predictions[name] = pred
+            probabilities[name] = prob
+        except Exception as e:
+            print(f"Error with model {name}: {str(e)}")
+            MODEL_ERRORS.inc(model=name)
+            errors[name] = str(e)
+
+    return predictions, probabilities, errors
+
+
+def primary_model_name(predictions):
+    """Use Random Forest as primary model (usually best)"""
+    if 'Random Forest' in predictions:
+        return 'Random Forest'
+    return list(predictions.keys())[0]
+
+
+def probability_dict(prob_row):
+    """Convert a [not_eligible, eligible] row to the response format"""
+    return {
+        'not_eligible': float(prob_row[0]),
+        'eligible': float(prob_row[1])
+    }
+
+
+def score_rows(models, features, rows, start_index=0, source='batch', observe=None):
+    """
+    Score a list of student records in one vectorized pass over the models
+    and the provider rules. Returns (results, failed_count) where results
+    holds one dict per input row, in order; rows that fail to parse get
+    'success': False and an error instead of failing the batch.
+    `observe(X, eligible_probability, predictions)` is called with the
+    scored rows and the primary model's outputs, e.g. for drift monitoring.
+    """
+    feature_names = features or FEATURE_ORDER
+    X, row_indices, row_errors = build_feature_matrix(rows, feature_names)
+
+    predictions, probabilities = {}, {}
+    if len(row_indices) > 0:
+        predictions, probabilities, _ = predict_matrix(models, X, source=source)
+        if not predictions:
+            raise ScoringError('Failed to get predictions from any model.')
+
+    primary_model = primary_model_name(predictions) if predictions else None
+    if observe is not None and primary_model is not None:
+        observe(X, probabilities[primary_model][:, 1], predictions[primary_model])
+
+    # Provider eligibility for every row in one vectorized pass
+    provider_masks = rule_engine.evaluate(columns_from_matrix(X, feature_names))
+
+    results = [None] * len(rows)
+    for i, errors in row_errors.items():
+        results[i] = {'index': start_index + i, 'success': False, 'error': error_message(errors), 'errors': errors}
+
+    for position, i in enumerate(row_indices):
+        results[i] = {
+            'index': start_index + i,
+            'success': True,
+            'prediction': int(predictions[primary_model][position]),
+            'probability': probability_dict(probabilities[primary_model][position]),
+            'all_predictions': {name: int(pred[position]) for name, pred in predictions.items()},
+            'all_probabilities': {name: probability_dict(prob[position])
+                                  for name, prob in probabilities.items()},
+            'model_used': primary_model,
+            'eligible_scholarships': eligible_providers(provider_masks, position)
+        }
+
+    return results, len(row_errors)
@@ -24,10 +24,14 @@ function showTab(tabName) {
     }
 }
 
+// Number of the latest submission; responses to earlier ones are dropped
+let predictionRequest = 0;
+
 // Prediction form handler
 document.getElementById('prediction-form').addEventListener('submit', async (e) => {
     e.preventDefault();
     
+    const requestId = ++predictionRequest;
     const formData = {
         year_of_study: parseInt(document.getElementById('year_of_study').value),
         cgpa: parseFloat(document.getElementById('cgpa').value),
@@ -38,7 +42,8 @@ document.getElementById('prediction-form').addEventListener('submit', async (e)
     };
     
     try {
-        const response = await fetch('/predict', {
+        // The primary model answers first; the other models load afterwards
+        const response = await fetch('/predict?tier=lazy', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -47,20 +52,58 @@ document.getElementById('prediction-form').addEventListener('submit', async (e)
         });
         
         const data = await response.json();
+        if (requestId !== predictionRequest) {
+            return;
+        }
         
         if (data.success) {
             displayPredictionResult(data);
+            if (data.pending_models && data.pending_models.length > 0) {
+                loadPendingModels(data, formData, requestId);
+            }
         } else {
             showError(data.error || 'An error occurred while processing your request.');
         }
     } catch (error) {
+        if (requestId !== predictionRequest) {
+            return;
+        }
         console.error('Error:', error);
         showError('An error occurred. Please try again. Error: ' + error.message);
     }
 });
 
+// Fetch the secondary model predictions for the comparison view
+async function loadPendingModels(data, formData, requestId) {
+    try {
+        const response = await fetch('/predict/models', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ ...formData, models: data.pending_models })
+        });
+        
+        const extra = await response.json();
+        
+        // A newer submission has replaced this result in the meantime
+        if (requestId !== predictionRequest) {
+            return;
+        }
+        
+        if (extra.success) {
+            Object.assign(data.all_predictions, extra.all_predictions);
+            Object.assign(data.all_probabilities, extra.all_probabilities);
+            data.pending_models = [];
+            displayPredictionResult(data, false);
+        }
+    } catch (error) {
+        console.error('Error loading model comparison:', error);
+    }
+}
+
 // Display prediction result
-function displayPredictionResult(data) {
+function displayPredictionResult(data, scroll = true) {
     const resultContainer = document.getElementById('prediction-result');
     const resultContent = document.getElementById('result-content');
     
@@ -233,7 +276,9 @@ function displayPredictionResult(data) {
     resultContainer.style.display = 'block';
     
     // Scroll to result
-    resultContainer.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+    if (scroll) {
+        resultContainer.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+    }
 }
 
 // Load dashboard data
@@ -433,6 +478,16 @@ function displayModelComparison(results) {
                         <div class="metric-label">F1-Score</div>
                         <div class="metric-value">${(metrics.f1_score * 100).toFixed(2)}%</div>
                     </div>
+                    ${metrics.inference_latency_ms ? `
+                    <div class="metric-item">
+                        <div class="metric-label">Latency (1 row)</div>
+                        <div class="metric-value">${metrics.inference_latency_ms.single_row_ms.toFixed(2)} ms</div>
+                    </div>` : ''}
+                    ${metrics.fit_time_seconds !== undefined ? `
+                    <div class="metric-item">
+                        <div class="metric-label">Fit Time</div>
+                        <div class="metric-value">${metrics.fit_time_seconds.toFixed(2)} s</div>
+                    </div>` : ''}
                 </div>
             </div>
         `;
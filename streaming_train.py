@@ -0,0 +1,201 @@
+"""
+Out-of-core training: fit the three models from a dataset streamed in chunks
+
+Used by `python train_models.py --streaming`. Memory is bounded by the chunk
+size and the decision tree sample, not by the dataset:
+
+- Logistic Regression: SGD with log loss, fitted chunk by chunk on
+  standardized features (means and variances gathered in a first pass),
+  then folded back into a plain LogisticRegression on the raw features.
+- Random Forest: warm-started; each chunk contributes its share of the
+  trees, each tree bootstrapped from that chunk.
+- Decision Tree: a single tree needs all its rows at once, so it is fitted
+  on a uniform random sample of at most `sample_rows` training rows.
+
+Rows go to the test set by a seeded draw per chunk, so the split is
+reproducible for a given seed and chunk size. Metrics are computed from
+confusion matrices accumulated over the test rows.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+from dataset_io import iter_dataset
+
+CLASSES = np.array([0, 1])
+
+# Test rows kept in memory for the latency measurement
+LATENCY_SAMPLE_ROWS = 1000
+
+
+def split_mask(chunk_index, rows, test_size, seed):
+    """True for the rows of a chunk that belong to the test set"""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+    return rng.random(rows) < test_size
+
+
+def iter_split(path, features, chunk_size, test_size, seed, part):
+    """Yield (X, y) for the 'train' or the 'test' rows of every chunk"""
+    for i, chunk in enumerate(iter_dataset(path, chunk_size, columns=features + ['eligible'])):
+        mask = split_mask(i, len(chunk), test_size, seed)
+        if part == 'train':
+            mask = ~mask
+        if mask.any():
+            yield chunk.loc[mask, features], chunk.loc[mask, 'eligible'].to_numpy()
+
+
+class Reservoir:
+    """Uniform random sample of at most `size` rows from a stream of DataFrames"""
+
+    def __init__(self, size, seed):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.frame = None
+        self.keys = np.empty(0)
+
+    def add(self, frame):
+        # Every row gets a random key; the sample is the rows with the smallest keys
+        keys = np.concatenate([self.keys, self.rng.random(len(frame))])
+        frame = frame if self.frame is None else pd.concat([self.frame, frame])
+        if len(keys) > self.size:
+            keep = np.sort(np.argpartition(keys, self.size)[:self.size])
+            frame, keys = frame.iloc[keep], keys[keep]
+        self.frame, self.keys = frame, keys
+
+
+def trees_per_chunk(n_estimators, n_chunks):
+    """Spread n_estimators trees as evenly as possible over n_chunks chunks"""
+    return np.bincount(np.arange(n_estimators) * n_chunks // n_estimators, minlength=n_chunks)
+
+
+def fold_scaler(sgd, scaler, base_model, features):
+    """
+    A LogisticRegression on raw features equivalent to `sgd` applied to
+    scaler-transformed features, so the app and the compiled bundle see
+    the same model type as with in-memory training.
+    """
+    model = clone(base_model)
+    model.coef_ = sgd.coef_ / scaler.scale_
+    model.intercept_ = sgd.intercept_ - (sgd.coef_ * scaler.mean_ / scaler.scale_).sum(axis=1)
+    model.classes_ = CLASSES
+    model.n_features_in_ = len(features)
+    model.feature_names_in_ = np.array(features, dtype=object)
+    model.n_iter_ = np.array([sgd.n_iter_])
+    return model
+
+
+def train_streaming(path, features, base_models, chunk_size=100_000, test_size=0.2, seed=42,
+                    sample_rows=500_000, epochs=2, n_jobs=None):
+    """
+    Fit every model in base_models ('Logistic Regression', 'Decision Tree',
+    'Random Forest') from the training rows of a chunked dataset.
+    Returns (models, fit_times, summary, sample) where sample is the
+    uniform training sample (features and label).
+    """
+    # Pass 1: feature scaling statistics, the tree sample, and chunk counts
+    start = time.perf_counter()
+    scaler = StandardScaler()
+    reservoir = Reservoir(sample_rows, seed)
+    n_chunks = train_rows = eligible = 0
+    for X, y in iter_split(path, features, chunk_size, test_size, seed, 'train'):
+        scaler.partial_fit(X)
+        reservoir.add(X.assign(eligible=y))
+        n_chunks += 1
+        train_rows += len(y)
+        eligible += int(y.sum())
+    if n_chunks == 0:
+        raise ValueError('No training rows in the dataset')
+    scan_time = time.perf_counter() - start
+
+    fit_times = {'Logistic Regression': 0.0, 'Random Forest': 0.0}
+    models = {}
+
+    # Pass 2 and later: SGD epochs; the forest grows during the first one
+    sgd = SGDClassifier(loss='log_loss', average=True, random_state=seed)
+    forest = clone(base_models['Random Forest']).set_params(warm_start=True, n_estimators=0, n_jobs=n_jobs)
+    tree_counts = trees_per_chunk(base_models['Random Forest'].n_estimators, n_chunks)
+    carried = 0
+    for epoch in range(epochs):
+        for i, (X, y) in enumerate(iter_split(path, features, chunk_size, test_size, seed, 'train')):
+            start = time.perf_counter()
+            sgd.partial_fit(scaler.transform(X), y, classes=CLASSES)
+            fit_times['Logistic Regression'] += time.perf_counter() - start
+            if epoch > 0:
+                continue
+            start = time.perf_counter()
+            carried += tree_counts[i]
+            # Trees need both classes in their chunk; otherwise they move on to the next one
+            if carried and len(np.unique(y)) == len(CLASSES):
+                forest.set_params(n_estimators=forest.n_estimators + int(carried))
+                forest.fit(X, y)
+                carried = 0
+            fit_times['Random Forest'] += time.perf_counter() - start
+
+    # Trees still carried after the last chunk are fitted on the training sample
+    sample = reservoir.frame
+    if carried and len(np.unique(sample['eligible'])) == len(CLASSES):
+        start = time.perf_counter()
+        forest.set_params(n_estimators=forest.n_estimators + int(carried))
+        forest.fit(sample[features], sample['eligible'])
+        fit_times['Random Forest'] += time.perf_counter() - start
+    n_trees = base_models['Random Forest'].n_estimators
+    if forest.n_estimators < n_trees:
+        raise ValueError(f'Only {forest.n_estimators} of {n_trees} Random Forest trees could be fitted: '
+                         'the training rows do not contain both classes')
+    forest.set_params(warm_start=False, n_jobs=None)
+    models['Logistic Regression'] = fold_scaler(sgd, scaler, base_models['Logistic Regression'], features)
+    models['Random Forest'] = forest
+
+    start = time.perf_counter()
+    models['Decision Tree'] = clone(base_models['Decision Tree']).fit(sample[features], sample['eligible'])
+    fit_times['Decision Tree'] = time.perf_counter() - start
+
+    summary = {
+        'chunk_size': chunk_size,
+        'first_pass_seconds': scan_time,
+        'train_chunks': n_chunks,
+        'train_rows': train_rows,
+        'train_eligible': eligible,
+        'decision_tree_sample_rows': len(sample),
+        'sgd_epochs': epochs,
+        'random_forest_trees': int(forest.n_estimators)
+    }
+    return {name: models[name] for name in base_models}, fit_times, summary, sample
+
+
+def evaluate_streaming(models, path, features, chunk_size=100_000, test_size=0.2, seed=42):
+    """
+    Confusion matrices of every model over the test rows, accumulated chunk
+    by chunk. Returns (confusion matrices, test row count, latency sample).
+    """
+    confusion = {name: np.zeros((2, 2), dtype=np.int64) for name in models}
+    test_rows = 0
+    latency_sample = []
+    for X, y in iter_split(path, features, chunk_size, test_size, seed, 'test'):
+        for name, model in models.items():
+            predicted = model.predict(X).astype(np.int64)
+            confusion[name] += np.bincount(y.astype(np.int64) * 2 + predicted, minlength=4).reshape(2, 2)
+        test_rows += len(y)
+        if sum(map(len, latency_sample)) < LATENCY_SAMPLE_ROWS:
+            latency_sample.append(X)
+    sample = pd.concat(latency_sample).iloc[:LATENCY_SAMPLE_ROWS] if latency_sample else None
+    return confusion, test_rows, sample
+
+
+def metrics_from_confusion(cm):
+    """Accuracy, precision, recall and F1 from a 2x2 confusion matrix [[tn, fp], [fn, tp]]"""
+    (tn, fp), (fn, tp) = cm.tolist()
+    total = tn + fp + fn + tp
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        'accuracy': (tp + tn) / total if total else 0.0,
+        'precision': precision,
+        'recall': recall,
+        'f1_score': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        'confusion_matrix': cm.tolist()
+    }
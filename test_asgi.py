@@ -0,0 +1,109 @@
+"""ASGI mode: streamed responses are buffered up to a limit"""
+import asyncio
+import threading
+
+import pytest
+
+import asgi
+
+CHUNKS = 200
+
+
+@pytest.fixture
+def streaming_view(monkeypatch):
+    """A WSGI app streaming CHUNKS chunks; records how many it has produced"""
+    produced = []
+    done = threading.Event()
+
+    def view(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        try:
+            for i in range(CHUNKS):
+                produced.append(i)
+                yield b'x'
+        finally:
+            done.set()
+
+    monkeypatch.setattr(asgi, 'flask_app', view)
+    return produced, done
+
+
+def scope(path='/stream'):
+    return {'type': 'http', 'method': 'GET', 'path': path, 'headers': []}
+
+
+def receiver(disconnect):
+    """The request (no body), then http.disconnect once `disconnect` is set"""
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnect.wait()
+        return {'type': 'http.disconnect'}
+    return receive
+
+
+def test_view_waits_for_a_slow_client(streaming_view):
+    produced, done = streaming_view
+    seen = []
+
+    async def run():
+        disconnect = asyncio.Event()
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                seen.append(len(produced))
+                await asyncio.sleep(0.001)
+        await asgi.app(scope(), receiver(disconnect), send)
+        disconnect.set()
+    asyncio.run(run())
+
+    assert len(produced) == CHUNKS and done.is_set()
+    # While the client reads chunk n, the view is at most a buffer's worth ahead
+    for n, ahead in enumerate(seen):
+        assert ahead <= n + asgi.STREAM_BUFFER_CHUNKS + 2
+
+
+def test_view_stops_when_the_client_goes_away(streaming_view):
+    produced, done = streaming_view
+
+    async def run():
+        disconnect = asyncio.Event()
+        received = 0
+
+        async def send(message):
+            nonlocal received
+            received += 1
+            if received == 5:
+                disconnect.set()
+                # The client stops reading; the server must still finish
+                await asyncio.sleep(0.05)
+        await asyncio.wait_for(asgi.app(scope(), receiver(disconnect), send), timeout=5)
+    asyncio.run(run())
+
+    assert done.wait(5)
+    assert len(produced) < CHUNKS
+
+
+def test_view_is_released_when_sending_fails(streaming_view):
+    produced, done = streaming_view
+
+    async def run():
+        received = 0
+
+        async def send(message):
+            nonlocal received
+            received += 1
+            if received == 3:
+                await asyncio.sleep(0.05)
+                raise OSError('connection reset')
+        with pytest.raises(OSError):
+            await asgi.app(scope(), receiver(asyncio.Event()), send)
+    asyncio.run(run())
+
+    # The view was waiting on a full buffer when the response ended
+    assert done.wait(5)
+    assert len(produced) < CHUNKS
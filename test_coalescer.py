@@ -0,0 +1,83 @@
+"""Micro-batching of concurrent single-student predictions"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from coalescer import PredictionCoalescer
+from scoring import predict_matrix, probability_dict
+
+
+class CgpaModel:
+    """Eligible with probability cgpa / 4; records the size of every call"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def predict_proba(self, X):
+        with self.lock:
+            self.calls.append(len(X))
+        if self.fail:
+            raise RuntimeError('model unavailable')
+        eligible = X[:, 1] / 4
+        return np.column_stack([1 - eligible, eligible])
+
+
+def rows(n):
+    return [np.array([2, 4 * (i + 1) / (n + 1), 40000, 60, 1, 50], dtype=float) for i in range(n)]
+
+
+def predict_concurrently(coalescer, models, names, features, stop_after_first=False):
+    with ThreadPoolExecutor(len(features)) as pool:
+        futures = [pool.submit(coalescer.predict, models, names, row, stop_after_first) for row in features]
+        return [future.result() for future in futures]
+
+
+def test_concurrent_callers_share_one_call_per_model():
+    models = {'A': CgpaModel(), 'B': CgpaModel()}
+    # A long window: the batch is flushed by filling up, not by the timer
+    coalescer = PredictionCoalescer(window=5, max_batch=8)
+    features = rows(8)
+    results = predict_concurrently(coalescer, models, ['A', 'B'], features)
+
+    assert models['A'].calls == models['B'].calls == [8]
+    stats = coalescer.stats()
+    assert stats['requests'] == 8 and stats['batches'] == 1 and stats['batch_sizes'] == {8: 1}
+
+    # Every caller gets its own row's answer, as if it had been scored alone
+    for row, (predictions, probabilities) in zip(features, results):
+        expected, expected_probabilities, _ = predict_matrix(models, row.reshape(1, -1))
+        assert predictions == {name: int(p[0]) for name, p in expected.items()}
+        assert probabilities == {name: probability_dict(p[0]) for name, p in expected_probabilities.items()}
+
+
+def test_window_flushes_a_partial_batch():
+    coalescer = PredictionCoalescer(window=0.01, max_batch=32)
+    predictions, probabilities = coalescer.predict({'A': CgpaModel()}, ['A'], rows(1)[0])
+    assert set(predictions) == set(probabilities) == {'A'}
+    assert coalescer.stats()['batch_sizes'] == {1: 1}
+
+
+def test_stop_after_first_falls_back_to_the_next_model():
+    models = {'A': CgpaModel(fail=True), 'B': CgpaModel(), 'C': CgpaModel()}
+    coalescer = PredictionCoalescer(window=5, max_batch=4)
+    results = predict_concurrently(coalescer, models, ['A', 'B', 'C'], rows(4), stop_after_first=True)
+    assert all(set(predictions) == {'B'} for predictions, _ in results)
+    assert models['A'].calls == models['B'].calls == [4]
+    assert models['C'].calls == []
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    coalescer = PredictionCoalescer(window=5, max_batch=3)
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(coalescer.predict, {'A': CgpaModel()}, ['A', 'missing'], row) for row in rows(3)]
+        for future in futures:
+            with pytest.raises(KeyError):
+                future.result()
+
+    # The dispatcher keeps going after a failed batch
+    results = predict_concurrently(coalescer, {'A': CgpaModel()}, ['A'], rows(3))
+    assert [set(predictions) for predictions, _ in results] == [{'A'}] * 3
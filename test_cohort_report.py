@@ -0,0 +1,78 @@
+"""Cohort reports: the same totals however the cohort is chunked"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from cohort_report import CohortReport, report_file
+from generate_dataset import generate_block
+from schema import FEATURE_ORDER
+
+
+@pytest.fixture(scope='module')
+def cohort():
+    df = generate_block(0, 0, 2000, seed=5)[FEATURE_ORDER]
+    # A few rows the report should count as invalid rather than score
+    df.loc[[10, 700], 'cgpa'] = np.nan
+    df.loc[1500, 'family_income'] = -1
+    return df
+
+
+def flatten(value, prefix=''):
+    if isinstance(value, dict):
+        items = {}
+        for key, item in value.items():
+            items.update(flatten(item, f'{prefix}/{key}'))
+        return items
+    return {prefix: value}
+
+
+def assert_same_report(actual, expected):
+    actual, expected = flatten(actual), flatten(expected)
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, float):
+            # Sums are added up in a different order
+            assert actual[key] == pytest.approx(value, rel=1e-9), key
+        else:
+            assert actual[key] == value, key
+
+
+def test_report_is_the_same_for_any_chunk_size(cohort, tmp_path):
+    path = tmp_path / 'cohort.csv'
+    cohort.to_csv(path, index=False)
+    whole = report_file(str(path), chunk_size=len(cohort))
+    assert whole['invalid_rows'] == 3
+    assert whole['stats']['total_samples'] == len(cohort) - 3
+    for chunk_size in (300, 7):
+        assert_same_report(report_file(str(path), chunk_size=chunk_size), whole)
+
+
+def test_groups_add_up_to_the_overall_totals(app_module, cohort):
+    report = CohortReport(app_module.model_bundle.models, FEATURE_ORDER)
+    report.add(cohort)
+    result = report.result()
+    overall = result['stats']
+    for grouping in ('year_of_study', 'income_band'):
+        groups = result['groups'][grouping].values()
+        assert sum(g['total_samples'] for g in groups) == overall['total_samples']
+        assert sum(g['eligible_count'] for g in groups) == overall['eligible_count']
+    for provider, group in result['groups']['provider'].items():
+        assert group['total_samples'] == overall['providers'][provider]['eligible_count']
+
+
+def test_empty_report(app_module):
+    result = CohortReport(app_module.model_bundle.models, FEATURE_ORDER).result()
+    assert result['stats']['total_samples'] == 0
+    assert all(groups == {} for groups in result['groups'].values())
+
+
+def test_endpoint_csv_and_json_agree(client, cohort):
+    rows = cohort.iloc[:800]
+    from_csv = client.post('/cohort_report', data=rows.to_csv(index=False), content_type='text/csv').get_json()
+    # Missing values go over JSON as null
+    records = rows.astype(object).where(rows.notna(), None).to_dict(orient='records')
+    from_json = client.post('/cohort_report', json=records).get_json()
+    assert from_csv['success'] and from_json['success']
+    assert from_csv['invalid_rows'] == from_json['invalid_rows'] == 2
+    assert_same_report(from_json['groups'], from_csv['groups'])
+    assert_same_report(from_json['stats'], from_csv['stats'])
@@ -0,0 +1,75 @@
+"""Parity of the compiled engines with scikit-learn's predict_proba (run with pytest)"""
+import warnings
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from compiled_models import CompiledForest, compile_model, load_compiled, save_compiled
+from generate_dataset import generate_block
+from schema import FEATURE_ORDER
+
+MODELS = {
+    'Random Forest': lambda: RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0),
+    'Decision Tree': lambda: DecisionTreeClassifier(max_depth=8, random_state=0),
+    'Logistic Regression': lambda: LogisticRegression(max_iter=1000)
+}
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    df = generate_block(0, 0, 1500, seed=7)
+    return df[FEATURE_ORDER].to_numpy(dtype=float), df['eligible'].to_numpy()
+
+
+@pytest.fixture(scope='module', params=list(MODELS))
+def fitted(request, dataset):
+    X, y = dataset
+    return MODELS[request.param]().fit(X[:1000], y[:1000])
+
+
+def rows_to_check(compiled, X):
+    """Held-out rows, probe rows, and rows lying exactly on every split threshold"""
+    rows = [X[1000:], compiled.probe_matrix()]
+    if isinstance(compiled, CompiledForest):
+        is_split = compiled.left != np.arange(len(compiled.left))
+        on_threshold = np.repeat(X[1000:1001], is_split.sum(), axis=0)
+        on_threshold[np.arange(len(on_threshold)), compiled.feature[is_split]] = compiled.threshold[is_split]
+        rows.append(on_threshold)
+    return np.vstack(rows)
+
+
+def assert_same_proba(model, compiled, X):
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        expected = model.predict_proba(X)
+    np.testing.assert_allclose(compiled.predict_proba(X), expected, rtol=0, atol=1e-9)
+
+
+def test_batch_matches_sklearn(fitted, dataset):
+    compiled = compile_model(fitted, verify=False)
+    assert_same_proba(fitted, compiled, rows_to_check(compiled, dataset[0]))
+
+
+def test_single_rows_match_sklearn(fitted, dataset):
+    compiled = compile_model(fitted, verify=False)
+    for row in rows_to_check(compiled, dataset[0])[::25]:
+        assert_same_proba(fitted, compiled, row.reshape(1, -1))
+        np.testing.assert_allclose(compiled.predict_proba(row), compiled.predict_proba(row.reshape(1, -1)))
+
+
+def test_predict_matches_sklearn(fitted, dataset):
+    compiled = compile_model(fitted, verify=False)
+    X = dataset[0][1000:]
+    np.testing.assert_array_equal(compiled.predict(X), fitted.predict(X))
+
+
+def test_bundle_round_trip(fitted, dataset, tmp_path):
+    path = tmp_path / 'model_compiled.joblib'
+    save_compiled(compile_model(fitted), path, source_digest='abc')
+    loaded = load_compiled(path, source_digest='abc')
+    assert_same_proba(fitted, loaded, rows_to_check(loaded, dataset[0]))
+    with pytest.raises(ValueError):
+        load_compiled(path, source_digest='other')
@@ -0,0 +1,55 @@
+"""Merging of per-worker drift snapshots"""
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from drift import DriftMonitor, load_reference
+from schema import FEATURE_ORDER
+
+ROW = [[2, 3.5, 40000, 60, 1, 50]]
+
+
+@pytest.fixture(scope='module')
+def reference():
+    return load_reference('models')
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def write_snapshot(reference, directory, pid, rows):
+    """A snapshot as worker `pid` would have written it"""
+    monitor = DriftMonitor(reference, FEATURE_ORDER, 'v1')
+    monitor.observe(np.array(ROW * rows, dtype=float))
+    path = os.path.join(directory, f'{pid}.json')
+    with open(path, 'w') as f:
+        json.dump(monitor._snapshot(), f)
+    return path
+
+
+def test_merges_live_workers_and_skips_exited_ones(reference, tmp_path):
+    idle = write_snapshot(reference, tmp_path, os.getppid(), rows=3)
+    # Written long ago by a worker that is still running but idle
+    os.utime(idle, (0, 0))
+    exited = write_snapshot(reference, tmp_path, dead_pid(), rows=5)
+
+    monitor = DriftMonitor(reference, FEATURE_ORDER, 'v1', directory=str(tmp_path))
+    monitor.observe(np.array(ROW, dtype=float))
+    inputs, _, _, workers = monitor.merged()
+    assert workers == 2
+    assert inputs.count == 4
+    # Loading a monitor (startup, hot reload) leaves other workers' files alone
+    assert os.path.exists(idle) and os.path.exists(exited)
+
+
+def test_other_model_versions_are_not_merged(reference, tmp_path):
+    write_snapshot(reference, tmp_path, os.getppid(), rows=3)
+    monitor = DriftMonitor(reference, FEATURE_ORDER, 'v2', directory=str(tmp_path))
+    assert monitor.merged()[3] == 1
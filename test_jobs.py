@@ -0,0 +1,110 @@
+"""Background scoring jobs: submission, scoring, results and restarts"""
+import json
+import time
+
+import pytest
+
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobQueueFull, JobRunner, JobStore
+from scoring import load_model_files
+
+
+@pytest.fixture(scope='module')
+def models():
+    return load_model_files('models')
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path))
+
+
+def run_next(store, models, chunk_size=2):
+    job = store.claim_next()
+    assert job['status'] == RUNNING
+    JobRunner(store, lambda: models, chunk_size=chunk_size).run_job(job)
+    return store.get(job['id'])
+
+
+def results(store, job_id):
+    with open(store.output_path(job_id)) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_json_job_lifecycle(store, models, student):
+    body = json.dumps([student, dict(student, cgpa=9), dict(student, cgpa=2.1)]).encode()
+    job = store.submit(body, 'application/json')
+    assert (job['status'], job['total_rows']) == (QUEUED, 3)
+
+    job = run_next(store, models)
+    assert job['status'] == DONE
+    assert (job['processed_rows'], job['failed_rows']) == (3, 1)
+    rows = results(store, job['id'])
+    assert [row['index'] for row in rows] == [0, 1, 2]
+    assert [row['success'] for row in rows] == [True, False, True]
+    assert store.claim_next() is None
+
+
+def test_csv_job_and_bad_ndjson_lines(store, models):
+    job = store.submit(b'cgpa,family_income\n3.6,20000\n2.0,\nabc,1\n', 'text/csv')
+    assert job['total_rows'] == 3
+    job = run_next(store, models)
+    assert job['status'] == DONE and job['failed_rows'] == 1
+    assert [row['success'] for row in results(store, job['id'])] == [True, True, False]
+
+    job = store.submit(b'{"cgpa": 3.6}\n{oops\n', 'application/x-ndjson')
+    rows = results(store, run_next(store, models)['id'])
+    assert rows[1]['error'].startswith('Invalid JSON on line 2')
+
+
+@pytest.mark.parametrize('body', [b'', b'year_of_study,cgpa\n'])
+def test_empty_csv_finishes_with_no_rows(store, models, body):
+    job = store.submit(body, 'text/csv')
+    assert job['total_rows'] == 0
+    job = run_next(store, models)
+    assert job['status'] == DONE and job['error'] is None
+    assert results(store, job['id']) == []
+
+
+def test_missing_models_fail_the_job(store, student):
+    store.submit(json.dumps([student]).encode(), 'application/json')
+    job = store.claim_next()
+    JobRunner(store, lambda: ({}, [])).run_job(job)
+    job = store.get(job['id'])
+    assert job['status'] == FAILED and 'Models not loaded' in job['error']
+
+
+def test_queued_and_expired_jobs_survive_a_restart(tmp_path, models, student):
+    body = json.dumps([student]).encode()
+    first = JobStore(str(tmp_path), lease_seconds=0)
+    interrupted = first.submit(body, 'application/json')
+    waiting = first.submit(body, 'application/json')
+    assert first.claim_next()['id'] == interrupted['id']
+    first.progress(interrupted['id'], 1, 0)
+
+    # A new process: the running job's lease has expired, so it is queued again from the start
+    time.sleep(0.01)
+    restarted = JobStore(str(tmp_path))
+    job = restarted.claim_next()
+    assert job['id'] == interrupted['id'] and job['processed_rows'] == 0
+    JobRunner(restarted, lambda: models).run_job(job)
+    assert run_next(restarted, models)['id'] == waiting['id']
+    assert restarted.count(DONE) == 2
+
+
+def test_queue_limit(store, student):
+    store.submit(b'[]', 'application/json', max_queued=1)
+    with pytest.raises(JobQueueFull):
+        store.submit(b'[]', 'application/json', max_queued=1)
+
+
+def test_jobs_api(client, student):
+    submitted = client.post('/jobs', json=[student, student])
+    assert submitted.status_code == 202
+    job_id = submitted.get_json()['job']['job_id']
+    deadline = time.time() + 10
+    while client.get(f'/jobs/{job_id}').get_json()['job']['status'] != DONE:
+        assert time.time() < deadline
+        time.sleep(0.05)
+    lines = client.get(f'/jobs/{job_id}/results').get_data(as_text=True).splitlines()
+    assert len(lines) == 2 and all(json.loads(line)['success'] for line in lines)
+    assert client.get('/jobs/unknown').status_code == 404
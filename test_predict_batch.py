@@ -0,0 +1,42 @@
+"""/predict_batch: JSON arrays, NDJSON and per-row failures"""
+import json
+
+import pytest
+
+
+def test_invalid_rows_fail_alone(client, student):
+    rows = [student, dict(student, cgpa=9), 'not a student', dict(student, cgpa='abc'), dict(student, cgpa=2.1)]
+    response = client.post('/predict_batch', json=rows)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['count'] == 5
+    assert body['failed_count'] == 3
+    assert [r['index'] for r in body['results']] == list(range(5))
+    assert [r['success'] for r in body['results']] == [True, False, False, False, True]
+    assert body['results'][1]['errors'] == [{'field': 'cgpa', 'message': 'must be between 0 and 4'}]
+    assert body['results'][3]['errors'] == [{'field': 'cgpa', 'message': 'must be a number'}]
+
+
+@pytest.mark.parametrize('cgpa', [3.5, 2.1])
+def test_rows_match_single_predictions(client, student, cgpa):
+    student = dict(student, cgpa=cgpa)
+    single = client.post('/predict', json=student).get_json()
+    row = client.post('/predict_batch', json=[student]).get_json()['results'][0]
+    assert row['prediction'] == single['prediction']
+    assert row['all_predictions'] == single['all_predictions']
+    assert row['eligible_scholarships'] == single['eligible_scholarships']
+    for name, probability in single['all_probabilities'].items():
+        assert row['all_probabilities'][name]['eligible'] == pytest.approx(probability['eligible'], abs=1e-12)
+
+
+def test_ndjson_reports_bad_lines(client, student):
+    body = '\n'.join([json.dumps(student), '{not json', '', json.dumps(dict(student, cgpa=2.1))])
+    response = client.post('/predict_batch', data=body, content_type='application/x-ndjson').get_json()
+    assert response['count'] == 3
+    assert [r['success'] for r in response['results']] == [True, False, True]
+    assert response['results'][1]['error'].startswith('Invalid JSON on line 2')
+
+
+def test_empty_body_scores_nothing(client):
+    body = client.post('/predict_batch', data='', content_type='application/json').get_json()
+    assert body['success'] and body['count'] == 0 and body['results'] == []
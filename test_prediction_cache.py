@@ -0,0 +1,41 @@
+"""/predict response cache: keys and the answers stored under them"""
+import pytest
+
+from prediction_cache import PredictionCache, make_cache_key, normalize_features
+
+
+def test_equivalent_inputs_share_a_key():
+    assert make_cache_key(normalize_features([3, '3.0', -0.0]), 'v1') == make_cache_key([3.0, 3.0, 0.0], 'v1')
+    assert make_cache_key(normalize_features([3.49999]), 'v1') != make_cache_key(normalize_features([3.5]), 'v1')
+
+
+def test_lru_eviction():
+    cache = PredictionCache(max_size=2)
+    for key in 'abc':
+        cache.set(key, {'key': key})
+    assert cache.get('a') is None
+    assert cache.get('c') == {'key': 'c'}
+    assert cache.stats()['evictions'] == 1
+
+
+@pytest.mark.parametrize('view', ['full', 'compact'])
+def test_inputs_straddling_a_rule_threshold_are_cached_apart(client, student, view):
+    # PETRONAS needs cgpa >= 3.5; both values would round to 3.5
+    above = client.post(f'/predict?view={view}', json=student).get_json()
+    below = client.post(f'/predict?view={view}', json=dict(student, cgpa=3.49999)).get_json()
+    assert 'PETRONAS' in above['eligible_scholarships']
+    assert 'PETRONAS' not in below['eligible_scholarships']
+    if view == 'compact':
+        assert below['inputs']['cgpa'] == 3.49999
+
+    # Served from the cache, still for the right inputs
+    again = client.post(f'/predict?view={view}', json=dict(student, cgpa=3.49999)).get_json()
+    assert again == below
+
+
+def test_equivalent_request_is_a_cache_hit(client, app_module, student):
+    first = client.post('/predict', json=student).get_json()
+    hits = app_module.prediction_cache.stats()['hits']
+    second = client.post('/predict', json=dict(student, cgpa='3.50', family_income=40000.0)).get_json()
+    assert second == first
+    assert app_module.prediction_cache.stats()['hits'] == hits + 1
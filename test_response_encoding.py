@@ -0,0 +1,57 @@
+"""Response negotiation, with and without the optional msgpack and brotli packages"""
+import gzip
+import json
+
+import pytest
+
+import response_encoding
+
+HEADERS = {'Accept': 'application/msgpack', 'Accept-Encoding': 'br, gzip'}
+
+
+@pytest.fixture
+def without_extras(monkeypatch):
+    monkeypatch.setattr(response_encoding, 'msgpack', None)
+    monkeypatch.setattr(response_encoding, 'brotli', None)
+
+
+def test_falls_back_to_gzipped_json(client, student, without_extras):
+    plain = client.post('/predict', json=student).get_json()
+    response = client.post('/predict', json=student, headers=HEADERS)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.get_data())) == plain
+
+
+def test_small_and_unaccepted_responses_are_not_compressed(client, student, without_extras):
+    # Brotli is not installed, and gzip was not offered
+    response = client.post('/predict', json=student, headers={'Accept-Encoding': 'br'})
+    assert 'Content-Encoding' not in response.headers
+    response = client.get('/predict/text', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    small = client.post('/predict_batch', data='', content_type='application/json',
+                        headers={'Accept-Encoding': 'gzip'})
+    assert len(small.get_data()) < response_encoding.MIN_COMPRESS_BYTES
+    assert 'Content-Encoding' not in small.headers
+
+
+def test_json_stays_the_default(client, student):
+    response = client.post('/predict', json=student, headers={'Accept': '*/*'})
+    assert response.mimetype == 'application/json'
+
+
+def test_msgpack_when_installed(client, student):
+    msgpack = pytest.importorskip('msgpack')
+    plain = client.post('/predict', json=student).get_json()
+    response = client.post('/predict', json=student, headers={'Accept': 'application/msgpack'})
+    assert response.mimetype == 'application/msgpack'
+    assert msgpack.unpackb(response.get_data(), raw=False) == plain
+
+
+def test_brotli_when_installed(client, student):
+    brotli = pytest.importorskip('brotli')
+    plain = client.post('/predict', json=student).get_json()
+    response = client.post('/predict', json=student, headers={'Accept-Encoding': 'br, gzip'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(response.get_data())) == plain
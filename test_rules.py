@@ -0,0 +1,79 @@
+"""Provider rule engine: parity with the hand-written if-chain it replaced"""
+import numpy as np
+import pytest
+
+from generate_dataset import generate_block
+from rules import SCHOLARSHIP_RULES, columns_from_matrix, rule_engine
+from schema import FEATURE_ORDER
+
+# The eligibility conditions of the original get_scholarship_recommendations
+LEGACY_ELIGIBILITY = {
+    'PETRONAS': lambda s: (s['cgpa'] >= 3.5 and s['cocurricular_score'] >= 70
+                           and s['leadership_positions'] >= 2 and s['community_service_hours'] >= 50),
+    'MARA': lambda s: s['family_income'] <= 80000 and s['cgpa'] >= 3.0 and s['cocurricular_score'] >= 50,
+    'Zakat': lambda s: s['family_income'] <= 50000 and s['cgpa'] >= 2.8 and s['community_service_hours'] >= 30,
+    'Yayasan UTP': lambda s: (s['cgpa'] >= 3.2 and (s['family_income'] <= 100000 or s['cocurricular_score'] >= 60)
+                              and s['year_of_study'] >= 1)
+}
+
+
+@pytest.fixture(scope='module')
+def students():
+    """Generated students plus one student sitting exactly on each rule threshold"""
+    X = generate_block(0, 0, 500, seed=3)[FEATURE_ORDER].to_numpy(dtype=float)
+    on_threshold = []
+    for rule in SCHOLARSHIP_RULES:
+        for criterion in rule['criteria']:
+            for feature, _, threshold in criterion['tests']:
+                for value in (threshold - 0.01, threshold, threshold + 0.01):
+                    row = X[len(on_threshold) % len(X)].copy()
+                    row[FEATURE_ORDER.index(feature)] = value
+                    on_threshold.append(row)
+    return np.vstack([X, on_threshold])
+
+
+def legacy_providers(row):
+    student = dict(zip(FEATURE_ORDER, row))
+    return [provider for provider, eligible in LEGACY_ELIGIBILITY.items() if eligible(student)]
+
+
+def test_vectorized_evaluation_matches_if_chain(students):
+    masks = rule_engine.evaluate(columns_from_matrix(students, FEATURE_ORDER))
+    for i, row in enumerate(students):
+        assert [provider for provider, mask in masks.items() if mask[i]] == legacy_providers(row)
+
+
+def test_single_student_paths_match_if_chain(students):
+    columns = columns_from_matrix(students, FEATURE_ORDER)
+    criteria_masks = rule_engine.criteria_masks(columns)
+    for i, row in enumerate(students):
+        expected = legacy_providers(row)
+        one = columns_from_matrix(row.reshape(1, -1), FEATURE_ORDER)
+        single = rule_engine.recommendations(one)
+        assert [r['provider'] for r in single if r['eligible']] == expected
+        assert rule_engine.recommendations(columns, i, criteria_masks) == single
+        compact = rule_engine.compact_recommendations(one)
+        assert [r['provider'] for r in compact if r['eligible']] == expected
+
+
+def test_reasons_match_if_chain():
+    student = {'year_of_study': 2.0, 'cgpa': 3.1, 'family_income': 90000.0, 'cocurricular_score': 55.0,
+               'leadership_positions': 1.0, 'community_service_hours': 20.0}
+    result = {r['provider']: r for r in rule_engine.recommendations({k: [v] for k, v in student.items()})}
+    assert result['PETRONAS']['reasons'] == [
+        'CGPA 3.10 below requirement (need ≥3.5)',
+        'Co-curricular score 55.0 below requirement (need ≥70)',
+        'Leadership positions 1.0 below requirement (need ≥2)',
+        'Community service 20.0 hours below requirement (need ≥50)'
+    ]
+    assert result['MARA']['reasons'] == ['Family income RM 90,000.0 exceeds requirement (need ≤RM 80,000)']
+    assert result['Yayasan UTP']['reasons'] == ['CGPA 3.10 below requirement (need ≥3.2)']
+
+    eligible = dict(student, cgpa=3.3, family_income=40000.0)
+    utp = rule_engine.recommendations({k: [v] for k, v in eligible.items()})[3]
+    assert utp['eligible'] and utp['confidence'] == 'High'
+    assert utp['reasons'] == [
+        'CGPA 3.30 meets requirement (≥3.2)',
+        'Family income RM 40,000.0 or co-curricular score 55.0 meets requirement',
+        'Currently in Year 2 of study'
+    ]
@@ -0,0 +1,75 @@
+"""Input schema: per-field validation errors and feature matrices"""
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from schema import FEATURE_ORDER, FeatureSchema, SchemaError, ValidationError, schema_for
+
+ROW = {'year_of_study': 2, 'cgpa': 3.5, 'family_income': 40000, 'cocurricular_score': 80,
+       'leadership_positions': 3, 'community_service_hours': 60}
+
+
+@pytest.fixture
+def schema():
+    return schema_for(FEATURE_ORDER)
+
+
+@pytest.mark.parametrize('changes, errors', [
+    ({'cgpa': 'abc'}, [{'field': 'cgpa', 'message': 'must be a number'}]),
+    ({'cgpa': True}, [{'field': 'cgpa', 'message': 'must be a number'}]),
+    ({'cgpa': 4.01}, [{'field': 'cgpa', 'message': 'must be between 0 and 4'}]),
+    ({'family_income': -1}, [{'field': 'family_income', 'message': 'must be at least 0'}]),
+    ({'cocurricular_score': 'inf'}, [{'field': 'cocurricular_score', 'message': 'must be a finite number'}]),
+    ({'year_of_study': 2.5}, [{'field': 'year_of_study', 'message': 'must be a whole number'}]),
+    ({'year_of_study': 0, 'cgpa': None, 'leadership_positions': 1.5}, [
+        {'field': 'year_of_study', 'message': 'must be between 1 and 4'},
+        {'field': 'cgpa', 'message': 'must be a number'},
+        {'field': 'leadership_positions', 'message': 'must be a whole number'}
+    ])
+])
+def test_predict_reports_every_invalid_field(client, changes, errors):
+    response = client.post('/predict', json=dict(ROW, **changes))
+    assert response.status_code == 422
+    body = response.get_json()
+    assert body['success'] is False
+    assert body['errors'] == errors
+    assert body['error'].startswith('Invalid input: ')
+
+
+def test_non_object_body_is_a_record_error(client):
+    response = client.post('/predict', json=[ROW])
+    assert response.status_code == 422
+    assert response.get_json()['errors'] == [{'field': None, 'message': 'The request body must be a JSON object.'}]
+
+
+def test_row_fills_defaults_and_parses_numbers(schema):
+    assert schema.row({'cgpa': '3.25'}) == [1, 3.25, 50000, 50, 0, 0]
+    with pytest.raises(ValidationError) as raised:
+        schema.row({'cgpa': 5, 'family_income': 'lots'})
+    assert [e['field'] for e in raised.value.errors] == ['cgpa', 'family_income']
+    assert str(raised.value) == 'cgpa must be between 0 and 4; family_income must be a number'
+
+
+def test_matrix_matches_row(schema):
+    rows = [ROW, dict(ROW, cgpa=9), 'not a student', ValueError('Invalid JSON on line 4'),
+            dict(ROW, year_of_study='3', cgpa=2.0)]
+    X, row_indices, errors = schema.matrix(rows)
+    assert row_indices == [0, 4]
+    assert sorted(errors) == [1, 2, 3]
+    assert errors[3] == [{'field': None, 'message': 'Invalid JSON on line 4'}]
+    for i, row in zip(row_indices, X):
+        assert row.tolist() == schema.row(rows[i])
+    # The same errors, field by field, as the single-student path
+    with pytest.raises(ValidationError) as raised:
+        schema.row(rows[1])
+    assert raised.value.errors == errors[1]
+
+
+def test_check_models_rejects_other_columns():
+    X = np.zeros((4, len(FEATURE_ORDER)))
+    model = DecisionTreeClassifier().fit(X, [0, 1, 0, 1])
+    FeatureSchema(FEATURE_ORDER).check_models({'Decision Tree': model})
+    with pytest.raises(SchemaError):
+        FeatureSchema(FEATURE_ORDER[:-1]).check_models({'Decision Tree': model})
+    with pytest.raises(SchemaError):
+        FeatureSchema(FEATURE_ORDER + ['shoe_size'])
@@ -0,0 +1,36 @@
+"""Offline bulk scoring (score_file.py)"""
+import json
+
+import pandas as pd
+import pytest
+
+from score_file import score_file
+
+ROWS = 2000
+
+
+@pytest.fixture(scope='module')
+def students(tmp_path_factory):
+    path = tmp_path_factory.mktemp('score') / 'students.csv'
+    pd.read_csv('scholarship_dataset.csv', nrows=ROWS).to_csv(path, index=False)
+    return str(path)
+
+
+def test_ndjson_output_is_one_json_record_per_line(students, tmp_path):
+    output = tmp_path / 'scored.ndjson'
+    # 2000 rows in 7 chunks, the last one short
+    assert score_file(students, str(output), chunk_size=300) == ROWS
+    lines = output.read_text().split('\n')
+    assert lines[-1] == ''
+    records = [json.loads(line) for line in lines[:-1]]
+    assert len(records) == ROWS
+    assert all(record['prediction'] in (0, 1) for record in records)
+
+
+def test_csv_output_matches_ndjson(students, tmp_path):
+    score_file(students, str(tmp_path / 'scored.csv'), chunk_size=300)
+    score_file(students, str(tmp_path / 'scored.ndjson'), chunk_size=700)
+    csv = pd.read_csv(tmp_path / 'scored.csv')
+    ndjson = pd.read_json(tmp_path / 'scored.ndjson', lines=True)
+    assert len(csv) == ROWS
+    assert csv['prediction'].tolist() == ndjson['prediction'].tolist()
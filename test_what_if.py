@@ -0,0 +1,119 @@
+"""What-if counterfactuals, checked against a brute-force scan of each feature's grid"""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from compiled_models import compile_model
+from generate_dataset import generate_block
+from rules import rule_engine
+from schema import FEATURE_ORDER
+from what_if import WhatIfAnalyzer
+
+# Every valid value of each feature (open-ended ones up to a generous maximum)
+GRIDS = {
+    'year_of_study': np.arange(1, 5.0),
+    'cgpa': np.round(np.arange(0, 401) * 0.01, 2),
+    'family_income': np.arange(0, 200001.0),
+    'cocurricular_score': np.arange(0, 101.0),
+    'leadership_positions': np.arange(0, 51.0),
+    'community_service_hours': np.arange(0, 1001.0)
+}
+
+
+@pytest.fixture(scope='module')
+def data():
+    df = generate_block(0, 0, 1200, seed=11)
+    return df[FEATURE_ORDER].to_numpy(dtype=float), df['eligible'].to_numpy()
+
+
+@pytest.fixture(scope='module')
+def profiles(data):
+    return data[0][1000:1006]
+
+
+def nearest_change(values, changed, current):
+    """Distance to the nearest grid value (other than current) where `changed` holds"""
+    candidates = values[changed & (values != current)]
+    return None if len(candidates) == 0 else float(np.min(np.abs(candidates - current)))
+
+
+def scan(profile, i):
+    X = np.repeat(profile.reshape(1, -1), len(GRIDS[FEATURE_ORDER[i]]), axis=0)
+    X[:, i] = GRIDS[FEATURE_ORDER[i]]
+    return X
+
+
+@pytest.mark.parametrize('kind', ['forest', 'compiled forest', 'tree'])
+def test_tree_model_answers_are_the_nearest_flip(data, profiles, kind):
+    X, y = data
+    if kind == 'tree':
+        model = DecisionTreeClassifier(max_depth=6, random_state=0).fit(X[:1000], y[:1000])
+    else:
+        model = RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0).fit(X[:1000], y[:1000])
+        if kind == 'compiled forest':
+            model = compile_model(model)
+    analyzer = WhatIfAnalyzer(model, FEATURE_ORDER)
+
+    for profile in profiles:
+        result = analyzer.analyze(profile)
+        base = model.predict(profile.reshape(1, -1))[0]
+        assert result['current']['prediction'] == base
+        for i, name in enumerate(FEATURE_ORDER):
+            grid = GRIDS[name]
+            expected = nearest_change(grid, model.predict(scan(profile, i)) != base, profile[i])
+            answer = result['features'][name]['model']
+            if answer is None:
+                assert expected is None
+            else:
+                assert abs(answer['change']) == pytest.approx(expected, abs=1e-9)
+                assert answer['prediction'] != base
+
+
+def test_logistic_regression_answers_flip_the_decision(data, profiles):
+    X, y = data
+    model = LogisticRegression(max_iter=2000).fit(X[:1000], y[:1000])
+    analyzer = WhatIfAnalyzer(model, FEATURE_ORDER)
+    for profile in profiles:
+        result = analyzer.analyze(profile)
+        base = model.predict(profile.reshape(1, -1))[0]
+        for i, name in enumerate(FEATURE_ORDER):
+            answer = result['features'][name]['model']
+            if answer is None:
+                continue
+            changed = profile.copy()
+            changed[i] = answer['value']
+            assert model.predict(changed.reshape(1, -1))[0] != base
+            # Nothing on the grid between the profile and the answer flips the decision
+            grid = GRIDS[name]
+            closer = grid[np.abs(grid - profile[i]) < abs(answer['change']) - 1e-9]
+            between = scan(profile, i)[np.isin(grid, closer)]
+            assert (model.predict(between) == base).all()
+
+
+def test_provider_answers_are_the_nearest_eligibility_change(data, profiles):
+    X, y = data
+    analyzer = WhatIfAnalyzer(DecisionTreeClassifier(max_depth=3).fit(X, y), FEATURE_ORDER)
+    for profile in profiles:
+        result = analyzer.analyze(profile)
+        base = rule_engine.evaluate({name: profile[i:i + 1] for i, name in enumerate(FEATURE_ORDER)})
+        for i, name in enumerate(FEATURE_ORDER):
+            grid = GRIDS[name]
+            masks = rule_engine.evaluate({n: column for n, column in zip(FEATURE_ORDER, scan(profile, i).T)})
+            for provider, mask in masks.items():
+                expected = nearest_change(grid, mask != base[provider][0], profile[i])
+                answer = result['features'][name]['providers'][provider]
+                if expected is None:
+                    assert answer is None
+                else:
+                    assert abs(answer['change']) == pytest.approx(expected, abs=1e-9)
+                    assert answer['eligible'] == (not base[provider][0])
+
+
+def test_what_if_endpoint(client, student):
+    body = client.post('/what_if', json=dict(student, model='Decision Tree')).get_json()
+    assert body['success'] and body['model'] == 'Decision Tree'
+    assert set(body['features']) == set(FEATURE_ORDER)
+    assert client.post('/what_if', json=dict(student, model='SVM')).status_code == 400
+    assert client.post('/what_if', json=dict(student, cgpa=7)).status_code == 422
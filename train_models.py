@@ -1,93 +1,322 @@
 """
 Train ML models for Scholarship Eligibility Prediction
+
+Usage:
+    python train_models.py                            # fit the three models in parallel
+    python train_models.py --search --time-budget 120 # add a cross-validated search
+    python train_models.py --no-promote               # publish a version without serving it
+    python train_models.py --streaming --data big.npcols  # out-of-core, for datasets larger than RAM
+
+Every run writes a new version into the model registry (see registry.py)
+and, unless --no-promote is given, promotes it; running apps switch to it
+without a restart.
 """
-import pandas as pd
+import argparse
+import json
+import os
+import time
+import warnings
+
+import joblib
 import numpy as np
-from sklearn.model_selection import train_test_split
+from joblib import Parallel, delayed
+from scipy.stats import loguniform, randint
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
+from sklearn.model_selection import ParameterSampler, StratifiedKFold, cross_validate, train_test_split
 from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, classification_report
-import joblib
-import json
-import os
 
-# Create models directory if it doesn't exist
-os.makedirs('models', exist_ok=True)
+from compiled_models import compiled_filename, export_compiled
+from dataset_io import read_dataset, resolve_dataset
+from drift import REFERENCE_FILE, build_reference
+from registry import ModelRegistry
+from streaming_train import evaluate_streaming, metrics_from_confusion, train_streaming
+
+RANDOM_STATE = 42
 
-# Load dataset
-print("Loading dataset...")
-df = pd.read_csv('scholarship_dataset.csv')
+# scikit-learn 1.2 calls a deprecated pandas helper on every DataFrame it validates
+warnings.filterwarnings('ignore', category=FutureWarning)
 
 # Feature selection
-features = ['year_of_study', 'cgpa', 'family_income', 'cocurricular_score', 
+FEATURES = ['year_of_study', 'cgpa', 'family_income', 'cocurricular_score',
             'leadership_positions', 'community_service_hours']
-X = df[features]
-y = df['eligible']
-
-# Split data
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-
-print(f"Training set size: {len(X_train)}")
-print(f"Test set size: {len(X_test)}")
-print(f"Training set - Eligible: {y_train.sum()}, Not Eligible: {(y_train==0).sum()}")
-print(f"Test set - Eligible: {y_test.sum()}, Not Eligible: {(y_test==0).sum()}")
-
-# Initialize models
-models = {
-    'Logistic Regression': LogisticRegression(random_state=42, max_iter=1000),
-    'Decision Tree': DecisionTreeClassifier(random_state=42, max_depth=10),
-    'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10)
+
+# Baseline models; fitted as-is unless a hyperparameter search is requested
+BASE_MODELS = {
+    'Logistic Regression': LogisticRegression(random_state=RANDOM_STATE, max_iter=1000),
+    'Decision Tree': DecisionTreeClassifier(random_state=RANDOM_STATE, max_depth=10),
+    'Random Forest': RandomForestClassifier(n_estimators=100, random_state=RANDOM_STATE, max_depth=10)
 }
 
-# Train and evaluate models
-results = {}
+# Search spaces for --search
+PARAM_DISTRIBUTIONS = {
+    'Logistic Regression': {
+        'C': loguniform(1e-3, 1e2)
+    },
+    'Decision Tree': {
+        'max_depth': randint(3, 16),
+        'min_samples_leaf': randint(1, 20)
+    },
+    'Random Forest': {
+        'n_estimators': randint(30, 201),
+        'max_depth': randint(4, 16),
+        'min_samples_leaf': randint(1, 10)
+    }
+}
+
+
+def cached_folds(X, y, n_splits):
+    """
+    Stratified fold indices computed once and shared by every model and
+    every search candidate, so all of them are scored on identical splits.
+    """
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=RANDOM_STATE)
+    return list(splitter.split(X, y))
+
+
+def measure_latency(model, X, repeat=50):
+    """Median predict_proba latency in milliseconds for one row and per row of a batch"""
+    single = X.iloc[:1]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict_proba(single)
+        timings.append(time.perf_counter() - start)
+
+    batch_timings = []
+    for _ in range(max(3, repeat // 10)):
+        start = time.perf_counter()
+        model.predict_proba(X)
+        batch_timings.append(time.perf_counter() - start)
+
+    return {
+        'single_row_ms': float(np.median(timings) * 1000),
+        'batch_per_row_ms': float(np.median(batch_timings) * 1000 / len(X)),
+        'batch_size': len(X)
+    }
+
+
+def search_model(name, X, y, folds, time_budget, n_iter, max_latency_ms):
+    """
+    Randomized search over PARAM_DISTRIBUTIONS[name] on the cached folds.
+    Candidates are evaluated until n_iter is reached or the time budget is
+    spent. Candidates slower than max_latency_ms per row are rejected, so
+    latency is a selection criterion alongside cross-validated F1.
+    """
+    deadline = time.perf_counter() + time_budget
+    candidates = [{}] + list(ParameterSampler(PARAM_DISTRIBUTIONS[name], n_iter=n_iter,
+                                              random_state=RANDOM_STATE))
+    best = None
+    evaluated = 0
+
+    for params in candidates:
+        if evaluated and time.perf_counter() >= deadline:
+            break
+        model = clone(BASE_MODELS[name]).set_params(**params)
+        scores = cross_validate(model, X, y, cv=folds, scoring='f1', return_estimator=True)
+        evaluated += 1
+
+        latency = measure_latency(scores['estimator'][0], X.iloc[:1000], repeat=20)['single_row_ms']
+        if max_latency_ms is not None and latency > max_latency_ms and params:
+            continue
+
+        cv_f1 = float(np.mean(scores['test_score']))
+        if best is None or cv_f1 > best['cv_f1']:
+            best = {
+                'params': {key: (value.item() if hasattr(value, 'item') else value)
+                           for key, value in params.items()},
+                'cv_f1': cv_f1,
+                'cv_latency_ms': latency
+            }
+
+    best['candidates_evaluated'] = evaluated
+    return best
+
+
+def fit_and_evaluate(name, X_train, y_train, X_test, y_test, folds, args):
+    """Optionally search, then fit one model and evaluate it on the test set"""
+    search = None
+    model = clone(BASE_MODELS[name])
+    if args.search:
+        search = search_model(name, X_train, y_train, folds, args.time_budget,
+                              args.n_iter, args.max_latency_ms)
+        model.set_params(**search['params'])
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=args.jobs)
 
-for name, model in models.items():
-    print(f"\n{'='*50}")
-    print(f"Training {name}...")
-    
     # Train
+    start = time.perf_counter()
     model.fit(X_train, y_train)
-    
+    fit_time = time.perf_counter() - start
+
+    # Single-row serving should not pay for a worker pool
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=None)
+
     # Predict
     y_pred = model.predict(X_test)
-    
+
     # Evaluate
-    accuracy = accuracy_score(y_test, y_pred)
-    precision = precision_score(y_test, y_pred)
-    recall = recall_score(y_test, y_pred)
-    f1 = f1_score(y_test, y_pred)
     cm = confusion_matrix(y_test, y_pred)
-    
-    results[name] = {
-        'accuracy': float(accuracy),
-        'precision': float(precision),
-        'recall': float(recall),
-        'f1_score': float(f1),
-        'confusion_matrix': cm.tolist()
+    result = {
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'precision': float(precision_score(y_test, y_pred)),
+        'recall': float(recall_score(y_test, y_pred)),
+        'f1_score': float(f1_score(y_test, y_pred)),
+        'confusion_matrix': cm.tolist(),
+        'fit_time_seconds': fit_time,
+        'inference_latency_ms': measure_latency(model, X_test)
     }
-    
-    print(f"Accuracy: {accuracy:.4f}")
-    print(f"Precision: {precision:.4f}")
-    print(f"Recall: {recall:.4f}")
-    print(f"F1-Score: {f1:.4f}")
-    print(f"Confusion Matrix:\n{cm}")
-    
-    # Save model
-    filename = f'models/{name.lower().replace(" ", "_")}_model.pkl'
-    joblib.dump(model, filename)
-    print(f"Model saved to {filename}")
-
-# Save results
-with open('models/model_results.json', 'w') as f:
-    json.dump(results, f, indent=2)
-
-# Save feature names for later use
-with open('models/features.json', 'w') as f:
-    json.dump(features, f, indent=2)
-
-print(f"\n{'='*50}")
-print("Training completed!")
-print(f"\nBest model by F1-Score: {max(results.items(), key=lambda x: x[1]['f1_score'])[0]}")
+    if search is not None:
+        result['search'] = search
+    return name, model, result
+
+
+def fit_in_memory(args):
+    """Load the dataset, then fit and evaluate the models in parallel. Returns ([(name, model, result)], training rows)"""
+    print(f"Loading dataset from {resolve_dataset(args.data)}...")
+    df = read_dataset(args.data, columns=FEATURES + ['eligible'])
+
+    X = df[FEATURES]
+    y = df['eligible']
+
+    # Split data
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=RANDOM_STATE, stratify=y)
+
+    print(f"Training set size: {len(X_train)}")
+    print(f"Test set size: {len(X_test)}")
+    print(f"Training set - Eligible: {y_train.sum()}, Not Eligible: {(y_train==0).sum()}")
+    print(f"Test set - Eligible: {y_test.sum()}, Not Eligible: {(y_test==0).sum()}")
+
+    folds = cached_folds(X_train, y_train, args.cv_folds) if args.search else None
+
+    # Train and evaluate models in parallel; results come back in BASE_MODELS order
+    print(f"\nTraining {len(BASE_MODELS)} models in parallel...")
+    start = time.perf_counter()
+    fitted = Parallel(n_jobs=min(len(BASE_MODELS), os.cpu_count() or 1))(
+        delayed(fit_and_evaluate)(name, X_train, y_train, X_test, y_test, folds, args)
+        for name in BASE_MODELS
+    )
+    print(f"Training wall-clock time: {time.perf_counter() - start:.2f}s")
+    return fitted, df.loc[X_train.index]
+
+
+def fit_streaming(args):
+    """
+    Fit and evaluate the baseline models from chunks of the dataset (see
+    streaming_train.py). Returns ([(name, model, result)], training sample).
+    """
+    path = resolve_dataset(args.data)
+    print(f"Streaming {path} in chunks of {args.chunk_size} rows...")
+    models, fit_times, summary, sample = train_streaming(
+        path, FEATURES, BASE_MODELS, chunk_size=args.chunk_size, seed=RANDOM_STATE,
+        sample_rows=args.sample_rows, epochs=args.epochs, n_jobs=args.jobs)
+    print(f"Training set size: {summary['train_rows']} in {summary['train_chunks']} chunks")
+
+    confusion, test_rows, latency_sample = evaluate_streaming(
+        models, path, FEATURES, chunk_size=args.chunk_size, seed=RANDOM_STATE)
+    print(f"Test set size: {test_rows}")
+
+    fitted = []
+    for name, model in models.items():
+        result = metrics_from_confusion(confusion[name])
+        result['fit_time_seconds'] = fit_times[name]
+        result['inference_latency_ms'] = measure_latency(model, latency_sample)
+        result['training'] = dict(summary, mode='streaming', test_rows=test_rows)
+        fitted.append((name, model, result))
+    return fitted, sample
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the scholarship eligibility models.')
+    parser.add_argument('--data', default='scholarship_dataset.csv', help='Training dataset (.csv, .npcols or .parquet); '
+                        'a newer .npcols/.parquet copy of a CSV is read instead')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel jobs (default: all cores)')
+    parser.add_argument('--search', action='store_true', help='Run a cross-validated hyperparameter search')
+    parser.add_argument('--time-budget', type=float, default=60.0,
+                        help='Search time budget per model in seconds (default: 60)')
+    parser.add_argument('--n-iter', type=int, default=20, help='Maximum search candidates per model')
+    parser.add_argument('--cv-folds', type=int, default=5, help='Cross-validation folds (default: 5)')
+    parser.add_argument('--max-latency-ms', type=float, default=None,
+                        help='Reject search candidates slower than this per single row')
+    parser.add_argument('--models-dir', default='models', help='Model registry root (default: models)')
+    parser.add_argument('--no-promote', action='store_true', help='Publish the new version without serving it')
+    parser.add_argument('--keep-versions', type=int, default=5,
+                        help='Registry versions to keep after training, 0 keeps all (default: 5)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Train from chunks of the dataset instead of loading it into memory')
+    parser.add_argument('--chunk-size', type=int, default=100_000,
+                        help='Rows per chunk with --streaming (default: 100000)')
+    parser.add_argument('--sample-rows', type=int, default=500_000,
+                        help='Training rows sampled for the decision tree with --streaming (default: 500000)')
+    parser.add_argument('--epochs', type=int, default=2,
+                        help='Passes over the data for the SGD logistic regression with --streaming (default: 2)')
+    args = parser.parse_args(argv)
+
+    if args.streaming and args.search:
+        parser.error('--search needs the whole dataset in memory and cannot be combined with --streaming')
+
+    # New models are written to a staging directory and published when complete
+    registry = ModelRegistry(args.models_dir)
+    staging_dir = registry.stage()
+
+    if args.streaming:
+        fitted, reference_frame = fit_streaming(args)
+    else:
+        fitted, reference_frame = fit_in_memory(args)
+
+    results = {}
+    for name, model, result in fitted:
+        results[name] = result
+
+        print(f"\n{'='*50}")
+        print(name)
+        if 'search' in result:
+            print(f"Best parameters: {result['search']['params']} "
+                  f"(CV F1 {result['search']['cv_f1']:.4f}, {result['search']['candidates_evaluated']} candidates)")
+        print(f"Accuracy: {result['accuracy']:.4f}")
+        print(f"Precision: {result['precision']:.4f}")
+        print(f"Recall: {result['recall']:.4f}")
+        print(f"F1-Score: {result['f1_score']:.4f}")
+        print(f"Confusion Matrix:\n{np.array(result['confusion_matrix'])}")
+        print(f"Fit time: {result['fit_time_seconds']:.2f}s, "
+              f"latency: {result['inference_latency_ms']['single_row_ms']:.3f} ms/row (single)")
+
+        # Save model
+        model_file = f'{name.lower().replace(" ", "_")}_model.pkl'
+        filename = os.path.join(staging_dir, model_file)
+        joblib.dump(model, filename)
+
+        # Array-only copy (parity-checked) that the app memory-maps without scikit-learn
+        export_compiled(filename, os.path.join(staging_dir, compiled_filename(model_file)), model)
+
+    # Save results
+    with open(os.path.join(staging_dir, 'model_results.json'), 'w') as f:
+        json.dump(results, f, indent=2)
+
+    # Save feature names for later use
+    with open(os.path.join(staging_dir, 'features.json'), 'w') as f:
+        json.dump(FEATURES, f, indent=2)
+
+    # Training distribution that the app compares live traffic against
+    with open(os.path.join(staging_dir, REFERENCE_FILE), 'w') as f:
+        json.dump(build_reference(reference_frame, FEATURES), f, indent=2)
+
+    version = registry.publish(staging_dir)
+    print(f"\n{'='*50}")
+    print(f"Models saved to {registry.version_dir(version)}")
+    if not args.no_promote:
+        registry.promote(version)
+        print(f"Promoted model version {version}")
+    if args.keep_versions:
+        for removed in registry.prune(args.keep_versions):
+            print(f"Removed old model version {removed}")
+
+    print("Training completed!")
+    print(f"\nBest model by F1-Score: {max(results.items(), key=lambda x: x[1]['f1_score'])[0]}")
+
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+"""
+"What-if" analysis: the smallest change to one input that flips a decision
+
+Holding the other inputs fixed, a tree model's output is a step function of
+each feature that only changes at the trees' split thresholds. Walking every
+tree with that one feature left free gives the leaf reached on each interval
+between thresholds, and summing the leaves gives the forest's decision on
+every interval, exactly and without resampling the input space. A logistic
+regression has a single crossing point per feature, solved directly, and a
+provider's eligibility only changes at its rule thresholds. The answer is
+the nearest valid value on the other side of such a change.
+"""
+import math
+
+import numpy as np
+
+from compiled_models import CompiledForest
+from rules import rule_engine as default_rule_engine
+from schema import FIELDS
+
+# Granularity of suggested values per feature
+FEATURE_STEPS = {
+    'year_of_study': 1,
+    'cgpa': 0.01,
+    'family_income': 1,
+    'cocurricular_score': 1,
+    'leadership_positions': 1,
+    'community_service_hours': 1
+}
+
+# Valid values per feature: (minimum, maximum or None, step), ranges from the input schema
+FEATURE_DOMAINS = {name: (FIELDS[name].minimum, FIELDS[name].maximum, step) for name, step in FEATURE_STEPS.items()}
+
+
+def as_forest(model):
+    """The model's trees as a CompiledForest, or None for models without trees"""
+    if isinstance(model, CompiledForest):
+        return model
+    if hasattr(model, 'estimators_') or hasattr(model, 'tree_'):
+        return CompiledForest.from_sklearn(model)
+    return None
+
+
+def forest_steps(forest, x, i):
+    """
+    The forest's summed leaf values as a step function of feature i, with the
+    other features fixed at x. Returns (edges, sums): sums[k] holds the class
+    totals for values v with edges[k - 1] < float32(v) <= edges[k], the first
+    and last intervals being open-ended.
+    """
+    # Trees compare float32 inputs against float64 thresholds
+    x32 = x.astype(np.float32).astype(np.float64)
+    node = forest.roots.astype(np.int64)
+    lo = np.full(len(node), -np.inf)
+    hi = np.full(len(node), np.inf)
+    leaves, leaf_lo, leaf_hi = [], [], []
+
+    while len(node):
+        is_leaf = forest.left[node] == node
+        leaves.append(node[is_leaf])
+        leaf_lo.append(lo[is_leaf])
+        leaf_hi.append(hi[is_leaf])
+        node, lo, hi = node[~is_leaf], lo[~is_leaf], hi[~is_leaf]
+
+        feature = forest.feature[node]
+        threshold = forest.threshold[node]
+        left, right = forest.left[node], forest.right[node]
+        # Splits on other features follow the profile
+        follow = feature != i
+        followed = np.where(x32[feature] <= threshold, left, right)[follow]
+        # Splits on feature i send each side of the threshold its own way
+        go_left = ~follow & (lo < threshold)
+        go_right = ~follow & (hi > threshold)
+        node = np.concatenate([followed, left[go_left], right[go_right]])
+        lo, hi = (np.concatenate([lo[follow], lo[go_left], threshold[go_right]]),
+                  np.concatenate([hi[follow], threshold[go_left], hi[go_right]]))
+
+    leaves = np.concatenate(leaves)
+    leaf_lo = np.concatenate(leaf_lo)
+    leaf_hi = np.concatenate(leaf_hi)
+    edges = np.unique(np.concatenate([leaf_lo, leaf_hi]))
+    edges = edges[np.isfinite(edges)]
+
+    # Each leaf covers a run of consecutive intervals: add its value over the run
+    first = np.where(np.isfinite(leaf_lo), np.searchsorted(edges, leaf_lo) + 1, 0)
+    last = np.where(np.isfinite(leaf_hi), np.searchsorted(edges, leaf_hi), len(edges))
+    values = forest.value[leaves]
+    delta = np.zeros((len(edges) + 2, values.shape[1]))
+    np.add.at(delta, first, values)
+    np.add.at(delta, last + 1, -values)
+    return edges, np.cumsum(delta, axis=0)[:len(edges) + 1]
+
+
+def linear_boundary(model, x, i):
+    """Value of feature i at which a linear model's decision function is zero, or None"""
+    coef = np.asarray(model.coef_ if hasattr(model, 'coef_') else model.coef, dtype=np.float64).ravel()
+    if not coef[i]:
+        return None
+    score = float(np.ravel(model.decision_function(x.reshape(1, -1)))[0])
+    return x[i] - score / coef[i]
+
+
+class WhatIfAnalyzer:
+    """
+    Counterfactuals for one model and the provider rules, one feature at a
+    time. A request costs a few array operations per tree level and feature,
+    plus one small batched prediction to report the model's output at the
+    answers.
+    """
+
+    def __init__(self, model, features, rule_engine=default_rule_engine, domains=FEATURE_DOMAINS):
+        self.model = model
+        self.features = list(features)
+        self.rule_engine = rule_engine
+        self.domains = [domains.get(name, (None, None, None)) for name in self.features]
+        self.forest = as_forest(model)
+        if self.forest is None and not (hasattr(model, 'coef_') or hasattr(model, 'coef')):
+            raise ValueError(f'What-if analysis is not supported for {type(model).__name__}')
+        self.classes = np.asarray(model.classes_)
+        # Rule thresholds per feature
+        rule_thresholds = {name: [] for name in self.features}
+        for rule in rule_engine.rules:
+            for criterion in rule['criteria']:
+                for feature, op, threshold in criterion['tests']:
+                    if feature in rule_thresholds:
+                        rule_thresholds[feature].append(threshold)
+        self.rule_thresholds = [np.unique(np.asarray(rule_thresholds[name], dtype=np.float64))
+                                for name in self.features]
+
+    def _grid(self, values, i, up, float32=False):
+        """
+        Snap values to the feature's grid: the smallest grid value above each
+        value (`up`) or the largest one at or below it. With `float32`, values
+        are compared the way tree models compare inputs.
+        """
+        step = self.domains[i][2]
+        if not step:
+            return np.nextafter(values, np.inf) if up else values
+        # Keep the grid's decimals exact (e.g. 3.46, not 3.4600000000000004)
+        decimals = max(0, -int(math.floor(math.log10(step))))
+        cast = (lambda v: v.astype(np.float32)) if float32 else (lambda v: v)
+        with np.errstate(invalid='ignore'):
+            below = np.round(np.floor(values / step + 1e-9) * step, decimals)
+            below = np.where(cast(below) > values, np.round(below - step, decimals), below)
+            above = np.round(below + step, decimals)
+            if up:
+                return np.where(cast(above) <= values, np.round(above + step, decimals), above)
+            return np.where(cast(above) <= values, above, below)
+
+    def _nearest(self, values, ok, i, current):
+        """The valid value of feature i closest to current, other than current itself, or None"""
+        minimum, maximum, _ = self.domains[i]
+        ok = ok & np.isfinite(values) & (values != current)
+        if minimum is not None:
+            ok &= values >= minimum
+        if maximum is not None:
+            ok &= values <= maximum
+        values = values[ok]
+        if len(values) == 0:
+            return None
+        return float(values[np.argmin(np.abs(values - current))])
+
+    def _tree_flip(self, x, i, base_class):
+        edges, sums = forest_steps(self.forest, x, i)
+        decisions = self.classes[np.argmax(sums, axis=1)]
+        flipped = np.flatnonzero(decisions != base_class)
+        lower = np.concatenate([[-np.inf], edges])[flipped]
+        upper = np.concatenate([edges, [np.inf]])[flipped]
+        # Intervals above the profile start at their lower end, those below at their upper end
+        above = lower >= np.float32(x[i])
+        candidates = np.where(above, self._grid(lower, i, True, float32=True),
+                              self._grid(upper, i, False, float32=True))
+        inside = (candidates.astype(np.float32) > lower) & (candidates.astype(np.float32) <= upper)
+        return self._nearest(candidates, inside, i, x[i])
+
+    def _linear_flips(self, x, i):
+        boundary = linear_boundary(self.model, x, i)
+        if boundary is None:
+            return np.empty(0)
+        # The grid values either side of the boundary; the model decides which one flips
+        boundary = np.array([boundary])
+        return np.concatenate([self._grid(boundary, i, False), self._grid(boundary, i, True)])
+
+    def _rule_flips(self, x, i, base_eligibility):
+        """Nearest value of feature i that changes each provider's eligibility"""
+        thresholds = self.rule_thresholds[i]
+        # Rules compare with >=, >, <= and <, so the threshold and the grid values either side matter
+        candidates = np.unique(np.concatenate([
+            thresholds,
+            self._grid(thresholds, i, True),
+            self._grid(np.nextafter(thresholds, -np.inf), i, False)
+        ]))
+        X = np.repeat(x.reshape(1, -1), len(candidates), axis=0)
+        X[:, i] = candidates
+        eligibility = self.rule_engine.evaluate({name: X[:, j] for j, name in enumerate(self.features)})
+        result = {}
+        for provider, mask in eligibility.items():
+            value = self._nearest(candidates, mask != base_eligibility[provider], i, x[i])
+            result[provider] = None if value is None else {
+                'value': value,
+                'change': round(value - float(x[i]), 10),
+                'eligible': not base_eligibility[provider]
+            }
+        return result
+
+    def analyze(self, x):
+        """
+        For every feature, the nearest value that flips the model decision
+        and each provider's eligibility, others held fixed. `x` is one row
+        in `features` order.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        base_proba = np.asarray(self.model.predict_proba(x.reshape(1, -1)))[0]
+        base_class = self.classes[np.argmax(base_proba)]
+        base_eligibility = {provider: bool(mask[0]) for provider, mask in self.rule_engine.evaluate(
+            {name: x[i:i + 1] for i, name in enumerate(self.features)}).items()}
+
+        # Model answers per feature, checked against the model itself in one batch
+        owners, values, providers = [], [], {}
+        for i, name in enumerate(self.features):
+            if self.forest is not None:
+                flip = self._tree_flip(x, i, base_class)
+                candidates = np.empty(0) if flip is None else np.array([flip])
+            else:
+                candidates = self._linear_flips(x, i)
+            owners.append(np.full(len(candidates), i))
+            values.append(candidates)
+            providers[name] = self._rule_flips(x, i, base_eligibility)
+        owner = np.concatenate(owners)
+        value = np.concatenate(values)
+        X = np.repeat(x.reshape(1, -1), len(value), axis=0)
+        X[np.arange(len(value)), owner] = value
+        if len(X):
+            proba = np.asarray(self.model.predict_proba(X))
+            prediction = self.classes[np.argmax(proba, axis=1)]
+
+        features = {}
+        for i, name in enumerate(self.features):
+            rows = np.flatnonzero(owner == i)
+            if len(rows):
+                rows = rows[prediction[rows] != base_class]
+            nearest = self._nearest(value[rows], np.ones(len(rows), dtype=bool), i, x[i]) if len(rows) else None
+            model_change = None
+            if nearest is not None:
+                row = rows[np.flatnonzero(value[rows] == nearest)[0]]
+                model_change = {
+                    'value': nearest,
+                    'change': round(nearest - float(x[i]), 10),
+                    'prediction': int(prediction[row]),
+                    'eligible_probability': float(proba[row, 1])
+                }
+            features[name] = {
+                'current': float(x[i]),
+                'model': model_change,
+                'providers': providers[name]
+            }
+
+        return {
+            'current': {
+                'prediction': int(base_class),
+                'eligible_probability': float(base_proba[1]),
+                'eligible_scholarships': [provider for provider, eligible in base_eligibility.items() if eligible]
+            },
+            'features': features
+        }